@@ -4,7 +4,11 @@ import pulumi
 from filebase64sha256 import filebase64sha256
 from pulumi import ResourceOptions
 from pulumi_aws import apigateway, cloudwatch, iam, lambda_
-from pulumi_lambda_efs import DevelopmentEnvironment, get_environment_function_args
+from pulumi_lambda_efs import (
+    DevelopmentEnvironment,
+    create_provisioned_alias,
+    get_environment_function_args,
+)
 
 environment = DevelopmentEnvironment(
     "ExamplePOC",
@@ -53,10 +57,18 @@ example_function = lambda_.Function(
     role=example_role.arn,
     runtime="python3.8",
     timeout=30,
+    publish=True,
     opts=ResourceOptions(depends_on=[environment]),
-    **get_environment_function_args(environment),
+    **get_environment_function_args(
+        environment,
+        "python3.8",
+        warmup_modules=["apig_wsgi"],
+        warmup_hook="sample_django.warmup:setup",
+    ),
 )
 
+example_alias = create_provisioned_alias("exampleFunction", example_function, 1)
+
 logs = cloudwatch.LogGroup(
     "exampleLogGroup",
     name=example_function.name.apply(lambda name: f"/aws/lambda/{name}"),
@@ -97,9 +109,7 @@ for i, resource_id in enumerate(resources):
         http_method=method.http_method,
         integration_http_method="POST",
         type="AWS_PROXY",
-        uri=example_function.arn.apply(
-            lambda arn: f"arn:aws:apigateway:eu-west-1:lambda:path/2015-03-31/functions/{arn}/invocations"
-        ),
+        uri=example_alias.invoke_arn,
     )
 
     methods.append(method)
@@ -119,11 +129,12 @@ lambda_permission = lambda_.Permission(
     "lambdaPermission",
     action="lambda:InvokeFunction",
     function=example_function.name,
+    qualifier=example_alias.name,
     principal="apigateway.amazonaws.com",
     source_arn=gateway.execution_arn.apply(
         lambda execution_arn: f"{execution_arn}/*/*/*"
     ),
-    opts=ResourceOptions(depends_on=[example_function, deployment]),
+    opts=ResourceOptions(depends_on=[example_alias, deployment]),
 )
 
 pulumi.export("file_system_id", environment.file_system_id)
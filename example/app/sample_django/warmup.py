@@ -0,0 +1,13 @@
+"""
+Called by the lambda_efs_runtime warmup during the function's init phase, so that
+Django's apps and settings are loaded before the first request arrives.
+"""
+
+import os
+
+import django
+
+
+def setup():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sample_django.settings')
+    django.setup()
@@ -1,4 +1,13 @@
 from .development_environment import DevelopmentEnvironment
 from .get_environment_function_args import get_environment_function_args
+from .install import install_all
+from .layers import get_hybrid_function_args
+from .provisioned_concurrency import create_provisioned_alias
 
-__all__ = ["DevelopmentEnvironment", "get_environment_function_args"]
+__all__ = [
+    "DevelopmentEnvironment",
+    "create_provisioned_alias",
+    "get_environment_function_args",
+    "get_hybrid_function_args",
+    "install_all",
+]
@@ -1,41 +1,197 @@
+import os
 import sys
-from subprocess import CalledProcessError, run
+from subprocess import CalledProcessError
 
-from importlib_resources import files
+from .brew_closure import (
+    compute_runtime_closure,
+    print_runtime_closure,
+    publish_runtime_closure,
+    read_brewfile_formulae,
+)
+from .builder import IMAGE_LOCK_FILENAME, BuilderSession
+from .dedup import dedup, default_dedup_directories, print_dedup_result
+from .generations import (
+    begin_generation,
+    collect_generations,
+    complete_generation,
+    current_generation,
+    generation_directory,
+    is_complete,
+    list_generations,
+    switch_generation,
+)
+from .install import (
+    CommandRunner,
+    default_keep_generations,
+    default_nfs_block_size,
+    efs_mount_options,
+    install_all,
+    install_brew,
+    install_pip,
+    local_brew_prefix,
+    local_cas_directory,
+    local_pip_prefix,
+    mount,
+)
+from .layers import (
+    DEFAULT_LAYER_SIZE,
+    DEFAULT_MAX_LAYERS,
+    DEFAULT_TOTAL_LAYER_SIZE,
+    plan_layers,
+    print_layer_plan,
+)
+from .mount_benchmark import (
+    DEFAULT_SEQUENTIAL_SIZE,
+    DEFAULT_SMALL_FILE_SIZE,
+    DEFAULT_SMALL_FILES,
+    bench_mount,
+    load_mount_benchmark,
+    print_mount_benchmark,
+    write_mount_benchmark,
+)
+from .postinstall import postinstall_pip, write_install_id
+from .prune import PRUNE_KINDS, load_prune_config, print_prune_report, prune
+from .python_runtimes import DEFAULT_PYTHON_RUNTIME, PYTHON_RUNTIME_ENV
+from .runtime.libraries import write_library_index
+from .runtime.pack import default_pack_path, write_pack
+from .steps import BUILD_REPORT_FILENAME, BuildReport, print_build_report
+from .sync import DEFAULT_SYNC_WORKERS, print_sync_result, sync_directories
+from .throughput import (
+    default_package_directories,
+    measure_package_bytes,
+    print_throughput_recommendation,
+)
 
 # Commands: install_brew_ec2, install_pip_ec2, install_codebuild
 
 
-mount_efs_sh = str(files("pulumi_lambda_efs.bin").joinpath("mount_efs.sh"))
-install_brew_sh = str(files("pulumi_lambda_efs.bin").joinpath("install_brew.sh"))
-install_pip_sh = str(files("pulumi_lambda_efs.bin").joinpath("install_pip.sh"))
-
-
 def main():
     if len(sys.argv) <= 1:
         print_usage()
         return
 
-    if sys.argv[1] == "install_brew_azl":
-        install_brew_azl()
-    elif sys.argv[1] == "install_pip_azl":
-        install_pip_azl()
-    else:
-        print_usage()
+    commands = {
+        "install_all": install_all_command,
+        "install_brew_azl": install_brew_azl,
+        "install_pip_azl": install_pip_azl,
+        "postinstall_pip": postinstall_pip_command,
+        "prune": prune_command,
+        "extract_brew_closure": extract_brew_closure_command,
+        "index_libraries": index_libraries_command,
+        "write_install_id": write_install_id_command,
+        "begin_generation": begin_generation_command,
+        "complete_generation": complete_generation_command,
+        "switch_generation": switch_generation_command,
+        "collect_generations": collect_generations_command,
+        "list_generations": list_generations_command,
+        "dedup": dedup_command,
+        "pack": pack_command,
+        "recommend_throughput": recommend_throughput_command,
+        "plan_layers": plan_layers_command,
+        "mount": mount_command,
+        "bench_mount": bench_mount_command,
+        "sync": sync_command,
+    }
+    commands.get(sys.argv[1], print_usage)()
 
 
-def install_brew_azl():
+def install_all_command():
     if len(sys.argv) <= 2:
         print_usage()
         return
 
     filesystem_id = sys.argv[2]
+    incremental = "--incremental" in sys.argv[3:]
+    keep = _option_value("--keep", default_keep_generations)
+    wheelhouse = _option_value("--wheelhouse", None, str)
+    brew_closure = "--brew-closure" in sys.argv[3:]
+    bottle_cache = _option_value("--bottle-cache", None, str)
+    builder = "--builder" in sys.argv[3:]
+    local_build = _option_value("--local-build", None, str)
+    runtime = _option_value("--runtime", None, str)
+    pack = "--pack" in sys.argv[3:]
+    report = BuildReport(measure="--no-measure" not in sys.argv[3:])
+    report_path = _option_value("--report", BUILD_REPORT_FILENAME, str)
 
     try:
-        run(["sudo", "bash", mount_efs_sh, filesystem_id], check=True)
-        run(["sudo", "bash", install_brew_sh, filesystem_id], check=True)
+        statuses = install_all(
+            filesystem_id,
+            incremental,
+            keep,
+            wheelhouse,
+            brew_closure,
+            bottle_cache,
+            builder,
+            report,
+            _mount_options(),
+            local_build,
+            runtime,
+            pack,
+        )
+    except ValueError as error:
+        print(f"ERROR: {error}")
+        sys.exit(1)
     except CalledProcessError:
-        print("Command install_brew_azl failed.")
+        print("Command install_all failed.")
+        sys.exit(1)
+    finally:
+        report.write(report_path)
+
+    print()
+    print_build_report(report)
+    print(f"Wrote the build report to {report_path}.")
+
+    if any(status != "succeeded" for status in statuses.values()):
+        print("Command install_all failed.")
+        sys.exit(1)
+
+
+def _run_install(command, pipeline, install):
+    # Runs one install pipeline after mounting EFS, as install_all does for both
+    filesystem_id = sys.argv[2]
+    builder = BuilderSession() if "--builder" in sys.argv[3:] else None
+    report = BuildReport(measure="--no-measure" not in sys.argv[3:])
+    report_path = _option_value("--report", BUILD_REPORT_FILENAME, str)
+
+    try:
+        mount(filesystem_id, CommandRunner("mount", report), _mount_options())
+        generation = install(CommandRunner(pipeline, report), builder)
+        report.finish_pipeline(pipeline, "succeeded", generation=generation)
+    except (FileNotFoundError, ValueError) as error:
+        report.finish_pipeline(pipeline, "failed", error=str(error))
+        print(f"ERROR: {error}")
+    except CalledProcessError as error:
+        report.finish_pipeline(pipeline, "failed", error=str(error))
+        print(f"Command {command} failed.")
+    finally:
+        if builder is not None:
+            builder.close()
+
+        report.write(report_path)
+
+    print(f"Wrote the build report to {report_path}.")
+
+    if report.pipelines[pipeline]["status"] != "succeeded":
+        sys.exit(1)
+
+
+def install_brew_azl():
+    if len(sys.argv) <= 2:
+        print_usage()
+        return
+
+    keep = _option_value("--keep", default_keep_generations)
+    closure = "--closure" in sys.argv[3:]
+    bottle_cache = _option_value("--bottle-cache", None, str)
+    local_build = _option_value("--local-build", None, str)
+
+    _run_install(
+        "install_brew_azl",
+        "brew",
+        lambda runner, builder: install_brew(
+            keep, runner, closure, bottle_cache, builder, local_build
+        ),
+    )
 
 
 def install_pip_azl():
@@ -43,27 +199,487 @@ def install_pip_azl():
         print_usage()
         return
 
-    filesystem_id = sys.argv[2]
+    incremental = "--incremental" in sys.argv[3:]
+    keep = _option_value("--keep", default_keep_generations)
+    wheelhouse = _option_value("--wheelhouse", None, str)
+    local_build = _option_value("--local-build", None, str)
+    runtime = _option_value("--runtime", None, str)
+    pack = "--pack" in sys.argv[3:]
+
+    _run_install(
+        "install_pip_azl",
+        "pip",
+        lambda runner, builder: install_pip(
+            incremental, keep, runner, wheelhouse, builder, local_build, runtime, pack
+        ),
+    )
+
+
+def postinstall_pip_command():
+    if len(sys.argv) <= 2:
+        print_usage()
+        return
+
+    postinstall_pip(sys.argv[2])
+
+
+def prune_command():
+    if len(sys.argv) <= 3 or sys.argv[3] not in PRUNE_KINDS:
+        print_usage()
+        return
+
+    config_path = _option_value("--config", None, str)
+    config = load_prune_config(config_path) if config_path else None
+    dry_run = "--dry-run" in sys.argv[4:]
+
+    print(f"Pruning {sys.argv[2]}{' (dry run)' if dry_run else ''}...")
+    report = prune(sys.argv[2], sys.argv[3], config, dry_run)
+    print_prune_report(report, dry_run)
+
+
+def extract_brew_closure_command():
+    if len(sys.argv) <= 3:
+        print_usage()
+        return
+
+    prefix = sys.argv[2]
+    brewfile = sys.argv[4] if len(sys.argv) > 4 else "Brewfile"
+    closure = compute_runtime_closure(prefix, read_brewfile_formulae(brewfile))
+    print_runtime_closure(closure)
+
+    if closure["unresolved"] or closure["missing_formulae"]:
+        print("Command extract_brew_closure failed.")
+        sys.exit(1)
+
+    result = publish_runtime_closure(prefix, closure, sys.argv[3])
+    print(
+        f"Published {result['libraries']} libraries and {result['executables']} "
+        f"executables ({result['bytes'] / 2 ** 20:.1f} MiB) to {sys.argv[3]}."
+    )
+
+
+def index_libraries_command():
+    if len(sys.argv) <= 2:
+        print_usage()
+        return
+
+    print(f"Wrote {write_library_index(sys.argv[2])}.")
+
+
+def write_install_id_command():
+    if len(sys.argv) <= 2:
+        print_usage()
+        return
+
+    print(f"Install ID: {write_install_id(sys.argv[2])}")
+
+
+def begin_generation_command():
+    if len(sys.argv) <= 3:
+        print_usage()
+        return
+
+    prefix = sys.argv[2]
+    generation = sys.argv[3]
+    directory = begin_generation(prefix, generation, seed="--seed" in sys.argv[4:])
+    print(f"Installing generation {generation} into {directory}...")
+
+
+def complete_generation_command():
+    if len(sys.argv) <= 2:
+        print_usage()
+        return
+
+    complete_generation(sys.argv[2])
+
+
+def switch_generation_command():
+    if len(sys.argv) <= 3:
+        print_usage()
+        return
+
+    prefix = sys.argv[2]
+    generation = sys.argv[3]
+
+    try:
+        switch_generation(prefix, generation)
+    except ValueError as error:
+        print(f"ERROR: {error}")
+        sys.exit(1)
+
+    print(f"{prefix} now points to generation {generation}.")
+
+
+def collect_generations_command():
+    if len(sys.argv) <= 2:
+        print_usage()
+        return
+
+    prefix = sys.argv[2]
+    keep = int(sys.argv[3]) if len(sys.argv) > 3 else default_keep_generations
+
+    for generation in collect_generations(prefix, keep):
+        print(f"Deleted generation {generation} of {prefix}.")
+
+
+def list_generations_command():
+    if len(sys.argv) <= 2:
+        print_usage()
+        return
+
+    prefix = sys.argv[2]
+    current = current_generation(prefix)
+
+    for generation in list_generations(prefix):
+        marker = "*" if generation == current else " "
+        print(f"{marker} {generation}  {generation_directory(prefix, generation)}")
+
+
+def dedup_command():
+    directories = sys.argv[2:] or default_dedup_directories(
+        [local_pip_prefix, local_brew_prefix]
+    )
+
+    print(f"Deduplicating {len(directories)} directories into {local_cas_directory}...")
+    print_dedup_result(dedup(directories, local_cas_directory))
+
+
+def pack_command():
+    if len(sys.argv) <= 2:
+        print_usage()
+        return
+
+    directory = sys.argv[2]
+    pack_path = sys.argv[3] if len(sys.argv) > 3 else None
+    real_directory = os.path.realpath(directory)
+    target = os.path.realpath(pack_path or default_pack_path(directory))
+
+    # The pack may still be written outside a complete generation
+    if is_complete(real_directory) and target.startswith(real_directory + os.sep):
+        print(
+            f"ERROR: {directory} is a complete generation, which must not be "
+            "modified.  Run install_pip_azl with --pack to pack a new generation."
+        )
+        sys.exit(1)
+
+    print(f"Packing {directory}...")
+    print(f"Wrote {write_pack(directory, pack_path)}.")
+
+
+def recommend_throughput_command():
+    if len(sys.argv) <= 3:
+        print_usage()
+        return
+
+    package_mib = _option_value("--package-mib", None, float)
+
+    if package_mib is None:
+        package_bytes = measure_package_bytes(
+            default_package_directories([local_pip_prefix, local_brew_prefix])
+        )
+    else:
+        package_bytes = int(package_mib * 2 ** 20)
+
+    print_throughput_recommendation(package_bytes, int(sys.argv[2]), float(sys.argv[3]))
+
+
+def plan_layers_command():
+    if len(sys.argv) <= 3:
+        print_usage()
+        return
+
+    layers = plan_layers(
+        sys.argv[2],
+        sys.argv[3],
+        _option_value("--max-layers", DEFAULT_MAX_LAYERS),
+        _option_value("--layer-mib", DEFAULT_LAYER_SIZE, float),
+        _option_value("--total-mib", DEFAULT_TOTAL_LAYER_SIZE, float),
+    )
+    print_layer_plan(layers)
+
+
+def mount_command():
+    if len(sys.argv) <= 2:
+        print_usage()
+        return
 
     try:
-        run(["sudo", "bash", mount_efs_sh, filesystem_id], check=True)
-        run(["sudo", "bash", install_pip_sh, filesystem_id], check=True)
+        mount(
+            sys.argv[2], options=_mount_options(), remount="--remount" in sys.argv[3:]
+        )
+    except ValueError as error:
+        print(f"ERROR: {error}")
+        sys.exit(1)
     except CalledProcessError:
-        print("Command install_pip_azl failed.")
+        print("Command mount failed.")
+        sys.exit(1)
+
 
+def bench_mount_command():
+    if len(sys.argv) <= 2:
+        print_usage()
+        return
+
+    compare_path = _option_value("--compare", None, str)
+    output_path = _option_value("--output", None, str)
+    baseline = load_mount_benchmark(compare_path) if compare_path else None
+    sequential_mib = _option_value("--sequential-mib", None, float)
+
+    result = bench_mount(
+        sys.argv[2],
+        _option_value("--files", DEFAULT_SMALL_FILES),
+        _option_value("--file-bytes", DEFAULT_SMALL_FILE_SIZE),
+        int(sequential_mib * 2 ** 20) if sequential_mib else DEFAULT_SEQUENTIAL_SIZE,
+    )
+    print_mount_benchmark(result, baseline)
+
+    if output_path:
+        write_mount_benchmark(result, output_path)
+        print(f"Wrote {output_path}.")
+
+
+def sync_command():
+    if len(sys.argv) <= 3:
+        print_usage()
+        return
 
-def print_usage():
+    source = sys.argv[2]
+    destination = sys.argv[3]
+    print(f"Syncing {source} to {destination}...")
+    result = sync_directories(
+        source,
+        destination,
+        _option_value("--workers", DEFAULT_SYNC_WORKERS),
+        checksum="--checksum" in sys.argv[4:],
+        delete="--keep-extra" not in sys.argv[4:],
+    )
+    print_sync_result(result)
+
+
+def _mount_options():
+    return efs_mount_options(
+        rsize=_option_value("--rsize", default_nfs_block_size),
+        wsize=_option_value("--wsize", default_nfs_block_size),
+        noresvport="--resvport" not in sys.argv[3:],
+        tls="--tls" in sys.argv[3:],
+        nconnect=_option_value("--nconnect", None),
+    )
+
+
+def _option_value(name, default, convert=int):
+    arguments = sys.argv[3:]
+
+    if name in arguments[:-1]:
+        return convert(arguments[arguments.index(name) + 1])
+
+    return default
+
+
+def print_usage():  # pylint: disable=too-many-statements
     print("Usage:")
     print()
-    print("  python -m pulumi_lambda_brew install_brew_azl [filesystem-id]")
+    print(
+        "  python -m pulumi_lambda_efs install_all [filesystem-id] [--incremental] [--keep N] [--wheelhouse DIR] [--brew-closure] [--bottle-cache DIR] [--builder] [--report FILE] [--no-measure] [--local-build DIR] [--runtime NAME] [--pack] [mount options]"
+    )
+    print("    Mounts the EFS filesystem once, then runs install_pip_azl and ")
+    print("    install_brew_azl at the same time, with each line of output ")
+    print("    prefixed by the install it comes from.  If either fails, the other ")
+    print("    is stopped, and the status of both is reported at the end.  ")
+    print("    --brew-closure is passed to install_brew_azl as --closure, ")
+    print("    --runtime and --pack to install_pip_azl, and --bottle-cache, ")
+    print("    --builder and --local-build as they are.  Also available as ")
+    print("    pulumi_lambda_efs.install.install_all.")
+    print()
+    print(
+        "  python -m pulumi_lambda_brew install_brew_azl [filesystem-id] [--keep N] "
+        "[--closure] [--bottle-cache DIR] [--builder] [--report FILE] [--no-measure] "
+        "[--local-build DIR] [mount options]"
+    )
     print("    Installs the Linuxbrew formulae specified in Brewfile to the EFS ")
     print("    dependencies directory, mounting it if necessary.  Designed to be ")
-    print("    run on an Amazon Linux EC2 instance.")
+    print("    run on an Amazon Linux EC2 instance.  Each Brewfile is installed ")
+    print("    into its own generation, which then becomes the current one.  The ")
+    print("    N most recent generations are kept (default 3).  With --closure, ")
+    print("    the formulae are installed into lambda_packages/linuxbrew_build and ")
+    print("    only their runtime closure is published to the generation.  ")
+    print("    Downloaded bottles are kept in the bottle cache directory, ")
+    print("    $LAMBDA_EFS_BOTTLE_CACHE or lambda_packages/brew_cache on EFS by ")
+    print("    default, and reused by later installs.")
     print()
-    print("  python -m pulumi_lambda_brew install_pip_azl [filesystem-id]")
+    print(
+        "  python -m pulumi_lambda_brew install_pip_azl [filesystem-id] [--incremental] [--keep N] [--wheelhouse DIR] [--builder] [--report FILE] [--no-measure] [--local-build DIR] [--runtime NAME] [--pack] [mount options]"
+    )
     print("    Installs the pip packages specified in requirements.txt to the EFS ")
     print("    dependencies directory, mounting it if necessary.  Designed to be ")
-    print("    run on an Amazon Linux EC2 instance.")
+    print("    run on an Amazon Linux EC2 instance.  Each requirements file is ")
+    print("    installed into its own generation, which then becomes the current ")
+    print("    one.  With --incremental, the new generation starts from the ")
+    print("    current one and only the distributions which differ are added, ")
+    print("    upgraded or removed.  The N most recent generations are kept ")
+    print("    (default 3).  Built wheels are kept in the wheelhouse directory, ")
+    print("    $LAMBDA_EFS_WHEELHOUSE or lambda_packages/wheelhouse on EFS by ")
+    print("    default, and reused by later installs; a pinned set installed ")
+    print("    before needs no network or builds.  The packages are installed and ")
+    print("    compiled to bytecode in the build image of the Lambda runtime NAME, ")
+    print(f"    ${PYTHON_RUNTIME_ENV} or {DEFAULT_PYTHON_RUNTIME} by default, which ")
+    print("    must be the runtime of the functions.  With --pack, or if the current ")
+    print("    generation was packed, the new one is packed as pack does before it ")
+    print("    becomes current.")
+    print()
+    print("  --builder")
+    print("    Runs every step of the install commands which needs the build ")
+    print("    images in one long-lived container per image, started when first ")
+    print("    needed and removed at the end, through docker exec.  Images are ")
+    print(f"    pinned by digest in {IMAGE_LOCK_FILENAME}, which is written on first ")
+    print("    use, and only pulled if they are not already on the host.")
+    print()
+    print("  --report FILE")
+    print("    The install commands run as a sequence of named steps, retrying ")
+    print("    those which need the network, and print the time each took and the ")
+    print("    files and bytes it wrote to EFS.  The steps and the result of each ")
+    print("    pipeline are written as JSON to FILE ")
+    print(f"    (default {BUILD_REPORT_FILENAME}).  ")
+    print("    With --no-measure, the EFS directories are not scanned, and only the ")
+    print("    time of each step is reported.")
+    print()
+    print("  --local-build DIR")
+    print("    Builds each generation in the pip, linuxbrew and linuxbrew_build ")
+    print("    directories under DIR, or $LAMBDA_EFS_LOCAL_BUILD, on local disk, ")
+    print("    starting from a copy of the generation on EFS, and then syncs it to ")
+    print("    EFS as sync does, so that the installers' many small writes stay off ")
+    print("    NFS.  Keeping DIR between builds means later copies from EFS only ")
+    print("    write what changed.")
+    print()
+    print(
+        "  python -m pulumi_lambda_efs sync [source] [destination] [--workers N] "
+        "[--checksum] [--keep-extra]"
+    )
+    print("    Makes the destination directory a copy of the source on N threads ")
+    print("    (default 16), copying only files whose size, permissions or ")
+    print("    modification time differ, or with --checksum, whose size, ")
+    print("    permissions or SHA-256 hash differ.  Files are replaced rather than ")
+    print("    modified, hard links and symbolic links are preserved, and anything ")
+    print("    not in the source is removed unless --keep-extra is given.  Reports ")
+    print("    the wall time and bytes copied.  Works between any two directories.")
+    print()
+    print(
+        "  python -m pulumi_lambda_efs mount [filesystem-id] [--remount] [mount options]"
+    )
+    print("    Mounts the EFS filesystem at /mnt/efs with the EFS mount helper, ")
+    print("    installing it with yum if necessary, unless it is already mounted.  ")
+    print("    With --remount, it is unmounted and mounted again with the options.  ")
+    print("    Fails if a different filesystem is mounted there.")
+    print()
+    print(
+        "  mount options: [--rsize N] [--wsize N] [--tls] [--nconnect N] [--resvport]"
+    )
+    print("    Used by mount and the install commands when they mount EFS.  Reads ")
+    print(f"    and writes are of N bytes (default {default_nfs_block_size}).  With ")
+    print("    --tls, traffic is encrypted through the mount helper's TLS tunnel.  ")
+    print("    --nconnect opens N TCP connections to the server, on kernels from ")
+    print("    5.3.  noresvport is used unless --resvport is given, so that the ")
+    print("    client reconnects from a new port after a network interruption.")
+    print()
+    print(
+        "  python -m pulumi_lambda_efs bench_mount [directory] [--files N] "
+        "[--file-bytes N] [--sequential-mib N] [--output FILE] [--compare FILE]"
+    )
+    print("    Measures how many small files per second can be created, stated, ")
+    print("    opened and read, and removed in the directory (default 1000 files of ")
+    print("    4096 bytes), and the MiB per second of writing and reading one large ")
+    print("    file (default 256 MiB), along with the mount and its options.  Works ")
+    print("    on any directory, including local disk.  Run as root to drop the ")
+    print("    page cache before reading.  --output writes the results as JSON, and ")
+    print("    --compare shows the change from the results in an earlier file.")
+    print()
+    print("  python -m pulumi_lambda_efs postinstall_pip [directory]")
+    print("    Installs the runtime helpers and writes the module index for a pip ")
+    print("    prefix.  Run automatically by install_pip_azl.")
+    print()
+    print(
+        "  python -m pulumi_lambda_efs prune [directory] [pip|brew] [--config FILE] "
+        "[--dry-run]"
+    )
+    print("    Removes tests, documentation, headers, static archives and other ")
+    print("    files which functions do not use from a pip or Linuxbrew prefix, ")
+    print("    strips its native libraries, and reports the files and bytes saved ")
+    print("    for each package.  The rules are read from the given prune.json, on ")
+    print("    top of the defaults.  With --dry-run, nothing is changed.  Run ")
+    print("    automatically by the install commands, with the prune.json in the ")
+    print("    current directory if there is one.")
+    print()
+    print(
+        "  python -m pulumi_lambda_efs extract_brew_closure [brew-prefix] "
+        "[output-directory] [Brewfile]"
+    )
+    print("    Copies the runtime closure of the formulae in the Brewfile from a ")
+    print("    Linuxbrew prefix to the output directory: their libraries, and those ")
+    print("    they need by DT_NEEDED, in lib, their executables in bin and their ")
+    print("    data in share.  Fails, listing them, if any needed library cannot be ")
+    print("    found.  Run automatically by install_brew_azl --closure.")
+    print()
+    print("  python -m pulumi_lambda_efs index_libraries [directory]")
+    print("    Writes the shared library index used by the fast find_library for ")
+    print("    a Linuxbrew prefix.  Run automatically by install_brew_azl.")
+    print()
+    print("  python -m pulumi_lambda_efs write_install_id [directory]")
+    print("    Writes the ID which /tmp caches use to detect that an EFS prefix has ")
+    print("    been reinstalled.  Run automatically by the install commands.")
+    print()
+    print(
+        "  python -m pulumi_lambda_efs begin_generation [prefix] [generation] [--seed]"
+    )
+    print("    Creates the directory for a new install generation of a prefix, ")
+    print("    hard linked to the current one with --seed.  Run automatically by ")
+    print("    the install commands.")
+    print()
+    print("  python -m pulumi_lambda_efs complete_generation [directory]")
+    print("    Marks a generation as complete, after which it is never modified.  ")
+    print("    Run automatically by the install commands.")
+    print()
+    print("  python -m pulumi_lambda_efs switch_generation [prefix] [generation]")
+    print("    Atomically points a prefix at one of its complete generations, for ")
+    print("    instance to roll back an install.")
+    print()
+    print("  python -m pulumi_lambda_efs collect_generations [prefix] [keep]")
+    print("    Deletes all but the most recent generations of a prefix, other than ")
+    print("    the current one.  Generations pinned by functions must be kept.")
+    print()
+    print("  python -m pulumi_lambda_efs list_generations [prefix]")
+    print("    Lists the complete generations of a prefix, newest first, marking ")
+    print("    the current one with *.")
+    print()
+    print("  python -m pulumi_lambda_efs dedup [directory ...]")
+    print("    Hard links identical files in the given directories, by default ")
+    print("    every complete pip and Linuxbrew generation, to a content-addressed ")
+    print("    store in lambda_packages/cas on the mounted EFS, and reports the ")
+    print("    bytes saved.  Must be run as root.")
+    print()
+    print("  python -m pulumi_lambda_efs pack [directory] [pack-file]")
+    print("    Packs a pip prefix into a single indexed file, by default inside the ")
+    print("    prefix.  Complete install generations are never modified, so the ")
+    print("    pack of a generation is written by install_pip_azl --pack instead.")
+    print()
+    print(
+        "  python -m pulumi_lambda_efs recommend_throughput [concurrent-cold-starts] "
+        "[target-init-seconds] [--package-mib N]"
+    )
+    print("    Recommends the EFS provisioned throughput for the given number of ")
+    print("    functions starting at once, each reading the installed packages ")
+    print("    within the target time.  The packages are measured in the current ")
+    print("    pip and Linuxbrew generations on the mounted EFS, unless their size ")
+    print("    is given in MiB.")
+    print()
+    print(
+        "  python -m pulumi_lambda_efs plan_layers [pip-directory] [profile.json] "
+        "[--max-layers N] [--layer-mib N] [--total-mib N]"
+    )
+    print("    Shows which distributions in a locally installed pip prefix ")
+    print("    get_hybrid_function_args would move into Lambda layers, given the ")
+    print("    import time of each top level module in the profile, such as the ")
+    print("    ImportTimes of a cold start metrics line.  The hottest distributions ")
+    print("    per byte are chosen, in at most N layers (default 5) of at most N MiB ")
+    print("    each (default 100) and N MiB in total (default 200).")
     print()
 
 
@@ -1,30 +1,11 @@
 #!/bin/sh
 
-if [ "$#" -ne 1 ]; then
-    echo "Usage: $0 [efs_filesystem_id]"
-    exit 1
-fi
-
-EFS_ID=$1
-EFS_BREW_PREFIX=/lambda_packages/linuxbrew
-LOCAL_BREW_PREFIX=/mnt/efs${EFS_BREW_PREFIX}
-
-if [ ! -d ${LOCAL_BREW_PREFIX}/Homebrew ]; then
-    echo "Initializing Linuxbrew prefix into ${LOCAL_BREW_PREFIX}..."
-    sudo mkdir -p ${LOCAL_BREW_PREFIX} || exit 1
-    sudo docker run \
-        -v ${LOCAL_BREW_PREFIX}:/newprefix \
-        nuagestudio/amazonlinuxbrew bash -c "sudo cp -a /home/linuxbrew/.linuxbrew/* /newprefix" \
-        || exit 1
-fi;
-
-
+# Installs the Brewfile in /inputdir into the Linuxbrew prefix.  Runs inside the
+# Linuxbrew image, either in a container of its own started for the step or in
+# a builder session's long-lived container.
 
 DOCKER_BREW_PREFIX="/home/linuxbrew/.linuxbrew"
 
-
-SCRIPT="
-
 if [ ! -f /inputdir/Brewfile ]; then
   echo 'ERROR: Cannot find Brewfile in local directory';
   exit 1;
@@ -47,13 +28,3 @@ cp /inputdir/Brewfile .;
 brew bundle;
 
 echo 'Done.';
-"
-
-echo "Launching Docker...";
-
-# Run docker to install contents of brewfile
-docker run \
-    -v $(pwd):/inputdir \
-    -v ${LOCAL_BREW_PREFIX}:${DOCKER_BREW_PREFIX} \
-    nuagestudio/amazonlinuxbrew bash -c "${SCRIPT}" \
-    || exit 1
@@ -0,0 +1,76 @@
+"""
+Compiles every module under a directory to unchecked hash-based bytecode, skipping
+modules whose existing bytecode was already compiled that way from the same source.
+
+Run inside the build container by the `compile_pip` install step, so that the
+bytecode matches the Lambda interpreter.  Unlike `compileall`, which only recognises
+timestamp-based bytecode as up to date, only the modules which changed since the
+last install are recompiled, so incremental installs stay proportional to the
+change.
+
+Usage: compile_pip.py [directory]
+"""
+
+import os
+import py_compile
+import sys
+from importlib.util import MAGIC_NUMBER, cache_from_source, source_hash
+
+# Bytecode flags for a hash-based pyc which is not checked against its source
+UNCHECKED_HASH_FLAGS = (1).to_bytes(4, "little")
+
+
+def is_up_to_date(source, cache_path):
+    try:
+        with open(cache_path, "rb") as cache_file:
+            header = cache_file.read(16)
+    except OSError:
+        return False
+
+    return header == MAGIC_NUMBER + UNCHECKED_HASH_FLAGS + source_hash(source)
+
+
+def main():
+    if len(sys.argv) != 2:
+        print(f"Usage: {sys.argv[0]} [directory]")
+        sys.exit(1)
+
+    compiled = 0
+    unchanged = 0
+    failed = 0
+
+    for root, directories, file_names in os.walk(sys.argv[1]):
+        directories[:] = [name for name in directories if name != "__pycache__"]
+
+        for file_name in file_names:
+            if not file_name.endswith(".py"):
+                continue
+
+            source_path = os.path.join(root, file_name)
+            cache_path = cache_from_source(source_path)
+
+            with open(source_path, "rb") as source_file:
+                source = source_file.read()
+
+            if is_up_to_date(source, cache_path):
+                unchanged += 1
+                continue
+
+            try:
+                py_compile.compile(
+                    source_path,
+                    cfile=cache_path,
+                    doraise=True,
+                    invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+                )
+                compiled += 1
+            except py_compile.PyCompileError:
+                # Packages often ship files which are not meant to be imported,
+                # such as templates or code for other Python versions
+                failed += 1
+
+    print(f"{compiled} compiled, {unchanged} unchanged, {failed} not compilable.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+Brings a `pip install --target` prefix in line with a requirements file by changing
+only the distributions which differ, rather than reinstalling all of them.
+
+Run inside the build container by pip_install.sh.  It resolves the requirements
+without installing anything, compares the result with the `.dist-info` directories
+already in the prefix, removes dropped and outdated distributions file by file using
+their RECORD, and installs the new and upgraded ones into a staging directory which
+is then merged into the prefix.
+
+Given a wheelhouse, distributions are resolved and installed from it without the
+index, after adding any wheels it is missing as wheelhouse_pip.py does.
+
+Usage: incremental_pip.py [requirements_file] [target] [cache_directory] [wheelhouse]
+"""
+
+import csv
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+# Not a package import: the script is run by path, which puts the directory of the
+# scripts first on sys.path
+from wheelhouse_pip import (  # pylint: disable=import-error
+    fill_wheelhouse,
+    is_pinned,
+    offline_options,
+)
+
+
+def canonical_name(name):
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def resolve(requirements_file, cache_directory, index_options=()):
+    """
+    Returns the distributions pip would install for `requirements_file` into an
+    empty environment, as a mapping of canonical name to (version, requirement).
+    `index_options` are passed to pip to choose where distributions are found.
+    """
+    with tempfile.TemporaryDirectory() as work_directory:
+        report_path = os.path.join(work_directory, "report.json")
+        subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "pip",
+                "install",
+                "--quiet",
+                "--dry-run",
+                "--ignore-installed",
+                "--target",
+                os.path.join(work_directory, "target"),
+                "--report",
+                report_path,
+                "--cache-dir",
+                cache_directory,
+                *index_options,
+                "-r",
+                requirements_file,
+            ],
+            check=True,
+        )
+
+        with open(report_path) as report_file:
+            report = json.load(report_file)
+
+    resolved = {}
+
+    for item in report["install"]:
+        name = item["metadata"]["name"]
+        version = item["metadata"]["version"]
+        resolved[canonical_name(name)] = (version, _requirement(name, version, item))
+
+    return resolved
+
+
+def _requirement(name, version, item):
+    download_info = item.get("download_info", {})
+    url = download_info.get("url")
+
+    if "vcs_info" in download_info:
+        vcs_info = download_info["vcs_info"]
+        return f"{name} @ {vcs_info['vcs']}+{url}@{vcs_info['commit_id']}"
+
+    if item.get("is_direct"):
+        return f"{name} @ {url}"
+
+    return f"{name}=={version}"
+
+
+def installed_distributions(target_directory):
+    """
+    Returns the distributions in `target_directory`, as a mapping of canonical name
+    to (version, dist-info directory).
+    """
+    distributions = {}
+
+    for entry in os.listdir(target_directory):
+        metadata_path = os.path.join(target_directory, entry, "METADATA")
+
+        if not entry.endswith(".dist-info") or not os.path.isfile(metadata_path):
+            continue
+
+        headers = {}
+
+        with open(metadata_path, encoding="utf-8", errors="replace") as metadata:
+            for line in metadata:
+                if not line.strip():
+                    break
+
+                key, _, value = line.partition(":")
+                headers.setdefault(key.strip().lower(), value.strip())
+
+        if "name" in headers:
+            distributions[canonical_name(headers["name"])] = (
+                headers.get("version", ""),
+                os.path.join(target_directory, entry),
+            )
+
+    return distributions
+
+
+def remove_distribution(target_directory, dist_info_directory):
+    """
+    Removes every file listed in the distribution's RECORD, along with bytecode
+    compiled from it and directories left empty, and then the dist-info directory.
+    """
+    record_path = os.path.join(dist_info_directory, "RECORD")
+    target_directory = os.path.realpath(target_directory)
+    directories = set()
+
+    if os.path.isfile(record_path):
+        with open(record_path, newline="", encoding="utf-8") as record:
+            for row in csv.reader(record):
+                if not row:
+                    continue
+
+                # pip --target records scripts relative to its temporary library
+                # directory, and then moves them into the target's bin directory
+                relative_path = re.sub(r"^(\.\./)+bin/", "bin/", row[0])
+                path = os.path.realpath(os.path.join(target_directory, relative_path))
+
+                if not path.startswith(target_directory + os.sep):
+                    continue
+
+                _remove_file(path)
+                directories.add(os.path.dirname(path))
+
+                if path.endswith(".py"):
+                    _remove_bytecode(path)
+
+    shutil.rmtree(dist_info_directory, ignore_errors=True)
+
+    # Deepest first, so that nested empty directories are all removed
+    for directory in sorted(directories, key=len, reverse=True):
+        for candidate in (os.path.join(directory, "__pycache__"), directory):
+            while candidate.startswith(target_directory + os.sep):
+                try:
+                    os.rmdir(candidate)
+                except OSError:
+                    break
+
+                candidate = os.path.dirname(candidate)
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _remove_bytecode(source_path):
+    directory, file_name = os.path.split(source_path)
+    cache_directory = os.path.join(directory, "__pycache__")
+    prefix = file_name[: -len(".py")] + "."
+
+    if os.path.isdir(cache_directory):
+        for cache_name in os.listdir(cache_directory):
+            if cache_name.startswith(prefix) and cache_name.endswith(".pyc"):
+                _remove_file(os.path.join(cache_directory, cache_name))
+
+
+def install(requirements, target_directory, cache_directory, index_options=()):
+    """
+    Installs `requirements` without their dependencies into a staging directory,
+    then copies the result into `target_directory`.  Installing into the target
+    directly would make pip skip or replace whole top level directories, which are
+    shared by namespace packages.
+    """
+    with tempfile.TemporaryDirectory() as staging_directory:
+        subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "pip",
+                "install",
+                "--quiet",
+                "--no-deps",
+                "--no-compile",
+                "--target",
+                staging_directory,
+                "--cache-dir",
+                cache_directory,
+                *index_options,
+                *requirements,
+            ],
+            check=True,
+        )
+
+        for root, _, file_names in os.walk(staging_directory):
+            relative_root = os.path.relpath(root, staging_directory)
+            target_root = os.path.normpath(
+                os.path.join(target_directory, relative_root)
+            )
+            os.makedirs(target_root, exist_ok=True)
+
+            for file_name in file_names:
+                target_path = os.path.join(target_root, file_name)
+
+                # The target may be hard linked to the previous install generation,
+                # so it is replaced rather than overwritten
+                _remove_file(target_path)
+                shutil.copy2(
+                    os.path.join(root, file_name), target_path, follow_symlinks=False
+                )
+
+
+def main():
+    if len(sys.argv) not in (4, 5):
+        print(
+            f"Usage: {sys.argv[0]} [requirements_file] [target] [cache_directory] "
+            "[wheelhouse]"
+        )
+        sys.exit(1)
+
+    requirements_file = sys.argv[1]
+    target_directory = sys.argv[2]
+    cache_directory = sys.argv[3]
+    wheelhouse = sys.argv[4] if len(sys.argv) == 5 else None
+    index_options = offline_options(wheelhouse) if wheelhouse else []
+
+    if wheelhouse:
+        resolved = None
+
+        if is_pinned(requirements_file):
+            try:
+                resolved = resolve(requirements_file, cache_directory, index_options)
+            except subprocess.CalledProcessError:
+                pass
+
+        if resolved is None:
+            fill_wheelhouse(requirements_file, wheelhouse, cache_directory)
+            resolved = resolve(requirements_file, cache_directory, index_options)
+    else:
+        resolved = resolve(requirements_file, cache_directory)
+
+    installed = installed_distributions(target_directory)
+
+    added = sorted(name for name in resolved if name not in installed)
+    upgraded = sorted(
+        name
+        for name in resolved
+        if name in installed and installed[name][0] != resolved[name][0]
+    )
+    removed = sorted(name for name in installed if name not in resolved)
+
+    for name in added:
+        print(f"  add      {name} {resolved[name][0]}")
+
+    for name in upgraded:
+        print(f"  upgrade  {name} {installed[name][0]} -> {resolved[name][0]}")
+
+    for name in removed:
+        print(f"  remove   {name} {installed[name][0]}")
+
+    print(
+        f"{len(added)} to add, {len(upgraded)} to upgrade, {len(removed)} to remove, "
+        f"{len(resolved) - len(added) - len(upgraded)} unchanged."
+    )
+
+    for name in upgraded + removed:
+        remove_distribution(target_directory, installed[name][1])
+
+    if added or upgraded:
+        install(
+            [resolved[name][1] for name in added + upgraded],
+            target_directory,
+            cache_directory,
+            index_options,
+        )
+
+
+if __name__ == "__main__":
+    main()
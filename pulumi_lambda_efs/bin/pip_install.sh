@@ -0,0 +1,27 @@
+#!/bin/sh
+
+# Installs the requirements.txt in /inputdir into the pip prefix at /pip, fully or
+# incrementally.  Runs inside the Python image, either in a container of its own
+# started for the step or in a builder session's long-lived container.
+#
+# Usage: pip_install.sh [full|incremental]
+
+DOCKER_PIP_PREFIX=/pip
+DOCKER_PIP_CACHE_PREFIX=/pip_cache
+DOCKER_WHEELHOUSE_PREFIX=/wheelhouse
+
+if [ ! -f /inputdir/requirements.txt ]; then
+  echo 'ERROR: Cannot find requirements.txt in local directory';
+  exit 1;
+fi;
+
+if [ "$1" = 'incremental' ]; then
+    echo 'Updating pip packages incrementally...'
+    pip install -q --upgrade pip || exit 1
+    python /scripts/incremental_pip.py /inputdir/requirements.txt ${DOCKER_PIP_PREFIX} ${DOCKER_PIP_CACHE_PREFIX} ${DOCKER_WHEELHOUSE_PREFIX} || exit 1
+else
+    echo 'Invoking pip...'
+    python /scripts/wheelhouse_pip.py /inputdir/requirements.txt ${DOCKER_PIP_PREFIX} ${DOCKER_PIP_CACHE_PREFIX} ${DOCKER_WHEELHOUSE_PREFIX} || exit 1
+fi
+
+echo 'Done.';
@@ -0,0 +1,118 @@
+"""
+Installs a requirements file into a `pip install --target` prefix from a persistent
+wheelhouse, building and adding only the wheels which are missing from it.
+
+Run inside the build container by pip_install.sh.  The pip cache only keeps
+downloads, so distributions without a compatible wheel on the index would be built
+from source on every install.  The wheelhouse keeps the built wheels, named as
+usual by distribution, version, Python, ABI and platform tag, so a wheel is only
+reused by the interpreter and platform it was built for.  When every requirement
+is pinned, the install is first attempted from the wheelhouse alone, without
+contacting the index; a fully pinned set which was installed before is therefore
+installed without resolving anything over the network or compiling anything.
+
+Usage: wheelhouse_pip.py [requirements_file] [target] [cache_directory] [wheelhouse]
+"""
+
+import subprocess
+import sys
+
+
+def is_pinned(requirements_file):
+    """
+    Returns whether every requirement in `requirements_file` names an exact version,
+    so that the wheelhouse cannot hold an older match than the index.  Options such
+    as nested requirements files count as unpinned.
+    """
+    with open(requirements_file) as requirements:
+        for line in requirements:
+            requirement = line.split("#", 1)[0].strip()
+
+            if not requirement:
+                continue
+
+            if requirement.startswith("-") or "==" not in requirement:
+                return False
+
+    return True
+
+
+def offline_options(wheelhouse):
+    """
+    Returns the pip options which restrict it to the wheels in the wheelhouse, so
+    that nothing is fetched from the index or built from source.
+    """
+    return ["--no-index", "--only-binary", ":all:", "--find-links", wheelhouse]
+
+
+def pip(*args, quiet=False):
+    """
+    Runs pip with `args` and returns whether it succeeded.  With `quiet`, its
+    errors are hidden, for attempts which are expected to fail on a cache miss.
+    """
+    result = subprocess.run(
+        [sys.executable, "-m", "pip", *args],
+        stderr=subprocess.DEVNULL if quiet else None,
+        check=False,
+    )
+    return result.returncode == 0
+
+
+def fill_wheelhouse(requirements_file, wheelhouse, cache_directory):
+    """
+    Adds a wheel for every distribution `requirements_file` resolves to which is
+    not in the wheelhouse yet, downloading or building it.  Wheels already in the
+    wheelhouse are preferred over building the same version again.
+    """
+    print("Building missing wheels...", flush=True)
+
+    if not pip(
+        "wheel",
+        "--quiet",
+        "--wheel-dir",
+        wheelhouse,
+        "--find-links",
+        wheelhouse,
+        "--cache-dir",
+        cache_directory,
+        "-r",
+        requirements_file,
+    ):
+        sys.exit(1)
+
+
+def main():
+    if len(sys.argv) != 5:
+        print(
+            f"Usage: {sys.argv[0]} [requirements_file] [target] [cache_directory] "
+            "[wheelhouse]"
+        )
+        sys.exit(1)
+
+    requirements_file = sys.argv[1]
+    target_directory = sys.argv[2]
+    cache_directory = sys.argv[3]
+    wheelhouse = sys.argv[4]
+    install_options = [
+        "install",
+        "--quiet",
+        "--no-compile",
+        "--target",
+        target_directory,
+        *offline_options(wheelhouse),
+        "-r",
+        requirements_file,
+    ]
+
+    if is_pinned(requirements_file) and pip(*install_options, quiet=True):
+        print("Installed from the wheelhouse.")
+        return
+
+    fill_wheelhouse(requirements_file, wheelhouse, cache_directory)
+
+    if not pip(*install_options):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""
+Extraction of the runtime closure of the formulae in a Brewfile from a Linuxbrew
+prefix.
+
+A Linuxbrew prefix holds Linuxbrew itself, compilers, binutils and every build
+dependency of the formulae installed in it, while functions only load the shared
+libraries of the formulae they use and the libraries those need.  The closure
+starts from the shared libraries and executables of each formula in the Brewfile,
+and follows the `DT_NEEDED` entries of their dynamic sections, resolving each
+soname the way the dynamic linker would: through the object's `RPATH` or
+`RUNPATH`, with the Linuxbrew prefix inside the build container mapped to the one
+being read, and then the prefix's `lib` directory.
+
+Sonames of the C library are always left to the system, and those in
+`SYSTEM_SONAMES` are left to it if Linuxbrew does not provide them.  Any other
+soname which cannot be resolved is reported, so that a missing library fails the
+build rather than the function.
+
+The closure is published as a prefix of its own: the libraries in `lib` under the
+names the prefix's `lib` directory gives them, the executables of the formulae in
+`bin`, and their data files in `share`, which libraries such as proj read at run
+time.
+"""
+
+import os
+import re
+import shutil
+from collections import deque
+from fnmatch import fnmatchcase
+from typing import Dict, List
+
+from .runtime.elf import ELF_MAGIC, read_dynamic
+
+# The prefix which Linuxbrew bottles are built for, and which their paths refer to
+CONTAINER_BREW_PREFIX = "/home/linuxbrew/.linuxbrew"
+
+# Parts of the C library, which must come from the system the function runs on
+C_LIBRARY_SONAMES = [
+    "ld-linux*.so.*",
+    "libc.so.*",
+    "libcrypt.so.*",
+    "libdl.so.*",
+    "libm.so.*",
+    "libnsl.so.*",
+    "libpthread.so.*",
+    "libresolv.so.*",
+    "librt.so.*",
+    "libutil.so.*",
+]
+
+# Libraries which the Lambda runtime provides, if Linuxbrew has no newer version
+SYSTEM_SONAMES = ["libgcc_s.so.*", "libstdc++.so.*", "libz.so.*"]
+
+_BREWFILE_FORMULA = re.compile(r"""^\s*brew\s+["']([^"']+)["']""")
+
+
+def read_brewfile_formulae(brewfile_path: str) -> List[str]:
+    """
+    Returns the names of the formulae installed by the Brewfile at `brewfile_path`,
+    without their tap.
+    """
+    formulae = []
+
+    with open(brewfile_path) as brewfile:
+        for line in brewfile:
+            match = _BREWFILE_FORMULA.match(line)
+
+            if not match:
+                continue
+
+            formula = match.group(1).rsplit("/", 1)[-1]
+
+            if formula not in formulae:
+                formulae.append(formula)
+
+    return formulae
+
+
+def _is_elf(path):
+    if not os.path.isfile(path):
+        return False
+
+    with open(path, "rb") as elf_file:
+        return elf_file.read(len(ELF_MAGIC)) == ELF_MAGIC
+
+
+def _formula_files(keg_directory, subdirectory):
+    directory = os.path.join(keg_directory, subdirectory)
+
+    for root, _, file_names in os.walk(directory):
+        for file_name in sorted(file_names):
+            yield os.path.join(root, file_name)
+
+
+def _search_directories(prefix, path, dynamic):
+    directories = []
+
+    for entry in (dynamic.rpath, dynamic.runpath):
+        for directory in (entry or "").split(":"):
+            if not directory:
+                continue
+
+            directory = directory.replace("$ORIGIN", os.path.dirname(path))
+            directory = directory.replace("${ORIGIN}", os.path.dirname(path))
+
+            if directory.startswith(CONTAINER_BREW_PREFIX):
+                directory = prefix + directory.replace(CONTAINER_BREW_PREFIX, "", 1)
+
+            directories.append(directory)
+
+    directories.append(os.path.join(prefix, "lib"))
+    return directories
+
+
+def _resolve(prefix, soname, path, dynamic):
+    real_prefix = os.path.realpath(prefix)
+
+    for directory in _search_directories(prefix, path, dynamic):
+        candidate = os.path.join(directory, soname)
+        real_candidate = os.path.realpath(candidate)
+
+        if real_candidate.startswith(real_prefix + os.sep) and os.path.isfile(
+            real_candidate
+        ):
+            return real_candidate
+
+    return None
+
+
+def _matches_any(soname, patterns):
+    return any(fnmatchcase(soname, pattern) for pattern in patterns)
+
+
+def compute_runtime_closure(prefix: str, formulae: List[str]) -> Dict:
+    """
+    Computes the runtime closure of `formulae` in the Linuxbrew prefix at
+    `prefix`.  Returns the real paths of the formulae's executables and data
+    directories, the libraries in the closure, the sonames left to the system,
+    the sonames which could not be resolved with the objects which need them,
+    and the formulae which are not installed.
+    """
+    closure = {
+        "executables": [],
+        "share": [],
+        "libraries": {},
+        "system": set(),
+        "unresolved": {},
+        "missing_formulae": [],
+    }
+    queue = deque()
+    seen = set()
+    executables = set()
+
+    def add(path):
+        real_path = os.path.realpath(path)
+
+        if real_path not in seen:
+            seen.add(real_path)
+            queue.append(real_path)
+
+    for formula in formulae:
+        keg_directory = os.path.realpath(os.path.join(prefix, "opt", formula))
+
+        if not os.path.isdir(keg_directory):
+            closure["missing_formulae"].append(formula)
+            continue
+
+        for path in _formula_files(keg_directory, "lib"):
+            name = os.path.basename(path)
+
+            if (name.endswith(".so") or ".so." in name) and _is_elf(path):
+                add(path)
+
+        for path in _formula_files(keg_directory, "bin"):
+            closure["executables"].append(path)
+
+            if _is_elf(path):
+                executables.add(os.path.realpath(path))
+                add(path)
+
+        share_directory = os.path.join(keg_directory, "share")
+
+        if os.path.isdir(share_directory):
+            closure["share"].append(share_directory)
+
+    while queue:
+        path = queue.popleft()
+        dynamic = read_dynamic(path)
+
+        if path not in executables:
+            closure["libraries"].setdefault(path, dynamic and dynamic.soname)
+
+        if dynamic is None:
+            continue
+
+        for soname in dynamic.needed:
+            resolved = _add_needed(closure, prefix, soname, path, dynamic)
+
+            if resolved is not None:
+                add(resolved)
+
+    return closure
+
+
+def _add_needed(closure, prefix, soname, path, dynamic):
+    # Returns the library which `soname` resolves to in the prefix, if any
+    if _matches_any(soname, C_LIBRARY_SONAMES):
+        closure["system"].add(soname)
+        return None
+
+    resolved = _resolve(prefix, soname, path, dynamic)
+
+    if resolved is not None:
+        closure["libraries"].setdefault(resolved, soname)
+    elif _matches_any(soname, SYSTEM_SONAMES):
+        closure["system"].add(soname)
+    else:
+        needed_by = os.path.relpath(path, os.path.realpath(prefix))
+        closure["unresolved"].setdefault(soname, []).append(needed_by)
+
+    return resolved
+
+
+def _copy_tree(source, target):
+    for root, directories, file_names in os.walk(source):
+        target_root = os.path.join(target, os.path.relpath(root, source))
+        os.makedirs(target_root, exist_ok=True)
+
+        for name in directories + file_names:
+            source_path = os.path.join(root, name)
+            target_path = os.path.join(target_root, name)
+
+            if os.path.islink(source_path):
+                if not os.path.lexists(target_path):
+                    os.symlink(os.readlink(source_path), target_path)
+            elif name in file_names and not os.path.exists(target_path):
+                shutil.copy2(source_path, target_path)
+
+
+def publish_runtime_closure(prefix: str, closure: Dict, output_directory: str) -> Dict:
+    """
+    Copies the closure computed by `compute_runtime_closure` from the Linuxbrew
+    prefix at `prefix` into `output_directory`, and returns the number of
+    libraries and executables published and their size.  Every name under which
+    the prefix's `lib` directory links a library in the closure is kept, along with
+    its soname.
+    """
+    library_directory = os.path.join(output_directory, "lib")
+    bin_directory = os.path.join(output_directory, "bin")
+    os.makedirs(library_directory, exist_ok=True)
+    os.makedirs(bin_directory, exist_ok=True)
+
+    published = {}
+    size = 0
+
+    for path, soname in sorted(closure["libraries"].items()):
+        file_name = os.path.basename(path)
+
+        if file_name in published.values():
+            print(f"WARNING: {path} has the same name as another library, skipping")
+            continue
+
+        shutil.copy2(path, os.path.join(library_directory, file_name))
+        published[path] = file_name
+        size += os.path.getsize(path)
+
+        if soname and soname != file_name:
+            link_path = os.path.join(library_directory, soname)
+
+            if not os.path.lexists(link_path):
+                os.symlink(file_name, link_path)
+
+    prefix_library_directory = os.path.join(prefix, "lib")
+
+    for name in sorted(os.listdir(prefix_library_directory)):
+        link_path = os.path.join(library_directory, name)
+        target = os.path.realpath(os.path.join(prefix_library_directory, name))
+
+        if target in published and not os.path.lexists(link_path):
+            os.symlink(published[target], link_path)
+
+    for path in closure["executables"]:
+        target_path = os.path.join(bin_directory, os.path.basename(path))
+        shutil.copy2(path, target_path)
+        size += os.path.getsize(target_path)
+
+    for share_directory in closure["share"]:
+        _copy_tree(share_directory, os.path.join(output_directory, "share"))
+
+    return {
+        "libraries": len(published),
+        "executables": len(closure["executables"]),
+        "bytes": size,
+    }
+
+
+def print_runtime_closure(closure: Dict):
+    print(f"{len(closure['libraries'])} libraries in the runtime closure:")
+
+    for path, soname in sorted(closure["libraries"].items()):
+        print(f"  {soname or os.path.basename(path)}  {path}")
+
+    if closure["system"]:
+        print(f"Left to the system: {', '.join(sorted(closure['system']))}")
+
+    for formula in closure["missing_formulae"]:
+        print(f"ERROR: formula {formula} is not installed")
+
+    for soname, needed_by in sorted(closure["unresolved"].items()):
+        print(f"ERROR: {soname} cannot be resolved, needed by {', '.join(needed_by)}")
@@ -0,0 +1,17 @@
+"""
+The build caches which the install commands can keep off EFS.
+
+A CodeBuild project created with `local_install_caches` keeps
+`BUILD_CACHE_DIRECTORY` on the build host between builds, and passes the
+directories inside it for the pip wheelhouse and the Linuxbrew bottle cache to the
+install commands through `WHEELHOUSE_ENV` and `BOTTLE_CACHE_ENV`.  Without them,
+both caches are kept on EFS.
+"""
+
+# The build's local custom cache must include this directory
+BUILD_CACHE_DIRECTORY = "/root/.cache/lambda_efs"
+
+# Directories which override the default wheelhouse and Linuxbrew bottle cache on
+# EFS, such as those which a CodeBuild project keeps in its local cache
+WHEELHOUSE_ENV = "LAMBDA_EFS_WHEELHOUSE"
+BOTTLE_CACHE_ENV = "LAMBDA_EFS_BOTTLE_CACHE"
@@ -0,0 +1,260 @@
+"""
+Long-lived build containers, shared by every step of an install session.
+
+Without a session, each install step starts a container of its own with
+`docker run`, which resolves the image tag against the registry, creates the
+container and sets up its bind mounts over NFS every time.  A `BuilderSession`
+starts one container for each image the first time a step needs it, with the EFS
+directories mounted, and runs every later step in it through `docker exec`.  The
+container is only replaced if a step needs different mounts.
+
+Images are pinned by digest in `images.lock.json` in the current directory, which
+is written the first time an image is used, so every session builds with the same
+images until the file is changed or deleted.  A pinned image which is already on
+the host is used without contacting the registry.
+"""
+
+import json
+import os
+import threading
+from subprocess import DEVNULL, PIPE, run
+from typing import Dict, List
+
+IMAGE_LOCK_FILENAME = "images.lock.json"
+
+_lock_file_lock = threading.Lock()
+
+
+def _image_exists(image):
+    result = run(
+        ["sudo", "docker", "image", "inspect", image],
+        stdout=DEVNULL,
+        stderr=DEVNULL,
+        check=False,
+    )
+    return result.returncode == 0
+
+
+def _repository(image):
+    repository, _, tag = image.rpartition(":")
+
+    # A colon inside the last path component separates the tag, and any other one
+    # a registry port
+    if repository and "/" not in tag:
+        return repository
+
+    return image
+
+
+def _read_pins(lock_path):
+    if not os.path.isfile(lock_path):
+        return {}
+
+    with open(lock_path) as lock_file:
+        return json.load(lock_file)
+
+
+def pin_image(image: str, runner, lock_path: str = IMAGE_LOCK_FILENAME) -> str:
+    """
+    Returns `image` pinned to a digest, from the lock file at `lock_path` if it has
+    one for `image`, and otherwise by pulling it and recording its digest there.
+    Images which are already given by digest are returned as they are.
+    """
+    if "@" in image:
+        return image
+
+    pins = _read_pins(lock_path)
+
+    if image in pins:
+        return pins[image]
+
+    runner.run(["sudo", "docker", "pull", image])
+    result = run(
+        [
+            "sudo",
+            "docker",
+            "image",
+            "inspect",
+            "--format",
+            "{{json .RepoDigests}}",
+            image,
+        ],
+        stdout=PIPE,
+        check=True,
+    )
+    repository = _repository(image)
+    digests = [
+        digest
+        for digest in json.loads(result.stdout)
+        if digest.startswith(f"{repository}@")
+    ]
+
+    if not digests:
+        raise ValueError(f"The registry gave no digest for {image}")
+
+    # Pipelines pin their images at the same time, so the file is read again
+    with _lock_file_lock:
+        pins = _read_pins(lock_path)
+        pins.setdefault(image, digests[0])
+
+        with open(lock_path, "w") as lock_file:
+            json.dump(pins, lock_file, indent=2, sort_keys=True)
+            lock_file.write("\n")
+
+    return pins[image]
+
+
+def preload_image(image: str, runner):
+    """
+    Pulls `image` unless it is already on the host.
+    """
+    if not _image_exists(image):
+        runner.run(["sudo", "docker", "pull", image])
+
+
+def container_arguments(
+    mounts: Dict[str, str], environment: Dict[str, str] = None
+) -> List[str]:
+    """
+    Returns the `docker run` arguments which bind `mounts`, mapping host paths to
+    container paths, and set `environment`.
+    """
+    arguments = []
+
+    for source, target in sorted(mounts.items()):
+        arguments += ["-v", f"{source}:{target}"]
+
+    for key, value in sorted((environment or {}).items()):
+        arguments += ["-e", f"{key}={value}"]
+
+    return arguments
+
+
+class BuilderSession:
+    """
+    The long-lived containers of one install session, one for each image, which
+    are removed when the session ends.  Steps from several pipelines may run at
+    once, as long as each uses its own image.
+    """
+
+    def __init__(self, lock_path: str = IMAGE_LOCK_FILENAME):
+        self.lock_path = lock_path
+        self._containers = {}
+        self._role_locks = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def _container_name(role):
+        return f"lambda_efs_builder_{role}_{os.getpid()}"
+
+    def image(self, image: str, runner) -> str:
+        """
+        Returns `image` pinned by the session's lock file, pulling it if it is not
+        on the host.
+        """
+        pinned = pin_image(image, runner, self.lock_path)
+        preload_image(pinned, runner)
+        return pinned
+
+    def _start(self, role, image, mounts, environment, runner):
+        pinned = self.image(image, runner)
+        name = self._container_name(role)
+
+        runner.print(f"Starting the {role} builder from {pinned}...")
+        runner.run(
+            [
+                "sudo",
+                "docker",
+                "run",
+                "--detach",
+                "--rm",
+                "--name",
+                name,
+                "--entrypoint",
+                "tail",
+                *container_arguments(mounts, environment),
+                pinned,
+                "-f",
+                "/dev/null",
+            ]
+        )
+        return name
+
+    def container(
+        self,
+        role: str,
+        image: str,
+        mounts: Dict[str, str],
+        runner,
+        environment: Dict[str, str] = None,
+    ) -> str:
+        """
+        Returns the name of the running container for `role`, starting it from
+        `image` with `mounts`, which map host paths to container paths, and
+        `environment` if it is not running with those already.
+        """
+        environment = environment or {}
+        key = (image, tuple(sorted(mounts.items())), tuple(sorted(environment.items())))
+
+        with self._lock:
+            role_lock = self._role_locks.setdefault(role, threading.Lock())
+
+        # Each role is started on its own, so that pulling one image does not hold
+        # up the steps of the other pipeline
+        with role_lock:
+            running = self._containers.get(role)
+
+            if running is not None and running[0] == key:
+                return running[1]
+
+            if running is not None:
+                self._stop(running[1])
+
+            name = self._start(role, image, mounts, environment, runner)
+
+            with self._lock:
+                self._containers[role] = (key, name)
+
+            return name
+
+    def exec(
+        self,
+        role: str,
+        image: str,
+        mounts: Dict[str, str],
+        command: List[str],
+        runner,
+        environment: Dict[str, str] = None,
+    ):
+        """
+        Runs `command` in the container for `role`, as described on `container`.
+        """
+        name = self.container(role, image, mounts, runner, environment)
+        runner.run(["sudo", "docker", "exec", name, *command])
+
+    @staticmethod
+    def _stop(name):
+        # Not checked, since the container may already be gone.  One which is still
+        # there stops its replacement, which has the same name, from starting.
+        run(
+            ["sudo", "docker", "rm", "--force", name],
+            stdout=DEVNULL,
+            stderr=DEVNULL,
+            check=False,
+        )
+
+    def close(self):
+        """
+        Removes the session's containers.
+        """
+        with self._lock:
+            for _, name in self._containers.values():
+                self._stop(name)
+
+            self._containers = {}
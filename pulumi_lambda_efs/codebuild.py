@@ -1,4 +1,5 @@
 import json
+from typing import List
 
 import pulumi
 from pulumi.output import Input, Output
@@ -6,21 +7,86 @@ from pulumi.resource import ResourceOptions
 from pulumi_aws import codebuild, iam, ssm
 from pulumi_aws.get_caller_identity import get_caller_identity
 
+from .build_cache import BOTTLE_CACHE_ENV, BUILD_CACHE_DIRECTORY, WHEELHOUSE_ENV
 from .codebuild_policy import get_codebuild_base_policy, get_codebuild_vpc_policy
 from .efs import EFS
+from .python_runtimes import DEFAULT_PYTHON_RUNTIME, PYTHON_RUNTIME_ENV
 from .vpc import VPC
 
+# The vCPUs of each Linux compute type, smallest first
+COMPUTE_TYPE_VCPUS = {
+    "BUILD_GENERAL1_SMALL": 2,
+    "BUILD_GENERAL1_MEDIUM": 4,
+    "BUILD_GENERAL1_LARGE": 8,
+    "BUILD_GENERAL1_2XLARGE": 72,
+}
+
+DEFAULT_CACHE_MODES = [
+    "LOCAL_DOCKER_LAYER_CACHE",
+    "LOCAL_SOURCE_CACHE",
+    "LOCAL_CUSTOM_CACHE",
+]
+
+# The compute type of projects which are not sized
+DEFAULT_COMPUTE_TYPE = "BUILD_GENERAL1_SMALL"
+
+# A full install of the example's requirements and Brewfile, compiling whatever
+# has no wheel or bottle, and the time a build should take
+DEFAULT_BUILD_CPU_MINUTES = 60
+DEFAULT_TARGET_BUILD_MINUTES = 15
+
+
+def size_compute_type(build_cpu_minutes: float, target_build_minutes: float) -> str:
+    """
+    Returns the smallest compute type which runs a build needing
+    `build_cpu_minutes` of CPU time within `target_build_minutes`, or the largest
+    if none does.
+    """
+    for compute_type, vcpus in COMPUTE_TYPE_VCPUS.items():
+        if build_cpu_minutes / vcpus <= target_build_minutes:
+            return compute_type
+
+    return list(COMPUTE_TYPE_VCPUS)[-1]
+
 
 class CodeBuild(pulumi.ComponentResource):
     """
     The `nuage:aws:DevelopmentEnvironment:CodeBuild` component creates a
     CodeBuild project which builds from a GitHub repository, from inside
-    the VPC's private subnet so that it can access EFS.  It also
+    the VPC's private subnets so that it can access EFS.  It also
     creates a Systems Manager parameter for a Pulumi access token, which is
     passed to CodeBuild through an environment variable.
+
+    The compute type is `compute_type` if it is given.  Otherwise, if
+    `build_cpu_minutes` or `target_build_minutes` is given, it is the smallest one
+    whose vCPUs complete a build needing `build_cpu_minutes` of CPU time within
+    `target_build_minutes`, which default to `DEFAULT_BUILD_CPU_MINUTES` and
+    `DEFAULT_TARGET_BUILD_MINUTES`, and `DEFAULT_COMPUTE_TYPE` if neither is.  The
+    duration the project was sized for, assuming the build uses every vCPU, is
+    reported as `sized_build_minutes`.
+
+    The project keeps a local cache on the build host for each of `cache_modes`:
+    the layers of the build images, the source checkout, and the paths listed in
+    the buildspec's `cache` section.  If `local_install_caches` is set, the install
+    commands keep their pip wheelhouse and Linuxbrew bottle cache under
+    `BUILD_CACHE_DIRECTORY` instead of on EFS, which needs the custom cache, and
+    the buildspec must list:
+
+        cache:
+          paths:
+            - /root/.cache/lambda_efs/**/*
+
+    Local caches only last while builds follow each other closely enough to land
+    on the same host, and a build which misses them starts with empty caches, so
+    this only pays off for projects which build often.
+
+    Builds install the pip packages for the Lambda runtime `python_runtime`, which
+    is passed to them as `PYTHON_RUNTIME`.
     """
 
     pulumi_token_param_name: Output[str]
+    compute_type: Output[str]
+    sized_build_minutes: Output[float]
 
     def __init__(
         self,
@@ -29,6 +95,12 @@ class CodeBuild(pulumi.ComponentResource):
         efs_environment: EFS,
         github_repo_name: Input[str],
         github_version_name: Input[str] = None,
+        compute_type: str = None,
+        build_cpu_minutes: float = None,
+        target_build_minutes: float = None,
+        cache_modes: List[str] = None,
+        local_install_caches: bool = False,
+        python_runtime: str = DEFAULT_PYTHON_RUNTIME,
         opts=None,
     ):
         super().__init__(
@@ -44,6 +116,28 @@ class CodeBuild(pulumi.ComponentResource):
                 "Statement": [{"Action": "*", "Effect": "Allow", "Resource": "*"}],
             }
 
+        if build_cpu_minutes is None and target_build_minutes is None:
+            compute_type = compute_type or DEFAULT_COMPUTE_TYPE
+
+        if build_cpu_minutes is None:
+            build_cpu_minutes = DEFAULT_BUILD_CPU_MINUTES
+
+        if target_build_minutes is None:
+            target_build_minutes = DEFAULT_TARGET_BUILD_MINUTES
+
+        if compute_type is None:
+            compute_type = size_compute_type(build_cpu_minutes, target_build_minutes)
+        elif compute_type not in COMPUTE_TYPE_VCPUS:
+            raise ValueError(
+                f"compute_type must be one of {', '.join(COMPUTE_TYPE_VCPUS)}"
+            )
+
+        if cache_modes is None:
+            cache_modes = DEFAULT_CACHE_MODES
+
+        if local_install_caches and "LOCAL_CUSTOM_CACHE" not in cache_modes:
+            raise ValueError("local_install_caches needs the LOCAL_CUSTOM_CACHE mode")
+
         account_id = get_caller_identity().account_id
         project_name = f"{name}BuildDeploy"
 
@@ -54,13 +148,19 @@ class CodeBuild(pulumi.ComponentResource):
         codebuild_vpc_policy = iam.Policy(
             f"{name}CodeBuildVpcPolicy",
             policy=get_codebuild_vpc_policy(
-                account_id, vpc_environment.private_subnet.id
+                account_id,
+                vpc_environment.region,
+                [subnet.id for subnet in vpc_environment.private_subnets],
             ).apply(json.dumps),
         )
 
         codebuild_base_policy = iam.Policy(
             f"{name}CodeBuildBasePolicy",
-            policy=json.dumps(get_codebuild_base_policy(account_id, project_name)),
+            policy=json.dumps(
+                get_codebuild_base_policy(
+                    account_id, vpc_environment.region, project_name
+                )
+            ),
         )
 
         codebuild_service_role_policy = iam.Policy(
@@ -102,13 +202,41 @@ class CodeBuild(pulumi.ComponentResource):
             roles=[codebuild_service_role.name],
         )
 
+        environment_variables = [
+            {
+                "name": "PULUMI_ACCESS_TOKEN",
+                "type": "PARAMETER_STORE",
+                "value": pulumi_token_param.name,
+            },
+            {
+                "name": "FILESYSTEM_ID",
+                "type": "PLAINTEXT",
+                "value": efs_environment.file_system_id,
+            },
+            {"name": PYTHON_RUNTIME_ENV, "type": "PLAINTEXT", "value": python_runtime},
+        ]
+
+        if local_install_caches:
+            environment_variables += [
+                {
+                    "name": WHEELHOUSE_ENV,
+                    "type": "PLAINTEXT",
+                    "value": f"{BUILD_CACHE_DIRECTORY}/wheelhouse",
+                },
+                {
+                    "name": BOTTLE_CACHE_ENV,
+                    "type": "PLAINTEXT",
+                    "value": f"{BUILD_CACHE_DIRECTORY}/brew_bottles",
+                },
+            ]
+
         codebuild_project = codebuild.Project(
             f"{name}CodeBuildProject",
             description="Builds and deploys the stack",
             name=project_name,
             vpc_config={
                 "vpc_id": vpc_environment.vpc.id,
-                "subnets": [vpc_environment.private_subnet],
+                "subnets": [subnet.id for subnet in vpc_environment.private_subnets],
                 "security_group_ids": [vpc_environment.security_group.id],
             },
             source={"type": "GITHUB", "location": github_repo_name},
@@ -118,25 +246,19 @@ class CodeBuild(pulumi.ComponentResource):
                 "image": "aws/codebuild/amazonlinux2-x86_64-standard:2.0",
                 "privileged_mode": True,
                 "type": "LINUX_CONTAINER",
-                "compute_type": "BUILD_GENERAL1_SMALL",
-                "environment_variables": [
-                    {
-                        "name": "PULUMI_ACCESS_TOKEN",
-                        "type": "PARAMETER_STORE",
-                        "value": pulumi_token_param.name,
-                    },
-                    {
-                        "name": "FILESYSTEM_ID",
-                        "type": "PLAINTEXT",
-                        "value": efs_environment.file_system_id,
-                    },
-                ],
+                "compute_type": compute_type,
+                "environment_variables": environment_variables,
             },
+            cache={"type": "LOCAL", "modes": cache_modes} if cache_modes else None,
             service_role=codebuild_service_role.arn,
             opts=ResourceOptions(depends_on=[vpc_environment]),
         )
 
-        outputs = {"pulumi_token_param_name": pulumi_token_param.name}
+        outputs = {
+            "pulumi_token_param_name": pulumi_token_param.name,
+            "compute_type": compute_type,
+            "sized_build_minutes": build_cpu_minutes / COMPUTE_TYPE_VCPUS[compute_type],
+        }
 
         self.set_outputs(outputs)
 
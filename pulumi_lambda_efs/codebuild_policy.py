@@ -1,11 +1,13 @@
-from typing import Dict
+from typing import Dict, List
 
 from pulumi.output import Output
 
 
-def get_codebuild_vpc_policy(account_id: str, subnet_id: Output[str]) -> Output[Dict]:
-    return subnet_id.apply(
-        lambda subnet_id_value: {
+def get_codebuild_vpc_policy(
+    account_id: str, region: str, subnet_ids: List[Output[str]]
+) -> Output[Dict]:
+    return Output.all(*subnet_ids).apply(
+        lambda subnet_id_values: {
             "Version": "2012-10-17",
             "Statement": [
                 {
@@ -24,11 +26,12 @@ def get_codebuild_vpc_policy(account_id: str, subnet_id: Output[str]) -> Output[
                 {
                     "Effect": "Allow",
                     "Action": ["ec2:CreateNetworkInterfacePermission"],
-                    "Resource": f"arn:aws:ec2:eu-west-1:{account_id}:network-interface/*",
+                    "Resource": f"arn:aws:ec2:{region}:{account_id}:network-interface/*",
                     "Condition": {
                         "StringEquals": {
                             "ec2:Subnet": [
-                                f"arn:aws:ec2:eu-west-1:{account_id}:subnet/{subnet_id_value}"
+                                f"arn:aws:ec2:{region}:{account_id}:subnet/{subnet_id}"
+                                for subnet_id in subnet_id_values
                             ],
                             "ec2:AuthorizedService": "codebuild.amazonaws.com",
                         }
@@ -39,15 +42,15 @@ def get_codebuild_vpc_policy(account_id: str, subnet_id: Output[str]) -> Output[
     )
 
 
-def get_codebuild_base_policy(account_id: str, project_name: str) -> Dict:
+def get_codebuild_base_policy(account_id: str, region: str, project_name: str) -> Dict:
     return {
         "Version": "2012-10-17",
         "Statement": [
             {
                 "Effect": "Allow",
                 "Resource": [
-                    f"arn:aws:logs:eu-west-1:{account_id}:log-group:/aws/codebuild/{project_name}",
-                    f"arn:aws:logs:eu-west-1:{account_id}:log-group:/aws/codebuild/{project_name}:*",
+                    f"arn:aws:logs:{region}:{account_id}:log-group:/aws/codebuild/{project_name}",
+                    f"arn:aws:logs:{region}:{account_id}:log-group:/aws/codebuild/{project_name}:*",
                 ],
                 "Action": [
                     "logs:CreateLogGroup",
@@ -57,7 +60,7 @@ def get_codebuild_base_policy(account_id: str, project_name: str) -> Dict:
             },
             {
                 "Effect": "Allow",
-                "Resource": ["arn:aws:s3:::codepipeline-eu-west-1-*"],
+                "Resource": [f"arn:aws:s3:::codepipeline-{region}-*"],
                 "Action": [
                     "s3:PutObject",
                     "s3:GetObject",
@@ -75,7 +78,7 @@ def get_codebuild_base_policy(account_id: str, project_name: str) -> Dict:
                     "codebuild:BatchPutTestCases",
                 ],
                 "Resource": [
-                    f"arn:aws:codebuild:eu-west-1:{account_id}:report-group/{project_name}-*"
+                    f"arn:aws:codebuild:{region}:{account_id}:report-group/{project_name}-*"
                 ],
             },
         ],
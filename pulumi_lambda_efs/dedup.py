@@ -0,0 +1,161 @@
+"""
+Deduplication of identical files across the EFS install generations.
+
+Every regular file is hashed, and files with the same contents and permissions are
+hard linked to a single object in a content-addressed store:
+
+    lambda_packages/cas/<first two hex digits>/<sha256>.<mode>
+
+Install generations are never modified in place, and new ones replace files rather
+than writing into them, so sharing inodes between them is safe.  Files which are
+already linked to the store are recognised by their inode and not read again.
+Objects which no longer have any other link are removed from the store.
+"""
+
+import hashlib
+import os
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from .generations import generation_directory, list_generations
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+_TEMPORARY_SUFFIX = ".lambda_efs_dedup"
+
+
+def default_dedup_directories(prefixes: Iterable[str]) -> List[str]:
+    """
+    Returns the directories to deduplicate for `prefixes`: their complete
+    generations, and the prefixes themselves if they predate generations.
+    Incomplete generations may still be being installed, so they are left alone.
+    """
+    directories = []
+
+    for prefix in prefixes:
+        if os.path.isdir(prefix) and not os.path.islink(prefix):
+            directories.append(prefix)
+
+        for generation in list_generations(prefix):
+            directories.append(generation_directory(prefix, generation))
+
+    return directories
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def _object_path(store_directory, digest, mode):
+    return os.path.join(store_directory, digest[:2], f"{digest}.{mode:o}")
+
+
+def regular_files(directories: Iterable[str]) -> Iterator[Tuple[str, os.stat_result]]:
+    """
+    Yields the path and `lstat` result of every regular file under `directories`.
+    """
+    for directory in directories:
+        for root, _, file_names in os.walk(directory):
+            for file_name in file_names:
+                path = os.path.join(root, file_name)
+                file_stat = os.lstat(path)
+
+                if stat.S_ISREG(file_stat.st_mode):
+                    yield path, file_stat
+
+
+def _store_objects(store_directory):
+    for root, _, file_names in os.walk(store_directory):
+        for file_name in file_names:
+            path = os.path.join(root, file_name)
+            yield path, os.lstat(path)
+
+
+def _inode(file_stat):
+    return file_stat.st_dev, file_stat.st_ino
+
+
+def used_bytes(files: Iterable[Tuple[str, os.stat_result]]) -> int:
+    """
+    Returns the bytes used by the files from `regular_files`, counting hard linked
+    files once.
+    """
+    inodes = {}
+
+    for _, file_stat in files:
+        inodes[_inode(file_stat)] = file_stat.st_size
+
+    return sum(inodes.values())
+
+
+def dedup(
+    directories: List[str], store_directory: str, min_size: int = 1, workers: int = 8
+) -> Dict[str, int]:
+    """
+    Hard links the identical files of at least `min_size` bytes in `directories` to
+    objects in the store at `store_directory`.  Files are hashed on `workers`
+    threads, since reading from EFS is latency bound.  Returns the number of files
+    scanned and linked, and the bytes used by distinct files before and after.
+    """
+    os.makedirs(store_directory, exist_ok=True)
+    files = list(regular_files(directories))
+    bytes_before = used_bytes(files)
+
+    stored_inodes = {
+        _inode(object_stat) for _, object_stat in _store_objects(store_directory)
+    }
+    candidates = [
+        (path, file_stat)
+        for path, file_stat in files
+        if file_stat.st_size >= min_size and _inode(file_stat) not in stored_inodes
+    ]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        digests = executor.map(lambda item: _hash_file(item[0]), candidates)
+        linked = 0
+
+        for (path, file_stat), digest in zip(candidates, digests):
+            mode = stat.S_IMODE(file_stat.st_mode)
+            object_path = _object_path(store_directory, digest, mode)
+
+            if not os.path.exists(object_path):
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                os.link(path, object_path)
+                continue
+
+            if os.path.samefile(path, object_path):
+                continue
+
+            # Linked alongside and renamed over the file, so that it never
+            # disappears for a function reading it
+            temporary_path = path + _TEMPORARY_SUFFIX
+            os.link(object_path, temporary_path)
+            os.replace(temporary_path, path)
+            linked += 1
+
+    for object_path, object_stat in _store_objects(store_directory):
+        if object_stat.st_nlink == 1:
+            os.remove(object_path)
+
+    return {
+        "files": len(files),
+        "linked": linked,
+        "bytes_before": bytes_before,
+        "bytes_after": used_bytes(regular_files(directories)),
+    }
+
+
+def print_dedup_result(result: Dict[str, int]):
+    saved = result["bytes_before"] - result["bytes_after"]
+    print(f"Scanned {result['files']} files and linked {result['linked']} duplicates.")
+    print(
+        f"Distinct file bytes: {result['bytes_before'] / 2 ** 20:.1f} MiB before, "
+        f"{result['bytes_after'] / 2 ** 20:.1f} MiB after, "
+        f"{saved / 2 ** 20:.1f} MiB saved."
+    )
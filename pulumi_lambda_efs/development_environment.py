@@ -5,6 +5,7 @@ from pulumi.output import Input, Output
 
 from .codebuild import CodeBuild
 from .efs import EFS
+from .python_runtimes import DEFAULT_PYTHON_RUNTIME, check_python_runtime
 from .vpc import VPC
 
 
@@ -13,33 +14,92 @@ class DevelopmentEnvironment(pulumi.ComponentResource):
     The `nuage:aws:DevelopmentEnvironment` component creates a VPC, Elastic
     filesystem and CodeBuild project for developing Lambda functions which
     have dependencies stored on EFS.
+
+    The VPC has a public and a private subnet in each of the first
+    `availability_zone_count` available zones of `region`, which must be the AWS
+    provider's region, with an EFS mount target in each private subnet.  Functions are placed in `function_subnet_ids`,
+    which are the subnets with a mount target, so that NFS traffic never crosses
+    availability zones.  `nat_gateway_per_az`, `s3_endpoint` and
+    `interface_endpoints` configure the VPC's routes to the internet and to AWS
+    services, as described on `VPC`.
+
+    `performance_mode`, `throughput_mode` and `provisioned_throughput_in_mibps`
+    configure the EFS filesystem.
+
+    `build_compute_type`, `build_cpu_minutes`, `target_build_minutes`,
+    `build_cache_modes` and `build_local_install_caches` size and cache the
+    CodeBuild project, as described on `CodeBuild`, which reports the compute type it chose as `build_compute_type`
+    and the build duration it was sized for as `sized_build_minutes`.
+
+    The pip packages are installed for the Lambda runtime `python_runtime`, which
+    the functions using the environment must also use.
     """
 
     security_group_id: Output[str]
     public_subnet_ids: Output[List[str]]
     private_subnet_id: Output[str]
+    private_subnet_ids: Output[List[str]]
+    function_subnet_ids: Output[List[str]]
     efs_access_point_arn: Output[str]
     file_system_id: Output[str]
     vpc_id: Output[str]
     pulumi_token_param_name: Output[str]
+    build_compute_type: Output[str]
+    sized_build_minutes: Output[float]
+    python_runtime: str
 
     def __init__(
         self,
         name,
         github_repo_name: Input[str],
         github_version_name: Input[str] = None,
+        region: str = "eu-west-1",
+        availability_zone_count: int = 3,
+        nat_gateway_per_az: bool = False,
+        s3_endpoint: bool = False,
+        interface_endpoints: List[str] = None,
+        performance_mode: str = "generalPurpose",
+        throughput_mode: str = "bursting",
+        provisioned_throughput_in_mibps: float = None,
+        build_compute_type: str = None,
+        build_cpu_minutes: float = None,
+        target_build_minutes: float = None,
+        build_cache_modes: List[str] = None,
+        build_local_install_caches: bool = False,
+        python_runtime: str = DEFAULT_PYTHON_RUNTIME,
         opts=None,
     ):
         super().__init__("nuage:aws:DevelopmentEnvironment", name, None, opts)
+        check_python_runtime(python_runtime)
+        self.python_runtime = python_runtime
 
-        vpc_environment = VPC(name)
-        efs_environment = EFS(name, vpc_environment)
+        vpc_environment = VPC(
+            name,
+            region=region,
+            availability_zone_count=availability_zone_count,
+            nat_gateway_per_az=nat_gateway_per_az,
+            s3_endpoint=s3_endpoint,
+            interface_endpoints=interface_endpoints,
+        )
+        efs_environment = EFS(
+            name,
+            vpc_environment,
+            performance_mode=performance_mode,
+            throughput_mode=throughput_mode,
+            provisioned_throughput_in_mibps=provisioned_throughput_in_mibps,
+        )
         codebuild_environment = CodeBuild(
             name,
             vpc_environment=vpc_environment,
             efs_environment=efs_environment,
             github_repo_name=github_repo_name,
             github_version_name=github_version_name,
+            compute_type=build_compute_type,
+            build_cpu_minutes=build_cpu_minutes,
+            target_build_minutes=target_build_minutes,
+            cache_modes=build_cache_modes,
+            local_install_caches=build_local_install_caches,
+            python_runtime=python_runtime,
         )
 
         outputs = {
@@ -48,8 +108,16 @@ class DevelopmentEnvironment(pulumi.ComponentResource):
                 subnet.id for subnet in vpc_environment.public_subnets
             ],
             "private_subnet_id": vpc_environment.private_subnet.id,
+            "private_subnet_ids": [
+                subnet.id for subnet in vpc_environment.private_subnets
+            ],
+            "function_subnet_ids": [
+                subnet.id for subnet in efs_environment.mount_target_subnets
+            ],
             "efs_access_point_arn": efs_environment.access_point.arn,
             "pulumi_token_param_name": codebuild_environment.pulumi_token_param_name,
+            "build_compute_type": codebuild_environment.compute_type,
+            "sized_build_minutes": codebuild_environment.sized_build_minutes,
             "file_system_id": efs_environment.file_system_id,
             "vpc_id": vpc_environment.vpc.id,
         }
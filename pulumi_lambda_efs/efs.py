@@ -1,7 +1,9 @@
+from typing import List
+
 import pulumi
 from pulumi.output import Output
 from pulumi.resource import ResourceOptions
-from pulumi_aws import efs
+from pulumi_aws import ec2, efs
 
 from .vpc import VPC
 
@@ -9,35 +11,62 @@ from .vpc import VPC
 class EFS(pulumi.ComponentResource):
     """
     The `nuage:aws:DevelopmentEnvironment:EFS` component creates an EFS
-    filesystem with targets in each public subnet and an access point
-    at the root.
+    filesystem with a mount target in the private subnet of each availability
+    zone of the VPC, and an access point at the root.  Functions should be placed
+    in `mount_target_subnets`, so that each one mounts the filesystem from its own
+    availability zone.
+
+    The filesystem uses bursting throughput by default, whose credits can run out
+    when many functions start at once.  Set `throughput_mode` to "provisioned",
+    with `provisioned_throughput_in_mibps` sized by
+    `recommend_provisioned_throughput`, to avoid that.
     """
 
     file_system_id: Output[efs.FileSystem]
     access_point: Output[efs.AccessPoint]
+    mount_target_subnets: Output[List[ec2.Subnet]]
 
     def __init__(
-        self, name, vpc_environment: VPC, opts=None,
+        self,
+        name,
+        vpc_environment: VPC,
+        performance_mode: str = "generalPurpose",
+        throughput_mode: str = "bursting",
+        provisioned_throughput_in_mibps: float = None,
+        opts=None,
     ):
         super().__init__(
             "nuage:aws:DevelopmentEnvironment:EFS", f"{name}EfsEnvironment", None, opts
         )
 
-        file_system = efs.FileSystem(f"{name}FileSystem")
+        if (throughput_mode == "provisioned") != (
+            provisioned_throughput_in_mibps is not None
+        ):
+            raise ValueError(
+                "provisioned_throughput_in_mibps must be set exactly when "
+                'throughput_mode is "provisioned"'
+            )
+
+        file_system = efs.FileSystem(
+            f"{name}FileSystem",
+            performance_mode=performance_mode,
+            throughput_mode=throughput_mode,
+            provisioned_throughput_in_mibps=provisioned_throughput_in_mibps,
+        )
         targets = []
 
-        for i in range(0, len(vpc_environment.public_subnets)):
+        # EFS allows one mount target per availability zone, so a target moving to
+        # another subnet must be deleted before its replacement is created
+        for i, subnet in enumerate(vpc_environment.private_subnets):
             targets.append(
                 efs.MountTarget(
                     f"{name}MountTarget{i}",
                     file_system_id=file_system.id,
-                    subnet_id=vpc_environment.public_subnets[i].id,
+                    subnet_id=subnet.id,
                     security_groups=[vpc_environment.security_group],
                     opts=ResourceOptions(
-                        depends_on=[
-                            vpc_environment.security_group,
-                            vpc_environment.public_subnets[i],
-                        ]
+                        delete_before_replace=True,
+                        depends_on=[vpc_environment.security_group, subnet],
                     ),
                 )
             )
@@ -57,7 +86,11 @@ class EFS(pulumi.ComponentResource):
             opts=ResourceOptions(depends_on=targets),
         )
 
-        outputs = {"file_system_id": file_system.id, "access_point": access_point}
+        outputs = {
+            "file_system_id": file_system.id,
+            "access_point": access_point,
+            "mount_target_subnets": vpc_environment.private_subnets,
+        }
 
         self.set_outputs(outputs)
 
@@ -0,0 +1,211 @@
+"""
+Immutable install generations.
+
+Each install of a prefix goes into its own generation directory, named by a hash of
+the inputs it was built from:
+
+    lambda_packages/generations/pip/<generation>
+    lambda_packages/generations/linuxbrew/<generation>
+
+The prefix paths which functions use, `lambda_packages/pip` and
+`lambda_packages/linuxbrew`, are symbolic links to the current generation, which
+are switched in a single rename once a generation is complete.  A complete
+generation is never modified again, so functions can pin one, and everything
+derived from it (bytecode, indexes, packs and `/tmp` caches) stays valid without
+being checked.
+"""
+
+import hashlib
+import os
+import shutil
+from typing import List, Optional
+
+from .runtime.tmp_cache import GENERATIONS_DIRECTORY
+
+COMPLETE_FILENAME = ".lambda_efs_generation_complete"
+
+# A prefix which was installed before generations were introduced is adopted under
+# this name when the first generation is built
+LEGACY_GENERATION = "legacy"
+
+_GENERATION_ID_LENGTH = 16
+
+
+def generation_id(*inputs: bytes) -> str:
+    """
+    Returns the generation ID for an install built from `inputs`, such as the
+    requirements file and the name of the image which installs it.
+    """
+    digest = hashlib.sha256()
+
+    for data in inputs:
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+
+    return digest.hexdigest()[:_GENERATION_ID_LENGTH]
+
+
+def generations_root(prefix: str) -> str:
+    """
+    Returns the directory holding the generations of the prefix at `prefix`.
+    """
+    prefix = os.path.normpath(prefix)
+    return os.path.join(
+        os.path.dirname(prefix), GENERATIONS_DIRECTORY, os.path.basename(prefix)
+    )
+
+
+def generation_directory(prefix: str, generation: str) -> str:
+    return os.path.join(generations_root(prefix), generation)
+
+
+def is_complete(directory: str) -> bool:
+    return os.path.exists(os.path.join(directory, COMPLETE_FILENAME))
+
+
+def current_generation(prefix: str) -> Optional[str]:
+    """
+    Returns the generation the prefix link points to, or `None` if it does not
+    point to one.
+    """
+    if not os.path.islink(prefix):
+        return None
+
+    target = os.path.normpath(
+        os.path.join(os.path.dirname(prefix), os.readlink(prefix))
+    )
+
+    if os.path.dirname(target) != generations_root(prefix):
+        return None
+
+    return os.path.basename(target)
+
+
+def list_generations(prefix: str) -> List[str]:
+    """
+    Returns the complete generations of `prefix`, most recently completed first.
+    """
+    root = generations_root(prefix)
+
+    try:
+        names = os.listdir(root)
+    except FileNotFoundError:
+        return []
+
+    completed = []
+
+    for name in names:
+        try:
+            completed_at = os.stat(os.path.join(root, name, COMPLETE_FILENAME)).st_mtime
+        except FileNotFoundError:
+            continue
+
+        completed.append((completed_at, name))
+
+    return [name for _, name in sorted(completed, reverse=True)]
+
+
+def begin_generation(prefix: str, generation: str, seed: bool) -> str:
+    """
+    Creates the directory for a new generation of `prefix` and returns it.  With
+    `seed`, it starts out as a copy of the current generation in which every file
+    is hard linked, so that an incremental install only writes what changes.  The
+    install steps must replace files rather than write to them in place.  A
+    previous attempt which was not completed is discarded.
+    """
+    directory = generation_directory(prefix, generation)
+
+    if is_complete(directory):
+        raise ValueError(f"generation {generation} of {prefix} is already complete")
+
+    _adopt_legacy_prefix(prefix)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(generations_root(prefix), exist_ok=True)
+
+    current = current_generation(prefix)
+
+    if seed and current is not None:
+        shutil.copytree(
+            generation_directory(prefix, current),
+            directory,
+            symlinks=True,
+            copy_function=os.link,
+            ignore=shutil.ignore_patterns(COMPLETE_FILENAME),
+        )
+    else:
+        os.makedirs(directory)
+
+    return directory
+
+
+def _adopt_legacy_prefix(prefix):
+    # There is a short window between the two renames in which the prefix does not
+    # exist, but only the first time
+    if os.path.isdir(prefix) and not os.path.islink(prefix):
+        directory = generation_directory(prefix, LEGACY_GENERATION)
+        os.makedirs(generations_root(prefix), exist_ok=True)
+        os.rename(prefix, directory)
+        complete_generation(directory)
+        _point(prefix, LEGACY_GENERATION)
+
+
+def complete_generation(directory: str):
+    """
+    Marks a generation as complete, after which it must not be modified.
+    """
+    with open(os.path.join(directory, COMPLETE_FILENAME), "w"):
+        pass
+
+
+def switch_generation(prefix: str, generation: str):
+    """
+    Points the prefix link at a complete generation.  The new link is created
+    alongside and renamed over the old one, so a function starting at any moment
+    sees either the old generation or the new one in full.
+    """
+    if not is_complete(generation_directory(prefix, generation)):
+        raise ValueError(f"generation {generation} of {prefix} is not complete")
+
+    _adopt_legacy_prefix(prefix)
+    _point(prefix, generation)
+
+
+def _point(prefix, generation):
+    prefix = os.path.normpath(prefix)
+    target = os.path.relpath(
+        generation_directory(prefix, generation), os.path.dirname(prefix)
+    )
+    temporary_path = f"{prefix}.tmp"
+
+    if os.path.lexists(temporary_path):
+        os.remove(temporary_path)
+
+    os.symlink(target, temporary_path)
+    os.replace(temporary_path, prefix)
+
+
+def collect_generations(prefix: str, keep: int) -> List[str]:
+    """
+    Deletes all but the `keep` most recently completed generations of `prefix`,
+    never deleting the current one, and returns the deleted generations.
+    Functions pinned to a deleted generation stop working, so `keep` should cover
+    every generation which is pinned.  Incomplete generations are left alone, since
+    they may still be being installed.
+    """
+    current = current_generation(prefix)
+    generations = list_generations(prefix)
+    kept = set(generations[: max(keep, 1)])
+    deleted = []
+
+    for generation in generations:
+        if generation in kept or generation == current:
+            continue
+
+        directory = generation_directory(prefix, generation)
+
+        # Unmarked first, so that a partly deleted generation is never used
+        os.remove(os.path.join(directory, COMPLETE_FILENAME))
+        shutil.rmtree(directory)
+        deleted.append(generation)
+
+    return deleted
@@ -1,4 +1,24 @@
+from typing import List
+
 from .development_environment import DevelopmentEnvironment
+from .runtime import (
+    BREW_PREFIX_ENV,
+    LAZY_IMPORTS_ENV,
+    METRICS_ENV,
+    MODULE_INDEX_ENV,
+    PACK_ENV,
+    PATCH_FIND_LIBRARY_ENV,
+    PIP_PREFIX_ENV,
+    TMP_CACHE_BREW_LIBRARIES_ENV,
+    TMP_CACHE_ENV,
+    WARMUP_HOOK_ENV,
+    WARMUP_LIBRARIES_ENV,
+    WARMUP_MODULES_ENV,
+)
+from .runtime.libraries import LIBRARY_INDEX_ENV, LIBRARY_INDEX_FILENAME
+from .runtime.module_index import INDEX_FILENAME
+from .runtime.pack import PACK_FILENAME
+from .runtime.tmp_cache import BREW_LIBRARY_CACHE_DIRECTORY, GENERATIONS_DIRECTORY
 
 # These are the default environment variable values used on Lambda.  We have to know
 # these because we can only overwrite them, not append them.
@@ -6,12 +26,38 @@ LdLibraryPathDefaults = "/var/lang/lib:/lib64:/usr/lib64:/var/runtime:/var/runti
 PathDefaults = "/var/lang/bin:/usr/local/bin:/usr/bin/:/bin:/opt/bin"
 PythonpathDefaults = "/var/runtime"
 
+# Lambda extracts layers to /opt, and adds this directory to the path of Python
+# functions, but only after the directories in PYTHONPATH
+LayerPythonpath = "/opt/python"
+
 mount_location = "/mnt/efs"
 brew_prefix = "lambda_packages/linuxbrew"
 pip_prefix = "lambda_packages/pip"
+generations_prefix = f"lambda_packages/{GENERATIONS_DIRECTORY}"
+
+# Lambda provides this much ephemeral storage by default, and allows up to
+# MaxEphemeralStorageSize.  Both are in MiB.
+DefaultEphemeralStorageSize = 512
+MaxEphemeralStorageSize = 10240
 
 
-def get_environment_function_args(development_environment: DevelopmentEnvironment):
+def get_environment_function_args(
+    development_environment: DevelopmentEnvironment,
+    runtime: str = None,
+    use_module_index: bool = False,
+    use_pack: bool = False,
+    tmp_cache_size: int = None,
+    tmp_cache_brew_libraries: List[str] = None,
+    patch_find_library: bool = False,
+    pip_generation: str = None,
+    brew_generation: str = None,
+    metrics_namespace: str = None,
+    layers: List[str] = None,
+    lazy_imports: List[str] = None,
+    warmup_modules: List[str] = None,
+    warmup_libraries: List[str] = None,
+    warmup_hook: str = None,
+):
     """
     Helper function for creating Lambda functions which can read libraries
     which were installed to EFS using the scripts in this package.  Specifically,
@@ -31,23 +77,161 @@ def get_environment_function_args(development_environment: DevelopmentEnvironmen
     )
 
     Note using the function in this way will overwite the `vpc_config`,
-    `file_system_config` and `environment` parameters if they were present.
+    `file_system_config` and `environment` parameters if they were present,
+    `ephemeral_storage` if `tmp_cache_size` is given, and `layers` if `layers` is
+    given.
+
+    The function's runtime must be the environment's `python_runtime`.  The pip
+    packages are compiled to unchecked hash-based bytecode when they are installed,
+    in the build image of that runtime, and an interpreter only uses bytecode
+    compiled by its own version.  If `runtime` is given, a `ValueError` is raised
+    if it differs.  With the same runtime, imports use the installed `.pyc` files
+    without checking them against their source.
+
+    If `use_module_index` is set, the function resolves imports from the EFS pip
+    prefix using the module index written at install time, rather than by listing
+    and statting the directories over NFS.
+
+    If `use_pack` is set, modules are imported from the single file pack which
+    `install_pip_azl --pack` writes into each generation it installs.
+    Extension modules are extracted from it to `/tmp` when they are first imported.
+
+    If `tmp_cache_size` is set, pip packages are copied from EFS to `/tmp` in the
+    background after they are first imported, using at most that many MiB, and
+    later processes in the same execution environment import them from there.
+    Linuxbrew libraries whose file names match any of the glob patterns in
+    `tmp_cache_brew_libraries`, such as `libproj.so*`, are copied the same way from
+    when the function starts.  The function's ephemeral storage is enlarged by the
+    cache size, which also sets the `ephemeral_storage` parameter, so the cache
+    can be at most `MaxEphemeralStorageSize - DefaultEphemeralStorageSize` MiB.
+
+    Functions can use `lambda_efs_runtime.libraries.find_library` in place of
+    `ctypes.util.find_library` to look up Linuxbrew libraries in the index written
+    at install time, rather than running `ldconfig`, `gcc` and `objdump`.  If
+    `patch_find_library` is set, `ctypes.util.find_library` is replaced with it
+    when the function starts.
+
+    Each install goes into its own immutable generation, and the function uses
+    whichever generation is current when it starts.  Setting `pip_generation` or
+    `brew_generation` to the generation ID printed by the install command pins the
+    function to that generation instead, so that later installs only reach it when
+    it is redeployed.  Pinned generations must not be deleted by the install
+    commands' garbage collection.
+
+    If `metrics_namespace` is set, each cold start logs one line of CloudWatch
+    embedded metric format under that namespace, with the time spent importing,
+    the number of filesystem calls the imports made on EFS and the time spent
+    loading native libraries, broken down by package and library.
+
+    If `layers` is set, the function uses those Lambda layer ARNs, which also sets
+    the `layers` parameter, and imports Python packages from the layers ahead of the
+    EFS pip prefix.  `get_hybrid_function_args` moves the hottest pip packages into
+    layers this way.
+
+    If `lazy_imports` is set, importing any of the modules it names, such as
+    `pandas`, only creates a proxy, and the module is read from EFS and run on the
+    first access to one of its attributes.  Functions can wrap their handler with
+    `lambda_efs_runtime.lazy.report_lazy_imports` to log which of them each
+    invocation loaded.
+
+    During the init phase, which Lambda runs with boosted CPU, and before any
+    traffic when the function has provisioned concurrency, the function imports
+    the modules in `warmup_modules`, loads the Linuxbrew libraries whose file names
+    match any of the glob patterns in `warmup_libraries`, and then calls
+    `warmup_hook`, given as `module:function`, such as a function of the handler's
+    package which runs `django.setup()`.  `create_provisioned_alias` gives a
+    function warm capacity which has done all of this before it is invoked.
     """
-    return {
+    _check_arguments(development_environment, runtime, tmp_cache_size)
+
+    pip_directory = f"{mount_location}/{pip_prefix}"
+    brew_directory = f"{mount_location}/{brew_prefix}"
+
+    if pip_generation:
+        pip_directory = f"{mount_location}/{generations_prefix}/pip/{pip_generation}"
+
+    if brew_generation:
+        brew_directory = (
+            f"{mount_location}/{generations_prefix}/linuxbrew/{brew_generation}"
+        )
+
+    library_path = f"{LdLibraryPathDefaults}:{brew_directory}/lib"
+    python_path = f"{PythonpathDefaults}:{pip_directory}"
+
+    if layers:
+        python_path = f"{PythonpathDefaults}:{LayerPythonpath}:{pip_directory}"
+
+    if tmp_cache_size and tmp_cache_brew_libraries:
+        library_path = f"{LdLibraryPathDefaults}:{BREW_LIBRARY_CACHE_DIRECTORY}:{brew_directory}/lib"
+
+    variables = {
+        "LAMBDA_PACKAGES_PATH": mount_location,
+        PIP_PREFIX_ENV: pip_directory,
+        BREW_PREFIX_ENV: brew_directory,
+        LIBRARY_INDEX_ENV: f"{brew_directory}/{LIBRARY_INDEX_FILENAME}",
+        "LD_LIBRARY_PATH": library_path,
+        "PATH": f"{PathDefaults}:{brew_directory}/bin",
+        "PYTHONPATH": python_path,
+        # The pip prefix is precompiled to unchecked hash-based pycs at install
+        # time, so there is nothing to write back, and the filesystem is read-only
+        # to the function anyway
+        "PYTHONDONTWRITEBYTECODE": "1",
+    }
+
+    optional_variables = {
+        MODULE_INDEX_ENV: use_module_index and f"{pip_directory}/{INDEX_FILENAME}",
+        PACK_ENV: use_pack and f"{pip_directory}/{PACK_FILENAME}",
+        PATCH_FIND_LIBRARY_ENV: patch_find_library and "1",
+        METRICS_ENV: metrics_namespace,
+        WARMUP_MODULES_ENV: ",".join(warmup_modules or []),
+        WARMUP_LIBRARIES_ENV: ",".join(warmup_libraries or []),
+        WARMUP_HOOK_ENV: warmup_hook,
+        LAZY_IMPORTS_ENV: ",".join(lazy_imports or []),
+    }
+    variables.update(
+        {name: value for name, value in optional_variables.items() if value}
+    )
+
+    args = {
         "vpc_config": {
             "security_group_ids": [development_environment.security_group_id],
-            "subnet_ids": development_environment.public_subnet_ids,
+            "subnet_ids": development_environment.function_subnet_ids,
         },
         "file_system_config": {
             "arn": development_environment.efs_access_point_arn,
             "local_mount_path": mount_location,
         },
-        "environment": {
-            "variables": {
-                "LAMBDA_PACKAGES_PATH": mount_location,
-                "LD_LIBRARY_PATH": f"{LdLibraryPathDefaults}:{mount_location}/{brew_prefix}/lib",
-                "PATH": f"{PathDefaults}:{mount_location}/{brew_prefix}/bin",
-                "PYTHONPATH": f"{PythonpathDefaults}:{mount_location}/{pip_prefix}",
-            }
-        },
+        "environment": {"variables": variables},
     }
+
+    if layers:
+        args["layers"] = layers
+
+    if tmp_cache_size:
+        variables[TMP_CACHE_ENV] = str(tmp_cache_size * 1024 * 1024)
+
+        if tmp_cache_brew_libraries:
+            patterns = ",".join(tmp_cache_brew_libraries)
+            variables[TMP_CACHE_BREW_LIBRARIES_ENV] = patterns
+
+        args["ephemeral_storage"] = {
+            "size": DefaultEphemeralStorageSize + tmp_cache_size
+        }
+
+    return args
+
+
+def _check_arguments(development_environment, runtime, tmp_cache_size):
+    if runtime is not None and runtime != development_environment.python_runtime:
+        raise ValueError(
+            f"The function's runtime is {runtime}, but the pip packages are "
+            f"installed for {development_environment.python_runtime}"
+        )
+
+    max_tmp_cache_size = MaxEphemeralStorageSize - DefaultEphemeralStorageSize
+
+    if tmp_cache_size is not None and not 0 < tmp_cache_size <= max_tmp_cache_size:
+        raise ValueError(
+            f"tmp_cache_size must be between 1 and {max_tmp_cache_size} MiB, since "
+            f"ephemeral storage is limited to {MaxEphemeralStorageSize} MiB"
+        )
@@ -0,0 +1,849 @@
+"""
+The install pipelines behind the `install_*_azl` commands.
+
+Each pipeline is a sequence of named steps, which run root commands of this module
+and the install scripts in the build images, through a `CommandRunner`.  The runner
+times every step, retries those which need the network, counts the files and bytes
+each writes to EFS, and records them in a `BuildReport`, as described in `steps`.
+The commands run them one at a time with the output passed straight through.
+`install_all` runs both at once with their output prefixed by the pipeline name,
+and stops the other pipeline as soon as one fails.
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+from subprocess import PIPE, STDOUT, CalledProcessError, Popen, run
+from typing import Callable, Dict, List, Optional, Union
+
+from importlib_resources import files
+
+from .build_cache import BOTTLE_CACHE_ENV, WHEELHOUSE_ENV
+from .builder import BuilderSession, container_arguments
+from .generations import generation_directory, generation_id, is_complete
+from .get_environment_function_args import brew_prefix, mount_location, pip_prefix
+from .prune import PRUNE_CONFIG_FILENAME, prune_config_arguments
+from .python_runtimes import (
+    DEFAULT_PYTHON_RUNTIME,
+    PYTHON_RUNTIME_ENV,
+    PYTHON_RUNTIME_IMAGES,
+    check_python_runtime,
+)
+from .runtime.pack import default_pack_path
+from .steps import BuildReport, compare_snapshots, describe_step, snapshot_directory
+
+compile_pip_py = files("pulumi_lambda_efs.bin").joinpath("compile_pip.py")
+bin_directory = str(files("pulumi_lambda_efs.bin"))
+
+# The image which the Linuxbrew install steps use, unless overridden in the
+# environment.  The pip steps use the build image of the Python runtime.
+default_brew_image = "nuagestudio/amazonlinuxbrew"
+
+# A directory on local disk in which to build the prefixes before syncing them to
+# EFS, rather than installing onto EFS directly
+LOCAL_BUILD_ENV = "LAMBDA_EFS_LOCAL_BUILD"
+
+# The number of install generations of each prefix to keep by default
+default_keep_generations = 3
+
+# The NFS read and write size which AWS recommends for EFS, the largest it allows
+default_nfs_block_size = 1048576
+
+# Steps which need the network are attempted this many times, waiting this many
+# seconds before the first retry and twice as long before each later one
+default_network_attempts = 3
+default_retry_delay = 5
+
+local_pip_prefix = f"{mount_location}/{pip_prefix}"
+local_brew_prefix = f"{mount_location}/{brew_prefix}"
+local_brew_build_prefix = f"{mount_location}/{brew_prefix}_build"
+local_cas_directory = f"{mount_location}/lambda_packages/cas"
+local_pip_cache_directory = f"{mount_location}/lambda_packages/pip_cache"
+local_wheelhouse_directory = f"{mount_location}/lambda_packages/wheelhouse"
+local_bottle_cache_directory = f"{mount_location}/lambda_packages/brew_cache"
+
+# Where the install steps mount the Linuxbrew prefix in the Linuxbrew image
+docker_brew_prefix = "/home/linuxbrew/.linuxbrew"
+
+
+class PipelineCancelled(Exception):
+    """
+    Raised by a step of a pipeline which was stopped because another pipeline of
+    the same build failed.
+    """
+
+
+class CommandRunner:
+    """
+    Runs the steps and commands of the pipeline `pipeline`, raising
+    `CalledProcessError` if a command fails, and prints its messages.  Steps are
+    recorded in `report`, which is shared by the pipelines of one build.
+    """
+
+    def __init__(
+        self,
+        pipeline: str = "install",
+        report: BuildReport = None,
+        attempts: int = default_network_attempts,
+        retry_delay: float = default_retry_delay,
+    ):
+        self.pipeline = pipeline
+        self.report = report or BuildReport()
+        self.attempts = attempts
+        self.retry_delay = retry_delay
+        self._snapshots = {}
+
+    def run(self, args: List[str]):  # pylint: disable=no-self-use
+        run(args, check=True)
+
+    def print(self, line: str):  # pylint: disable=no-self-use
+        print(line, flush=True)
+
+    def _snapshot(self, directory):
+        if directory not in self._snapshots:
+            self._snapshots[directory] = snapshot_directory(directory)
+
+        return self._snapshots[directory]
+
+    def _attempt(self, name, action, attempts, record):
+        for attempt in range(1, attempts + 1):
+            record["attempts"] = attempt
+
+            try:
+                if callable(action):
+                    action()
+                else:
+                    self.run(action)
+
+                return
+            except (CalledProcessError, OSError):
+                if attempt == attempts:
+                    raise
+
+                delay = self.retry_delay * 2 ** (attempt - 1)
+                self.print(f"Step {name} failed, retrying in {delay:g} s...")
+                self.wait(delay)
+
+    def wait(self, seconds: float):  # pylint: disable=no-self-use
+        time.sleep(seconds)
+
+    def step(
+        self,
+        name: str,
+        action: Union[List[str], Callable[[], None]],
+        writes: str = None,
+        network: bool = False,
+    ):
+        """
+        Runs the step `name`, whose `action` is either the arguments of a command
+        or a function which runs the step's commands.  `writes` is the directory
+        the step writes to, if its writes should be counted, and a `network` step
+        is retried if a command fails.
+        """
+        measure = writes is not None and self.report.measure
+        before = self._snapshot(writes) if measure else None
+        record = {"pipeline": self.pipeline, "name": name}
+        start = time.perf_counter()
+
+        try:
+            self._attempt(name, action, self.attempts if network else 1, record)
+            record["status"] = "succeeded"
+        except PipelineCancelled:
+            record["status"] = "cancelled"
+            raise
+        except Exception as error:
+            record["status"] = "failed"
+            record["error"] = str(error)
+            raise
+        finally:
+            record["seconds"] = round(time.perf_counter() - start, 3)
+
+            if measure:
+                self._snapshots[writes] = snapshot_directory(writes)
+                record["directory"] = writes
+                record.update(compare_snapshots(before, self._snapshots[writes]))
+
+            self.report.add_step(record)
+            self.print(describe_step(record))
+
+
+def root_command(*args) -> List[str]:
+    """
+    Returns the arguments which run another command of this module as root, since
+    the EFS directories are created by the install steps under sudo.  Output is
+    unbuffered so that it interleaves correctly with the steps' other output.
+    """
+    return ["sudo", sys.executable, "-u", "-m", "pulumi_lambda_efs", *args]
+
+
+def _read_bytes(path):
+    with open(path, "rb") as input_file:
+        return input_file.read()
+
+
+def _prune_inputs():
+    # Only hashed when present, so that adding pruning changes no existing IDs
+    if not os.path.isfile(PRUNE_CONFIG_FILENAME):
+        return []
+
+    return [_read_bytes(PRUNE_CONFIG_FILENAME)]
+
+
+def _unescape_mount_field(field):
+    # /proc/mounts escapes spaces, tabs, newlines and backslashes as octal
+    return re.sub(r"\\([0-7]{3})", lambda match: chr(int(match.group(1), 8)), field)
+
+
+def find_mount(path: str) -> Optional[Dict[str, str]]:
+    """
+    Returns the source, mount point, type and options of the mount which holds
+    `path`, from `/proc/mounts`, or None if they cannot be read.
+    """
+    path = os.path.realpath(path)
+    found = None
+    found_length = -1
+
+    try:
+        with open("/proc/mounts") as mounts:
+            lines = mounts.read().splitlines()
+    except OSError:
+        return None
+
+    # Later mounts over the same point hide earlier ones
+    for line in lines:
+        fields = line.split()
+
+        if len(fields) < 4:
+            continue
+
+        source, mount_point, fstype, options = map(_unescape_mount_field, fields[:4])
+        inside = path == mount_point or path.startswith(mount_point.rstrip("/") + "/")
+
+        if inside and len(mount_point) >= found_length:
+            found_length = len(mount_point)
+            found = {
+                "source": source,
+                "mount_point": mount_point,
+                "type": fstype,
+                "options": options,
+            }
+
+    return found
+
+
+def is_mounted(filesystem_id: str) -> bool:
+    """
+    Returns whether an EFS filesystem is mounted at /mnt/efs, raising `ValueError`
+    if it is a different one.  A mount through a TLS tunnel has a local source,
+    so it is assumed to be the right filesystem.
+    """
+    entry = find_mount(mount_location)
+
+    if entry is None or entry["mount_point"] != mount_location:
+        return False
+
+    mounted_id = re.search(r"fs-[0-9a-f]+", entry["source"])
+
+    if mounted_id and mounted_id.group(0) != filesystem_id:
+        raise ValueError(
+            f"{mount_location} has {mounted_id.group(0)} mounted, not {filesystem_id}"
+        )
+
+    return True
+
+
+def _supports_nconnect():
+    release = re.match(r"(\d+)\.(\d+)", os.uname().release)
+    return release is not None and tuple(map(int, release.groups())) >= (5, 3)
+
+
+def efs_mount_options(
+    rsize: int = default_nfs_block_size,
+    wsize: int = default_nfs_block_size,
+    noresvport: bool = True,
+    tls: bool = False,
+    nconnect: int = None,
+) -> str:
+    """
+    Returns the options for mounting EFS with the mount helper: the NFS options
+    which AWS recommends, with reads and writes of `rsize` and `wsize` bytes,
+    `noresvport` so that the client reconnects from a new port after a network
+    interruption, encryption in transit with `tls`, and `nconnect` TCP connections
+    to the server.  `nconnect` is left out on kernels before 5.3, which lack it.
+    """
+    options = [
+        "nfsvers=4.1",
+        f"rsize={rsize}",
+        f"wsize={wsize}",
+        "hard",
+        "timeo=600",
+        "retrans=2",
+    ]
+
+    if noresvport:
+        options.append("noresvport")
+
+    if tls:
+        options.append("tls")
+
+    if nconnect and nconnect > 1 and _supports_nconnect():
+        options.append(f"nconnect={nconnect}")
+
+    return ",".join(options)
+
+
+def mount(
+    filesystem_id: str,
+    runner: CommandRunner = None,
+    options: str = None,
+    remount: bool = False,
+):
+    """
+    Mounts the EFS filesystem at /mnt/efs with `options`, by default those of
+    `efs_mount_options()`, unless it is already mounted, first installing the EFS
+    mount helper with yum.  With `remount`, a filesystem which is already mounted
+    is unmounted first, so that it is mounted with `options`.
+    """
+    runner = runner or CommandRunner("mount")
+    options = options or efs_mount_options()
+
+    if is_mounted(filesystem_id):
+        if not remount:
+            return
+
+        runner.step("unmount_efs", ["sudo", "umount", mount_location])
+
+    def mount_efs():
+        runner.run(["sudo", "mkdir", "-p", mount_location])
+        runner.run(
+            [
+                "sudo",
+                "mount",
+                "-t",
+                "efs",
+                "-o",
+                options,
+                f"{filesystem_id}:/",
+                mount_location,
+            ]
+        )
+
+    runner.print(f"Mounting EFS {filesystem_id} into {mount_location} ({options})...")
+    runner.step(
+        "install_efs_utils",
+        ["sudo", "yum", "install", "-q", "-y", "amazon-efs-utils"],
+        network=True,
+    )
+    runner.step("mount_efs", mount_efs, network=True)
+    runner.step(
+        "create_packages_directory",
+        ["sudo", "mkdir", "-p", f"{mount_location}/lambda_packages"],
+    )
+    runner.print("Mounted successfully.")
+
+
+def _run_in_image(role, image, mounts, command, runner, builder, environment=None):
+    # In the session's container for the role if there is one, otherwise in one
+    # started for this command alone
+    if builder is not None:
+        builder.exec(role, image, mounts, command, runner, environment)
+        return
+
+    runner.run(
+        [
+            "sudo",
+            "docker",
+            "run",
+            "--rm",
+            *container_arguments(mounts, environment),
+            image,
+            *command,
+        ]
+    )
+
+
+def _bundle_brew(prefix, bottle_cache, runner, builder):
+    image = os.environ.get("BREW_IMAGE", default_brew_image)
+    bottle_cache = os.path.abspath(bottle_cache or local_bottle_cache_directory)
+
+    # Containers mount the prefix over the image's own, so a new prefix is first
+    # seeded from the image
+    def initialize_prefix():
+        runner.run(["sudo", "mkdir", "-p", prefix])
+        runner.run(
+            [
+                "sudo",
+                "docker",
+                "run",
+                "--rm",
+                "-v",
+                f"{prefix}:/newprefix",
+                builder.image(image, runner) if builder else image,
+                "bash",
+                "-c",
+                f"sudo cp -a {docker_brew_prefix}/* /newprefix",
+            ]
+        )
+
+    # The bottle cache is owned by the Linuxbrew user, like the prefix, so that brew
+    # can write to it
+    def bundle():
+        runner.run(["sudo", "mkdir", "-p", bottle_cache])
+        runner.run(["sudo", "chown", f"--reference={prefix}/Homebrew", bottle_cache])
+        _run_in_image(
+            "brew",
+            image,
+            {
+                os.getcwd(): "/inputdir",
+                bin_directory: "/scripts",
+                prefix: docker_brew_prefix,
+                bottle_cache: "/bottle_cache",
+            },
+            ["bash", "/scripts/brew_bundle.sh"],
+            runner,
+            builder,
+            environment={"HOMEBREW_CACHE": "/bottle_cache"},
+        )
+
+    if not os.path.isdir(os.path.join(prefix, "Homebrew")):
+        runner.print(f"Initializing Linuxbrew prefix into {prefix}...")
+        runner.step("initialize_brew_prefix", initialize_prefix, prefix, network=True)
+
+    runner.step("brew_bundle", bundle, prefix, network=True)
+
+
+def _sync_step(name, source, destination, runner):
+    # Files are compared by size and modification time rather than hashed, which
+    # would read every file on EFS.  Syncs preserve modification times, and the
+    # installers write the files they change anew.
+    runner.step(name, root_command("sync", source, destination), destination)
+
+
+def install_brew(
+    keep: int = default_keep_generations,
+    runner: CommandRunner = None,
+    closure: bool = False,
+    bottle_cache: str = None,
+    builder: BuilderSession = None,
+    local_build: str = None,
+) -> str:
+    """
+    Installs the Linuxbrew formulae in the Brewfile in the current directory into
+    a new generation of the mounted EFS prefix, unless there already is one for
+    the same inputs, and makes it current.  Returns the generation ID.
+
+    With `closure`, the formulae are installed into a separate build prefix, in
+    `lambda_packages/linuxbrew_build` on EFS, and the generation only receives
+    their runtime closure.  The install fails if a library they need cannot be
+    found.
+
+    Downloaded bottles are kept in the directory `bottle_cache`, or the one named
+    by `LAMBDA_EFS_BOTTLE_CACHE`, or `lambda_packages/brew_cache` on EFS by default,
+    and reused by later installs.
+
+    With `builder`, Linuxbrew runs in the session's long-lived container rather
+    than in one started for this install.
+
+    With `local_build`, or `LAMBDA_EFS_LOCAL_BUILD`, the generation is built in
+    the `linuxbrew` directory under it on local disk, starting from a copy of the
+    generation on EFS, and then synced to EFS, with only the changed files written
+    there.  The directory is kept, so later builds only copy what changed.  With
+    `closure`, the build prefix is `linuxbrew_build` under it as well.
+
+    The generation is pruned with the rules in `prune.json` in the current
+    directory, if there is one, or the default rules.
+    """
+    if not os.path.isfile("Brewfile"):
+        raise FileNotFoundError("Cannot find Brewfile in local directory")
+
+    runner = runner or CommandRunner("brew")
+    bottle_cache = bottle_cache or os.environ.get(BOTTLE_CACHE_ENV)
+    generation = generation_id(
+        _read_bytes("Brewfile"),
+        os.environ.get("BREW_IMAGE", default_brew_image).encode(),
+        *_prune_inputs(),
+        *([b"closure"] if closure else []),
+    )
+    directory = generation_directory(local_brew_prefix, generation)
+    local_build = local_build or os.environ.get(LOCAL_BUILD_ENV)
+    target = directory
+    build_prefix = local_brew_build_prefix
+
+    if local_build:
+        target = os.path.join(os.path.abspath(local_build), "linuxbrew")
+        build_prefix = os.path.join(os.path.abspath(local_build), "linuxbrew_build")
+
+    if is_complete(directory):
+        runner.print(f"Generation {generation} is already installed.")
+    else:
+        if closure:
+            _bundle_brew(build_prefix, bottle_cache, runner, builder)
+            runner.step(
+                "begin_generation",
+                root_command("begin_generation", local_brew_prefix, generation),
+                directory,
+            )
+
+            if local_build:
+                _sync_step("sync_from_efs", directory, target, runner)
+
+            runner.step(
+                "extract_brew_closure",
+                root_command(
+                    "extract_brew_closure",
+                    build_prefix,
+                    target,
+                    os.path.abspath("Brewfile"),
+                ),
+                target,
+            )
+        else:
+            # Linuxbrew upgrades what is already in the prefix, so it always starts
+            # from the current generation
+            runner.step(
+                "begin_generation",
+                root_command(
+                    "begin_generation", local_brew_prefix, generation, "--seed"
+                ),
+                directory,
+            )
+
+            if local_build:
+                _sync_step("sync_from_efs", directory, target, runner)
+
+            _bundle_brew(target, bottle_cache, runner, builder)
+
+        runner.step(
+            "prune",
+            root_command("prune", target, "brew", *prune_config_arguments()),
+            target,
+        )
+        runner.step("index_libraries", root_command("index_libraries", target), target)
+
+        if local_build:
+            _sync_step("sync_to_efs", target, directory, runner)
+
+        runner.step(
+            "write_install_id", root_command("write_install_id", directory), directory
+        )
+        runner.step(
+            "complete_generation",
+            root_command("complete_generation", directory),
+            directory,
+        )
+
+    runner.step(
+        "switch_generation",
+        root_command("switch_generation", local_brew_prefix, generation),
+    )
+    runner.step(
+        "collect_generations",
+        root_command("collect_generations", local_brew_prefix, str(keep)),
+    )
+    return generation
+
+
+def install_pip(
+    incremental: bool = False,
+    keep: int = default_keep_generations,
+    runner: CommandRunner = None,
+    wheelhouse: str = None,
+    builder: BuilderSession = None,
+    local_build: str = None,
+    runtime: str = None,
+    pack: bool = False,
+) -> str:
+    """
+    Installs the pip packages in the requirements.txt in the current directory
+    into a new generation of the mounted EFS prefix, unless there already is one
+    for the same inputs, and makes it current.  Returns the generation ID.
+
+    The packages are installed and compiled in the build image of the Lambda
+    Python `runtime`, or the one named by `PYTHON_RUNTIME`, or python3.8 by
+    default, unless `PYTHON_IMAGE` names another image.  Functions must use the
+    same runtime, or they cannot use the compiled bytecode.
+
+    With `pack`, or if the current generation was packed, the generation is packed
+    into a single file as one of its steps, before it is completed and made
+    current, since a complete generation must not be modified.
+
+    Wheels are installed from the wheelhouse at `wheelhouse`, or the one named by
+    `LAMBDA_EFS_WHEELHOUSE`, or in `lambda_packages/wheelhouse` on EFS by default,
+    and only the missing ones are downloaded or built.  The generation is pruned,
+    pip runs in the `builder` session's container if one is given, and the
+    generation is built in the `pip` directory under `local_build` and synced to
+    EFS if that is given, as in `install_brew`.
+    """
+    if not os.path.isfile("requirements.txt"):
+        raise FileNotFoundError("Cannot find requirements.txt in local directory")
+
+    runner = runner or CommandRunner("pip")
+    runtime = runtime or os.environ.get(PYTHON_RUNTIME_ENV, DEFAULT_PYTHON_RUNTIME)
+    check_python_runtime(runtime)
+    python_image = os.environ.get("PYTHON_IMAGE", PYTHON_RUNTIME_IMAGES[runtime])
+    packed = pack or os.path.exists(default_pack_path(local_pip_prefix))
+    generation = generation_id(
+        _read_bytes("requirements.txt"),
+        python_image.encode(),
+        compile_pip_py.read_bytes(),
+        *(
+            resource.read_bytes()
+            for resource in sorted(
+                files("pulumi_lambda_efs.runtime").iterdir(), key=lambda r: r.name
+            )
+            if resource.name.endswith(".py")
+        ),
+        *_prune_inputs(),
+        *([b"pack"] if packed else []),
+    )
+    directory = generation_directory(local_pip_prefix, generation)
+    mode = "incremental" if incremental else "full"
+    local_build = local_build or os.environ.get(LOCAL_BUILD_ENV)
+    target = directory
+
+    if local_build:
+        target = os.path.join(os.path.abspath(local_build), "pip")
+
+    if is_complete(directory):
+        runner.print(f"Generation {generation} is already installed.")
+    else:
+        wheelhouse = os.path.abspath(
+            wheelhouse or os.environ.get(WHEELHOUSE_ENV) or local_wheelhouse_directory
+        )
+        mounts = {
+            os.getcwd(): "/inputdir",
+            bin_directory: "/scripts",
+            target: "/pip",
+            local_pip_cache_directory: "/pip_cache",
+            wheelhouse: "/wheelhouse",
+        }
+
+        def install():
+            runner.run(
+                ["sudo", "mkdir", "-p", target, local_pip_cache_directory, wheelhouse]
+            )
+            _run_in_image(
+                "pip",
+                python_image,
+                mounts,
+                ["bash", "/scripts/pip_install.sh", mode],
+                runner,
+                builder,
+            )
+
+        # Unchecked hash-based pycs are never compared against their source, so
+        # imports on Lambda neither revalidate nor recompile modules over NFS
+        def compile_bytecode():
+            _run_in_image(
+                "pip",
+                python_image,
+                mounts,
+                ["python", "/scripts/compile_pip.py", "/pip"],
+                runner,
+                builder,
+            )
+
+        seed = ["--seed"] if incremental else []
+        runner.step(
+            "begin_generation",
+            root_command("begin_generation", local_pip_prefix, generation, *seed),
+            directory,
+        )
+
+        if local_build:
+            _sync_step("sync_from_efs", directory, target, runner)
+
+        runner.step("pip_install", install, target, network=True)
+        runner.step(
+            "prune",
+            root_command("prune", target, "pip", *prune_config_arguments()),
+            target,
+        )
+        runner.step("postinstall_pip", root_command("postinstall_pip", target), target)
+        runner.step("compile_pip", compile_bytecode, target)
+
+        if packed:
+            runner.step("pack", root_command("pack", target), target)
+
+        if local_build:
+            _sync_step("sync_to_efs", target, directory, runner)
+
+        runner.step(
+            "write_install_id", root_command("write_install_id", directory), directory
+        )
+        runner.step(
+            "complete_generation",
+            root_command("complete_generation", directory),
+            directory,
+        )
+
+    runner.step(
+        "switch_generation",
+        root_command("switch_generation", local_pip_prefix, generation),
+    )
+    runner.step(
+        "collect_generations",
+        root_command("collect_generations", local_pip_prefix, str(keep)),
+    )
+    return generation
+
+
+class PrefixedRunner(CommandRunner):
+    """
+    Runs a pipeline's commands with each line of their output prefixed by the
+    pipeline name.  Once `cancel` is called, the running command is terminated and
+    no further ones are started.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        width: int,
+        output_lock: threading.Lock,
+        report: BuildReport = None,
+    ):
+        super().__init__(name, report)
+        self.prefix = f"[{name}]".ljust(width + 2)
+        self.cancelled = threading.Event()
+        self._output_lock = output_lock
+        self._process = None
+
+    def print(self, line: str):
+        with self._output_lock:
+            print(f"{self.prefix} {line}", flush=True)
+
+    def run(self, args: List[str]):
+        if self.cancelled.is_set():
+            raise PipelineCancelled()
+
+        self._process = Popen(args, stdout=PIPE, stderr=STDOUT)
+
+        # Cancelled between the check and starting the command
+        if self.cancelled.is_set():
+            self._process.terminate()
+
+        for line in self._process.stdout:
+            self.print(line.decode(errors="replace").rstrip())
+
+        return_code = self._process.wait()
+        self._process = None
+
+        if self.cancelled.is_set():
+            raise PipelineCancelled()
+
+        if return_code != 0:
+            raise CalledProcessError(return_code, args)
+
+    def wait(self, seconds: float):
+        if self.cancelled.wait(seconds):
+            raise PipelineCancelled()
+
+    def cancel(self):
+        self.cancelled.set()
+        process = self._process
+
+        if process is not None and process.poll() is None:
+            try:
+                process.terminate()
+            except OSError:
+                pass
+
+
+def install_all(
+    filesystem_id: str,
+    incremental: bool = False,
+    keep: int = default_keep_generations,
+    wheelhouse: str = None,
+    brew_closure: bool = False,
+    bottle_cache: str = None,
+    builder: bool = False,
+    report: BuildReport = None,
+    mount_options: str = None,
+    local_build: str = None,
+    runtime: str = None,
+    pack: bool = False,
+) -> Dict[str, str]:
+    """
+    Mounts the EFS filesystem with `mount_options`, then installs the pip packages
+    and the Linuxbrew formulae at the same time.  If either pipeline fails, the
+    other is stopped.  Returns the status of each pipeline: "succeeded", "failed"
+    or "cancelled".
+
+    With `builder`, both pipelines run their steps in the long-lived containers of
+    one `BuilderSession`, which are removed once they finish.  The steps of the
+    mount and of both pipelines are recorded in `report`, if one is given.  With
+    `local_build`, both prefixes are built on local disk and synced to EFS.  The
+    pip packages are built for the Python `runtime`, and packed with `pack`, as in
+    `install_pip`.
+    """
+    report = report or BuildReport()
+
+    try:
+        mount(filesystem_id, CommandRunner("mount", report), mount_options)
+    except (CalledProcessError, OSError, ValueError) as error:
+        report.finish_pipeline("mount", "failed", error=str(error))
+        raise
+
+    report.finish_pipeline("mount", "succeeded")
+    session = BuilderSession() if builder else None
+
+    pipelines = {
+        "pip": lambda runner: install_pip(
+            incremental, keep, runner, wheelhouse, session, local_build, runtime, pack
+        ),
+        "brew": lambda runner: install_brew(
+            keep, runner, brew_closure, bottle_cache, session, local_build
+        ),
+    }
+    width = max(len(name) for name in pipelines)
+    output_lock = threading.Lock()
+    runners = {
+        name: PrefixedRunner(name, width, output_lock, report) for name in pipelines
+    }
+    statuses = {}
+
+    def run_pipeline(name):
+        runner = runners[name]
+
+        try:
+            generation = pipelines[name](runner)
+        except PipelineCancelled:
+            statuses[name] = "cancelled"
+            report.finish_pipeline(name, "cancelled")
+            return
+        # Anything else would end the thread silently and leave the other
+        # pipeline running
+        except Exception as error:  # pylint: disable=broad-except
+            statuses[name] = "failed"
+            report.finish_pipeline(name, "failed", error=str(error))
+            runner.print(f"ERROR: {error}")
+
+            for other in runners.values():
+                if other is not runner:
+                    other.cancel()
+
+            return
+
+        statuses[name] = "succeeded"
+        report.finish_pipeline(name, "succeeded", generation=generation)
+        runner.print(f"Generation {generation} is current.")
+
+    threads = [
+        threading.Thread(target=run_pipeline, args=(name,), name=f"install_{name}")
+        for name in pipelines
+    ]
+
+    try:
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+    finally:
+        if session is not None:
+            session.close()
+
+    # A pipeline without a status did not finish
+    return {name: statuses.get(name, "failed") for name in pipelines}
@@ -0,0 +1,275 @@
+"""
+Hybrid deployment of pip dependencies: the hottest ones in Lambda layers, which
+are extracted to local storage under `/opt`, and the rest on EFS.
+
+The split is planned from a local copy of the installed pip prefix, which must be
+installed for the Lambda runtime, and an import profile mapping top level module
+names to the time their import takes, in milliseconds.  The `ImportTimes` of the
+cold start metrics which `metrics_namespace` turns on are such a profile, and a
+file holding one of their log lines can be passed as it is.
+
+Distributions are moved whole, with their dist-info directory and compiled
+bytecode, in order of import time per byte, until the layer budget is spent.
+Lambda counts the function code and every layer towards a limit of 250 MB
+unzipped, and allows 5 layers, each uploaded directly of at most 50 MB zipped.
+The EFS prefix keeps its copy of each layered distribution; the layer directory
+precedes it on `PYTHONPATH`, so the layer copy is imported, and the module index,
+pack and `/tmp` cache defer to it.
+"""
+
+import csv
+import json
+import os
+import shutil
+from typing import Dict, List, Union
+
+import pulumi
+from pulumi.resource import ResourceOptions
+from pulumi_aws import lambda_
+
+from .development_environment import DevelopmentEnvironment
+from .get_environment_function_args import get_environment_function_args
+
+# Lambda extracts layers to /opt, and puts /opt/python on the path of Python
+# functions
+LAYER_PYTHON_DIRECTORY = "python"
+
+DEFAULT_MAX_LAYERS = 5
+DEFAULT_LAYER_SIZE = 100
+DEFAULT_TOTAL_LAYER_SIZE = 200
+
+_MIB = 2 ** 20
+
+
+def load_import_profile(profile: Union[str, Dict[str, float]]) -> Dict[str, float]:
+    """
+    Returns the import time of each top level module in `profile`, which is either
+    such a mapping or the path of a JSON file holding one, or holding a cold start
+    metrics record with `ImportTimes`.
+    """
+    if isinstance(profile, dict):
+        return profile
+
+    with open(profile) as profile_file:
+        data = json.load(profile_file)
+
+    return data.get("ImportTimes", data)
+
+
+def _distribution_files(directory, dist_info_name):
+    record_path = os.path.join(directory, dist_info_name, "RECORD")
+    paths = set()
+
+    with open(record_path, newline="", encoding="utf-8") as record:
+        for row in csv.reader(record):
+            if not row or row[0].startswith(".."):
+                continue
+
+            relative_path = os.path.normpath(row[0])
+
+            if os.path.isfile(os.path.join(directory, relative_path)):
+                paths.add(relative_path)
+
+    # Bytecode is compiled after installing, so it is not in the RECORD
+    for relative_path in list(paths):
+        if not relative_path.endswith(".py"):
+            continue
+
+        source_directory, file_name = os.path.split(relative_path)
+        cache_directory = os.path.join(source_directory, "__pycache__")
+        stem = file_name[: -len(".py")] + "."
+
+        try:
+            cache_files = os.listdir(os.path.join(directory, cache_directory))
+        except OSError:
+            continue
+
+        paths.update(
+            os.path.join(cache_directory, cache_file)
+            for cache_file in cache_files
+            if cache_file.startswith(stem) and cache_file.endswith(".pyc")
+        )
+
+    for root, _, file_names in os.walk(os.path.join(directory, dist_info_name)):
+        paths.update(
+            os.path.relpath(os.path.join(root, file_name), directory)
+            for file_name in file_names
+        )
+
+    return sorted(paths)
+
+
+def read_distributions(directory: str) -> List[Dict]:
+    """
+    Returns the name, top level modules, files and size of each distribution
+    installed in the pip prefix at `directory`, from their RECORD files.
+    """
+    distributions = []
+
+    for entry in sorted(os.listdir(directory)):
+        if not entry.endswith(".dist-info"):
+            continue
+
+        if not os.path.isfile(os.path.join(directory, entry, "RECORD")):
+            continue
+
+        files = _distribution_files(directory, entry)
+        top_level = {
+            path.split(os.sep)[0].split(".")[0]
+            for path in files
+            if not path.startswith(entry) and not path.startswith("__pycache__")
+        }
+        distributions.append(
+            {
+                "name": entry[: -len(".dist-info")].split("-")[0],
+                "top_level": sorted(top_level),
+                "files": files,
+                "bytes": sum(
+                    os.path.getsize(os.path.join(directory, path)) for path in files
+                ),
+            }
+        )
+
+    return distributions
+
+
+def plan_layers(
+    directory: str,
+    profile: Union[str, Dict[str, float]],
+    max_layers: int = DEFAULT_MAX_LAYERS,
+    layer_size: int = DEFAULT_LAYER_SIZE,
+    total_layer_size: int = DEFAULT_TOTAL_LAYER_SIZE,
+) -> List[List[Dict]]:
+    """
+    Chooses the distributions in the pip prefix at `directory` to move to layers,
+    given their import times in `profile`, and returns the distributions of each
+    layer.  At most `max_layers` layers of `layer_size` MiB are planned, holding
+    at most `total_layer_size` MiB between them.
+    """
+    import_times = load_import_profile(profile)
+    candidates = []
+
+    for distribution in read_distributions(directory):
+        import_time = sum(
+            import_times.get(name, 0) for name in distribution["top_level"]
+        )
+
+        if import_time > 0 and distribution["bytes"] <= layer_size * _MIB:
+            heat = import_time / max(distribution["bytes"], 1)
+            candidates.append((heat, distribution))
+
+    candidates.sort(key=lambda candidate: -candidate[0])
+    layers = []
+    layer_bytes = []
+    remaining = total_layer_size * _MIB
+
+    for _, distribution in candidates:
+        size = distribution["bytes"]
+
+        if size > remaining:
+            continue
+
+        for i, used in enumerate(layer_bytes):
+            if used + size <= layer_size * _MIB:
+                layers[i].append(distribution)
+                layer_bytes[i] += size
+                break
+        else:
+            if len(layers) == max_layers:
+                continue
+
+            layers.append([distribution])
+            layer_bytes.append(size)
+
+        remaining -= size
+
+    return layers
+
+
+def build_layer_directories(
+    directory: str, layers: List[List[Dict]], output_directory: str
+) -> List[str]:
+    """
+    Copies the files of each planned layer from the pip prefix at `directory` into
+    a directory of its own under `output_directory`, laid out as Lambda expects,
+    and returns those directories.  Anything already in `output_directory` is
+    replaced.
+    """
+    shutil.rmtree(output_directory, ignore_errors=True)
+    layer_directories = []
+
+    for i, distributions in enumerate(layers):
+        layer_directory = os.path.join(output_directory, str(i))
+        python_directory = os.path.join(layer_directory, LAYER_PYTHON_DIRECTORY)
+
+        for distribution in distributions:
+            for relative_path in distribution["files"]:
+                target_path = os.path.join(python_directory, relative_path)
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                shutil.copy2(os.path.join(directory, relative_path), target_path)
+
+        layer_directories.append(layer_directory)
+
+    return layer_directories
+
+
+def print_layer_plan(layers: List[List[Dict]]):
+    for i, distributions in enumerate(layers):
+        size = sum(distribution["bytes"] for distribution in distributions)
+        names = ", ".join(distribution["name"] for distribution in distributions)
+        print(f"Layer {i}: {size / _MIB:.1f} MiB: {names}")
+
+    if not layers:
+        print("No distributions in the profile fit in a layer.")
+
+
+def get_hybrid_function_args(
+    name: str,
+    development_environment: DevelopmentEnvironment,
+    pip_directory: str,
+    profile: Union[str, Dict[str, float]],
+    layer_directory: str = None,
+    compatible_runtimes: List[str] = None,
+    max_layers: int = DEFAULT_MAX_LAYERS,
+    layer_size: int = DEFAULT_LAYER_SIZE,
+    total_layer_size: int = DEFAULT_TOTAL_LAYER_SIZE,
+    opts: ResourceOptions = None,
+    **function_args,
+):
+    """
+    Like `get_environment_function_args`, which receives `function_args`, but
+    moves the hottest distributions into Lambda layers named after `name`.  The
+    layers are planned by `plan_layers` from `pip_directory`, a local copy of the
+    pip prefix installed on EFS, and `profile`, and built in `layer_directory`,
+    `.lambda_efs_layers/<name>` by default.  The returned arguments include the
+    layer ARNs, with the layers ahead of EFS on the Python path.
+
+    The layers hold bytecode compiled for the environment's `python_runtime`, so
+    they are only compatible with that runtime unless `compatible_runtimes` says
+    otherwise.
+    """
+    layers = plan_layers(
+        pip_directory, profile, max_layers, layer_size, total_layer_size
+    )
+    layer_directory = layer_directory or os.path.join(".lambda_efs_layers", name)
+    compatible_runtimes = compatible_runtimes or [
+        development_environment.python_runtime
+    ]
+    layer_versions = [
+        lambda_.LayerVersion(
+            f"{name}DependencyLayer{i}",
+            layer_name=f"{name}DependencyLayer{i}",
+            code=pulumi.FileArchive(directory),
+            compatible_runtimes=compatible_runtimes,
+            opts=opts,
+        )
+        for i, directory in enumerate(
+            build_layer_directories(pip_directory, layers, layer_directory)
+        )
+    ]
+
+    return get_environment_function_args(
+        development_environment,
+        layers=[layer_version.arn for layer_version in layer_versions],
+        **function_args,
+    )
@@ -0,0 +1,212 @@
+"""
+Throughput and metadata benchmark of a mounted filesystem.
+
+Cold starts on EFS are dominated by metadata operations on many small files, while
+installs also move large files, so the benchmark measures both: creating, stating,
+opening and removing many small files, and writing and reading one large file
+sequentially.  It runs in a temporary directory inside the given one, which may be
+on any filesystem, so that option sets can be compared against each other and
+against local disk.  When run as root, the page cache is dropped before each read
+phase, so that reads go to the server rather than to memory.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict
+
+from .install import find_mount
+
+DEFAULT_SMALL_FILES = 1000
+DEFAULT_SMALL_FILE_SIZE = 4096
+DEFAULT_SEQUENTIAL_SIZE = 256 * 2 ** 20
+
+_BLOCK_SIZE = 2 ** 20
+_MIB = 2 ** 20
+
+
+def _drop_caches():
+    # Only root may drop the caches, and the benchmark is still useful without
+    try:
+        os.sync()
+
+        with open("/proc/sys/vm/drop_caches", "w") as drop_caches:
+            drop_caches.write("3\n")
+    except OSError:
+        return False
+
+    return True
+
+
+def _rate(count, seconds):
+    return round(count / max(seconds, 1e-9), 1)
+
+
+def _timed(action, paths):
+    start = time.perf_counter()
+
+    for path in paths:
+        action(path)
+
+    return time.perf_counter() - start
+
+
+def _create(path, data):
+    with open(path, "wb") as output_file:
+        output_file.write(data)
+
+
+def _read(path):
+    with open(path, "rb") as input_file:
+        input_file.read()
+
+
+def measure_small_files(directory: str, count: int, size: int) -> Dict:
+    """
+    Returns the small files created, stated, opened and read, and removed per
+    second in `directory`, with `count` files of `size` bytes.
+    """
+    data = os.urandom(size)
+    paths = [os.path.join(directory, f"small_{i:06d}") for i in range(count)]
+
+    create_seconds = _timed(lambda path: _create(path, data), paths)
+    _drop_caches()
+    stat_seconds = _timed(os.stat, paths)
+    _drop_caches()
+    open_seconds = _timed(_read, paths)
+    remove_seconds = _timed(os.remove, paths)
+
+    return {
+        "files": count,
+        "file_size": size,
+        "create_per_second": _rate(count, create_seconds),
+        "stat_per_second": _rate(count, stat_seconds),
+        "open_per_second": _rate(count, open_seconds),
+        "remove_per_second": _rate(count, remove_seconds),
+    }
+
+
+def measure_sequential(directory: str, size: int) -> Dict:
+    """
+    Returns the MiB per second of writing a file of `size` bytes to `directory`
+    in blocks of 1 MiB, including flushing it to the server, and of reading it
+    back.
+    """
+    path = os.path.join(directory, "sequential")
+    block = os.urandom(_BLOCK_SIZE)
+    blocks = max(size // _BLOCK_SIZE, 1)
+
+    start = time.perf_counter()
+
+    with open(path, "wb") as output_file:
+        for _ in range(blocks):
+            output_file.write(block)
+
+        output_file.flush()
+        os.fsync(output_file.fileno())
+
+    write_seconds = time.perf_counter() - start
+    _drop_caches()
+    start = time.perf_counter()
+
+    with open(path, "rb") as input_file:
+        while input_file.read(_BLOCK_SIZE):
+            pass
+
+    read_seconds = time.perf_counter() - start
+    os.remove(path)
+    mib = blocks * _BLOCK_SIZE / _MIB
+
+    return {
+        "bytes": blocks * _BLOCK_SIZE,
+        "write_mib_per_second": _rate(mib, write_seconds),
+        "read_mib_per_second": _rate(mib, read_seconds),
+    }
+
+
+def bench_mount(
+    directory: str,
+    small_files: int = DEFAULT_SMALL_FILES,
+    small_file_size: int = DEFAULT_SMALL_FILE_SIZE,
+    sequential_size: int = DEFAULT_SEQUENTIAL_SIZE,
+) -> Dict:
+    """
+    Benchmarks the filesystem holding `directory`, as described above, and returns
+    the results together with the mount they were measured on.
+    """
+    work_directory = tempfile.mkdtemp(prefix=".lambda_efs_bench_", dir=directory)
+    caches_dropped = _drop_caches()
+
+    try:
+        small = measure_small_files(work_directory, small_files, small_file_size)
+        sequential = measure_sequential(work_directory, sequential_size)
+    finally:
+        shutil.rmtree(work_directory, ignore_errors=True)
+
+    return {
+        "directory": os.path.abspath(directory),
+        "mount": find_mount(directory),
+        "caches_dropped": caches_dropped,
+        "small_files": small,
+        "sequential": sequential,
+    }
+
+
+def write_mount_benchmark(result: Dict, path: str):
+    with open(path, "w") as output_file:
+        json.dump(result, output_file, indent=2)
+        output_file.write("\n")
+
+
+def load_mount_benchmark(path: str) -> Dict:
+    with open(path) as input_file:
+        return json.load(input_file)
+
+
+_MEASUREMENTS = [
+    ("small_files", "create_per_second", "Create", "files/s"),
+    ("small_files", "stat_per_second", "Stat", "files/s"),
+    ("small_files", "open_per_second", "Open and read", "files/s"),
+    ("small_files", "remove_per_second", "Remove", "files/s"),
+    ("sequential", "write_mib_per_second", "Sequential write", "MiB/s"),
+    ("sequential", "read_mib_per_second", "Sequential read", "MiB/s"),
+]
+
+
+def print_mount_benchmark(result: Dict, baseline: Dict = None):
+    """
+    Prints the results of `bench_mount`, with the change from those of an earlier
+    run in `baseline`, if given.
+    """
+    mount = result["mount"]
+    small = result["small_files"]
+
+    print(f"Directory: {result['directory']}")
+
+    if mount:
+        print(
+            f"Mount:     {mount['source']} on {mount['mount_point']} ({mount['type']})"
+        )
+        print(f"Options:   {mount['options']}")
+
+    if not result["caches_dropped"]:
+        print("The page cache could not be dropped, so reads may come from memory.")
+
+    print(
+        f"{small['files']} small files of {small['file_size']} bytes, "
+        f"{result['sequential']['bytes'] / _MIB:.0f} MiB sequential:"
+    )
+
+    for section, key, label, unit in _MEASUREMENTS:
+        value = result[section][key]
+        line = f"  {label:<18} {value:>12.1f} {unit}"
+
+        if baseline is not None:
+            previous = baseline[section][key]
+
+            if previous:
+                line += f"  ({value / previous - 1:+.0%} from {previous:.1f})"
+
+        print(line)
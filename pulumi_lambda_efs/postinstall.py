@@ -0,0 +1,82 @@
+import hashlib
+import os
+
+from importlib_resources import files
+
+from .runtime.module_index import write_module_index
+from .runtime.tmp_cache import INSTALL_ID_FILENAME
+
+runtime_package_name = "lambda_efs_runtime"
+
+
+def install_runtime(directory: str):
+    """
+    Copies the `pulumi_lambda_efs.runtime` helpers into `directory` as the top level
+    `lambda_efs_runtime` package, along with the `sitecustomize` module which
+    bootstraps them when the Lambda interpreter starts.
+    """
+    runtime_directory = os.path.join(directory, runtime_package_name)
+    os.makedirs(runtime_directory, exist_ok=True)
+
+    for resource in files("pulumi_lambda_efs.runtime").iterdir():
+        if not resource.name.endswith(".py"):
+            continue
+
+        if resource.name == "sitecustomize.py":
+            target = os.path.join(directory, resource.name)
+        else:
+            target = os.path.join(runtime_directory, resource.name)
+
+        _replace_file(target, resource.read_bytes())
+
+
+def write_install_id(directory: str) -> str:
+    """
+    Writes an ID for the current contents of `directory`, derived from the path,
+    size and modification time of every file in it.  Runtime caches of the
+    directory compare it with the ID they were filled from to detect reinstalls.
+    """
+    digest = hashlib.sha256()
+
+    for root, directories, file_names in os.walk(directory):
+        directories.sort()
+
+        for file_name in sorted(file_names):
+            path = os.path.join(root, file_name)
+
+            if file_name == INSTALL_ID_FILENAME or not os.path.lexists(path):
+                continue
+
+            stat = os.lstat(path)
+            relative_path = os.path.relpath(path, directory)
+            digest.update(
+                f"{relative_path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode()
+            )
+
+    install_id = digest.hexdigest()
+
+    _replace_file(os.path.join(directory, INSTALL_ID_FILENAME), install_id.encode())
+    return install_id
+
+
+def _replace_file(path, data):
+    # Never written in place, since a new install generation starts out with its
+    # files hard linked to the previous one's
+    temporary_path = f"{path}.tmp"
+
+    with open(temporary_path, "wb") as temporary_file:
+        temporary_file.write(data)
+
+    os.replace(temporary_path, path)
+
+
+def postinstall_pip(directory: str):
+    """
+    Prepares a pip prefix which has just been populated by `pip install --target`
+    for use by Lambda functions.
+    """
+    print(f"Installing runtime helpers into {directory}...")
+    install_runtime(directory)
+
+    print("Writing module index...")
+    write_module_index(directory)
@@ -0,0 +1,49 @@
+from pulumi.output import Input
+from pulumi.resource import ResourceOptions
+from pulumi_aws import lambda_
+
+
+def create_provisioned_alias(
+    name: str,
+    function: lambda_.Function,
+    provisioned_concurrent_executions: Input[int],
+    alias_name: str = "live",
+    opts: ResourceOptions = None,
+) -> lambda_.Alias:
+    """
+    Creates an alias named `alias_name` for the latest published version of
+    `function`, with `provisioned_concurrent_executions` instances kept
+    initialised, and returns the alias.  The function must be created with
+    `publish=True`, so that each deploy publishes a version for the alias to point
+    at.
+
+    Provisioned instances run the function's init phase, and so the imports and
+    warmup configured by `get_environment_function_args`, when the version is
+    deployed, reading the dependencies from EFS before any traffic arrives.  Only
+    invocations of the alias use them, so callers such as API Gateway should
+    invoke `alias.invoke_arn` or `alias.arn`, rather than the function itself.
+
+    The alias is a child of the function, and the concurrency config of the alias,
+    with `opts` applied to both.
+    """
+    alias = lambda_.Alias(
+        f"{name}Alias",
+        name=alias_name,
+        function_name=function.name,
+        function_version=function.version,
+        opts=ResourceOptions.merge(
+            opts, ResourceOptions(parent=function, depends_on=[function])
+        ),
+    )
+
+    lambda_.ProvisionedConcurrencyConfig(
+        f"{name}ProvisionedConcurrency",
+        function_name=function.name,
+        qualifier=alias.name,
+        provisioned_concurrent_executions=provisioned_concurrent_executions,
+        opts=ResourceOptions.merge(
+            opts, ResourceOptions(parent=alias, depends_on=[alias])
+        ),
+    )
+
+    return alias
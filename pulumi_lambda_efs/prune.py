@@ -0,0 +1,347 @@
+"""
+Pruning of the files which functions never use from an installed prefix.
+
+Packages install their test suites, documentation, C headers and sources, static
+archives and unstripped native libraries along with the modules themselves.  All
+of these add to the bytes stored on EFS, and the tests and documentation to the
+files which imports and the install steps which follow have to walk.
+
+Paths are matched against `fnmatch` patterns: a pattern containing a slash is
+matched against the path relative to the prefix, where `*` also matches slashes,
+and any other pattern against the file or directory name at any depth.  A path
+matching a `remove` pattern is removed, with everything under it, unless it
+matches a `keep` pattern.  Keeping a path inside a removed directory keeps that
+path only.  Native libraries are then stripped of the symbols which are not
+needed to link against them.
+
+The rules come from `prune.json` in the current directory, if there is one, with
+an object for each kind of prefix, all of whose fields are optional:
+
+    {"pip": {"keep": ["pandas/tests"], "remove": ["*.md"], "strip": true,
+             "defaults": true},
+     "brew": {...}}
+
+The default rules, used unless `defaults` is false, are in `DEFAULT_RULES`.
+
+Stripped libraries are written to a temporary file and renamed over the original,
+since generations seeded from the current one hard link to its files.  Libraries
+which `strip` would leave unloadable are kept as they are.
+"""
+
+import json
+import os
+import shutil
+import stat
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatchcase
+from typing import Dict, List
+
+from .runtime.elf import ELF_MAGIC, read_dynamic, read_load_segments
+
+PRUNE_CONFIG_FILENAME = "prune.json"
+
+PRUNE_KINDS = ("pip", "brew")
+
+DEFAULT_RULES = {
+    "pip": {
+        "remove": [
+            "tests",
+            "docs",
+            "doc",
+            "*.h",
+            "*.hpp",
+            "*.c",
+            "*.cpp",
+            "*.pyx",
+            "*.pxd",
+            "*.pyi",
+            "*.a",
+            "*.la",
+            "*.dist-info/REQUESTED",
+            "*.dist-info/direct_url.json",
+        ],
+        "keep": [],
+    },
+    # Headers are kept, since Linuxbrew may build a later formula from source
+    # against them, and Linuxbrew itself is left alone
+    "brew": {
+        "remove": [
+            "share/doc",
+            "share/man",
+            "share/info",
+            "Cellar/*/share/doc",
+            "Cellar/*/share/man",
+            "Cellar/*/share/info",
+            "*.a",
+        ],
+        "keep": ["Homebrew", "Library", "var", "etc"],
+    },
+}
+
+_STRIP_SUFFIX = ".lambda_efs_strip"
+
+
+def load_prune_config(path: str) -> dict:
+    """
+    Reads a prune configuration file, raising `ValueError` if it is malformed.
+    """
+    with open(path) as config_file:
+        config = json.load(config_file)
+
+    if not isinstance(config, dict) or not set(config) <= set(PRUNE_KINDS):
+        raise ValueError(f"{path} must map some of {PRUNE_KINDS} to prune rules")
+
+    for kind, rules in config.items():
+        if not isinstance(rules, dict) or not set(rules) <= {
+            "keep",
+            "remove",
+            "strip",
+            "defaults",
+        }:
+            raise ValueError(
+                f'The {kind} rules in {path} may only set "keep", "remove", '
+                '"strip" and "defaults"'
+            )
+
+    return config
+
+
+def prune_rules(kind: str, config: dict = None) -> dict:
+    """
+    Returns the `remove` and `keep` patterns and the `strip` setting for a prefix
+    of `kind`, combining the defaults with `config`.
+    """
+    rules = (config or {}).get(kind, {})
+    defaults = DEFAULT_RULES[kind] if rules.get("defaults", True) else {}
+
+    return {
+        "remove": defaults.get("remove", []) + rules.get("remove", []),
+        "keep": defaults.get("keep", []) + rules.get("keep", []),
+        "strip": rules.get("strip", True),
+    }
+
+
+def _matches(relative_path, patterns):
+    name = os.path.basename(relative_path)
+
+    for pattern in patterns:
+        if fnmatchcase(relative_path if "/" in pattern else name, pattern):
+            return True
+
+    return False
+
+
+def _has_kept_descendant(relative_path, keep_patterns):
+    return any(pattern.startswith(relative_path + "/") for pattern in keep_patterns)
+
+
+def _package_name(kind, relative_path):
+    parts = relative_path.split("/")
+
+    if kind == "brew":
+        return parts[1] if parts[0] == "Cellar" and len(parts) > 1 else parts[0]
+
+    # numpy, numpy.libs and numpy-1.19.0.dist-info all belong to numpy
+    name = parts[0].split("-", 1)[0] if len(parts) > 1 else parts[0]
+
+    for suffix in (".libs", ".py"):
+        if name.endswith(suffix):
+            name = name[: -len(suffix)]
+
+    return name
+
+
+def _tree_size(path):
+    if not os.path.isdir(path) or os.path.islink(path):
+        return 1, os.lstat(path).st_size
+
+    files = 0
+    size = 0
+
+    for root, _, file_names in os.walk(path):
+        for file_name in file_names:
+            files += 1
+            size += os.lstat(os.path.join(root, file_name)).st_size
+
+    return files, size
+
+
+def _remove(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
+
+
+def _is_native_library(path, file_stat):
+    name = os.path.basename(path)
+
+    if not stat.S_ISREG(file_stat.st_mode):
+        return False
+
+    if not (name.endswith(".so") or ".so." in name):
+        return False
+
+    with open(path, "rb") as library:
+        return library.read(len(ELF_MAGIC)) == ELF_MAGIC
+
+
+def _is_loadable_strip(path, stripped_path):
+    """
+    Returns whether the stripped copy of a library can still be loaded.  Libraries
+    rewritten by `patchelf`, such as those vendored into wheels by `auditwheel`,
+    can come out of `strip` with segments the dynamic linker refuses to map.
+    """
+    segments = read_load_segments(stripped_path)
+
+    if not segments or read_dynamic(stripped_path) != read_dynamic(path):
+        return False
+
+    return all(
+        align <= 1 or (address - offset) % align == 0
+        for address, offset, _, align in segments
+    )
+
+
+def _strip(path, dry_run):
+    """
+    Strips the library at `path` and returns the bytes saved, or 0 if stripping
+    failed or saved nothing.
+    """
+    temporary_path = path + _STRIP_SUFFIX
+    result = subprocess.run(
+        ["strip", "--strip-unneeded", "-o", temporary_path, path],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        check=False,
+    )
+
+    # Libraries which strip cannot handle are left as they are
+    if result.returncode != 0 or not os.path.exists(temporary_path):
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+        return 0
+
+    saved = os.path.getsize(path) - os.path.getsize(temporary_path)
+
+    if not _is_loadable_strip(path, temporary_path):
+        saved = 0
+
+    if dry_run or saved <= 0:
+        os.remove(temporary_path)
+        return max(saved, 0)
+
+    shutil.copystat(path, temporary_path)
+    os.replace(temporary_path, path)
+    return saved
+
+
+def prune(
+    directory: str,
+    kind: str,
+    config: dict = None,
+    dry_run: bool = False,
+    workers: int = 8,
+) -> Dict[str, Dict[str, int]]:
+    """
+    Removes the files matching the prune rules for `kind` from the prefix at
+    `directory` and strips its native libraries on `workers` threads.  With
+    `dry_run`, nothing is changed.  Returns the files and bytes removed and the
+    bytes saved by stripping for each package.
+    """
+    rules = prune_rules(kind, config)
+    report = {}
+    libraries = []
+
+    def record(relative_path, files=0, size=0, stripped=0):
+        package = report.setdefault(
+            _package_name(kind, relative_path),
+            {"files": 0, "bytes": 0, "stripped_bytes": 0},
+        )
+        package["files"] += files
+        package["bytes"] += size
+        package["stripped_bytes"] += stripped
+
+    def visit(path, relative_path, removing):
+        with os.scandir(path) as entries:
+            entries = sorted(entries, key=lambda entry: entry.name)
+
+        for entry in entries:
+            entry_relative_path = (
+                f"{relative_path}/{entry.name}" if relative_path else entry.name
+            )
+
+            if _matches(entry_relative_path, rules["keep"]):
+                continue
+
+            is_directory = entry.is_dir(follow_symlinks=False)
+            remove = removing or _matches(entry_relative_path, rules["remove"])
+
+            if is_directory and (
+                not remove or _has_kept_descendant(entry_relative_path, rules["keep"])
+            ):
+                visit(entry.path, entry_relative_path, remove)
+                continue
+
+            if remove:
+                files, size = _tree_size(entry.path)
+                record(entry_relative_path, files, size)
+
+                if not dry_run:
+                    _remove(entry.path)
+            elif rules["strip"] and _is_native_library(
+                entry.path, entry.stat(follow_symlinks=False)
+            ):
+                libraries.append((entry.path, entry_relative_path))
+
+    visit(directory, "", False)
+
+    if libraries and shutil.which("strip") is None:
+        print("strip was not found, so native libraries were not stripped.")
+        libraries = []
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        saved = executor.map(lambda item: _strip(item[0], dry_run), libraries)
+
+        for (_, relative_path), stripped in zip(libraries, saved):
+            record(relative_path, stripped=stripped)
+
+    return report
+
+
+def print_prune_report(report: Dict[str, Dict[str, int]], dry_run: bool = False):
+    removed = "Would remove" if dry_run else "Removed"
+    print(f"{'package':<30} {'files':>8} {'removed MiB':>12} {'stripped MiB':>13}")
+
+    for package, result in sorted(
+        report.items(), key=lambda item: -item[1]["bytes"] - item[1]["stripped_bytes"]
+    ):
+        if not (result["files"] or result["stripped_bytes"]):
+            continue
+
+        print(
+            f"{package:<30} {result['files']:>8} {result['bytes'] / 2 ** 20:>12.2f} "
+            f"{result['stripped_bytes'] / 2 ** 20:>13.2f}"
+        )
+
+    totals = {
+        key: sum(result[key] for result in report.values())
+        for key in ("files", "bytes", "stripped_bytes")
+    }
+    print(
+        f"{removed} {totals['files']} files and {totals['bytes'] / 2 ** 20:.1f} MiB, "
+        f"and {totals['stripped_bytes'] / 2 ** 20:.1f} MiB by stripping."
+    )
+
+
+def prune_config_arguments(config_path: str = PRUNE_CONFIG_FILENAME) -> List[str]:
+    """
+    Returns the arguments which pass the prune configuration in the current
+    directory, if there is one, to the `prune` command.
+    """
+    if not os.path.isfile(config_path):
+        return []
+
+    return ["--config", os.path.abspath(config_path)]
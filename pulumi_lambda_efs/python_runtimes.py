@@ -0,0 +1,28 @@
+"""
+The Lambda Python runtimes which pip packages can be installed for.
+
+The pip prefix is precompiled at install time, and bytecode is only used by the
+interpreter version which wrote it, so the install must run in the build image of
+the runtime which the functions use.  The runtime is chosen on the
+`DevelopmentEnvironment`, which passes it to the CodeBuild project's builds, and
+`get_environment_function_args` checks that functions use the same one.
+"""
+
+# The variable which passes the runtime to the install commands
+PYTHON_RUNTIME_ENV = "PYTHON_RUNTIME"
+
+DEFAULT_PYTHON_RUNTIME = "python3.8"
+
+# The build image of each runtime which supports unchecked hash-based bytecode
+PYTHON_RUNTIME_IMAGES = {
+    "python3.7": "lambci/lambda:build-python3.7",
+    "python3.8": "lambci/lambda:build-python3.8",
+}
+
+
+def check_python_runtime(runtime: str):
+    if runtime not in PYTHON_RUNTIME_IMAGES:
+        raise ValueError(
+            f"The Python runtime must be one of {', '.join(PYTHON_RUNTIME_IMAGES)}, "
+            f"not {runtime}"
+        )
@@ -0,0 +1,134 @@
+"""
+Runtime helpers which run inside the Lambda function rather than at deployment time.
+
+The modules in this package only depend on the standard library.  They are copied
+into the EFS pip prefix as the top level `lambda_efs_runtime` package by the install
+commands, along with a `sitecustomize` module which calls `bootstrap()` when the
+interpreter starts.  Each helper is switched on by an environment variable which
+`get_environment_function_args` sets, so functions which do not opt in are
+unaffected.
+"""
+
+import os
+import sys
+
+MODULE_INDEX_ENV = "LAMBDA_EFS_MODULE_INDEX"
+PACK_ENV = "LAMBDA_EFS_PACK"
+PIP_PREFIX_ENV = "LAMBDA_EFS_PIP_PREFIX"
+BREW_PREFIX_ENV = "LAMBDA_EFS_BREW_PREFIX"
+TMP_CACHE_ENV = "LAMBDA_EFS_TMP_CACHE"
+TMP_CACHE_BREW_LIBRARIES_ENV = "LAMBDA_EFS_TMP_CACHE_BREW_LIBRARIES"
+PATCH_FIND_LIBRARY_ENV = "LAMBDA_EFS_PATCH_FIND_LIBRARY"
+METRICS_ENV = "LAMBDA_EFS_METRICS"
+LAZY_IMPORTS_ENV = "LAMBDA_EFS_LAZY_IMPORTS"
+WARMUP_MODULES_ENV = "LAMBDA_EFS_WARMUP_MODULES"
+WARMUP_LIBRARIES_ENV = "LAMBDA_EFS_WARMUP_LIBRARIES"
+WARMUP_HOOK_ENV = "LAMBDA_EFS_WARMUP_HOOK"
+
+
+def bootstrap():
+    """
+    Enables the runtime helpers requested through environment variables.  Failures
+    are reported on stderr rather than raised, so that a missing or stale file on
+    EFS degrades to the normal import behaviour instead of breaking the function.
+    """
+    pack_path = os.environ.get(PACK_ENV)
+    index_path = os.environ.get(MODULE_INDEX_ENV)
+    tmp_cache_budget = os.environ.get(TMP_CACHE_ENV)
+    metrics_namespace = os.environ.get(METRICS_ENV)
+    lazy_imports = os.environ.get(LAZY_IMPORTS_ENV)
+    warmup_modules = os.environ.get(WARMUP_MODULES_ENV, "")
+    warmup_libraries = os.environ.get(WARMUP_LIBRARIES_ENV, "")
+    warmup_hook = os.environ.get(WARMUP_HOOK_ENV)
+
+    # First, so that the other helpers' work is included in the metrics
+    if metrics_namespace:
+        _enable("metrics", _install_metrics, metrics_namespace)
+
+    # The cache finder goes ahead of the index, so that cached packages are
+    # imported from /tmp rather than through the index from EFS
+    if tmp_cache_budget:
+        _enable("/tmp cache", _install_tmp_cache, tmp_cache_budget)
+
+    if pack_path:
+        _enable("pack", _install_pack_finder, pack_path)
+
+    if index_path:
+        _enable("module index", _install_index_finder, index_path)
+
+    if os.environ.get(PATCH_FIND_LIBRARY_ENV):
+        _enable("find_library patch", _patch_find_library)
+
+    # After the finders, so that the warmup imports through them, and before the
+    # lazy imports, so that the modules it declares are loaded in full
+    if warmup_modules or warmup_libraries or warmup_hook:
+        _enable("warmup", _warmup, warmup_modules, warmup_libraries, warmup_hook)
+
+    # Last, since the lazy finder goes ahead of all the others and uses them
+    if lazy_imports:
+        _enable("lazy imports", _install_lazy_imports, lazy_imports)
+
+
+# Each helper is imported only when it is switched on, so that functions do not
+# pay for reading the others from EFS
+# pylint: disable=import-outside-toplevel
+
+
+def _enable(description, install, *args):
+    try:
+        install(*args)
+    except (OSError, ValueError) as error:
+        print(f"lambda_efs_runtime: {description} disabled: {error}", file=sys.stderr)
+
+
+def _install_metrics(namespace):
+    from .metrics import install_metrics
+
+    install_metrics(namespace, os.environ.get(BREW_PREFIX_ENV))
+
+
+def _install_tmp_cache(budget):
+    from .tmp_cache import install_tmp_cache
+
+    brew_libraries = os.environ.get(TMP_CACHE_BREW_LIBRARIES_ENV, "")
+    install_tmp_cache(
+        int(budget),
+        os.environ[PIP_PREFIX_ENV],
+        os.environ.get(BREW_PREFIX_ENV),
+        [pattern for pattern in brew_libraries.split(",") if pattern],
+    )
+
+
+def _install_pack_finder(pack_path):
+    from .pack import install_pack_finder
+
+    install_pack_finder(pack_path)
+
+
+def _install_index_finder(index_path):
+    from .module_index import install_index_finder
+
+    install_index_finder(index_path)
+
+
+def _patch_find_library():
+    from .libraries import patch_find_library
+
+    patch_find_library()
+
+
+def _install_lazy_imports(names):
+    from .lazy import install_lazy_imports
+
+    install_lazy_imports([name for name in names.split(",") if name])
+
+
+def _warmup(modules, libraries, hook):
+    from .warmup import warmup
+
+    warmup(
+        [name for name in modules.split(",") if name],
+        [pattern for pattern in libraries.split(",") if pattern],
+        hook,
+        os.environ.get(BREW_PREFIX_ENV),
+    )
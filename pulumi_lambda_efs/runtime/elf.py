@@ -0,0 +1,149 @@
+"""
+A minimal reader for the dynamic section of ELF shared libraries, enough to find a
+library's soname, the libraries it needs and its search paths without shelling out
+to `objdump`.
+"""
+
+import mmap
+import os
+import struct
+from collections import namedtuple
+
+ELF_MAGIC = b"\x7fELF"
+
+PT_LOAD = 1
+PT_DYNAMIC = 2
+
+DT_NULL = 0
+DT_NEEDED = 1
+DT_STRTAB = 5
+DT_SONAME = 14
+DT_RPATH = 15
+DT_RUNPATH = 29
+
+ElfDynamic = namedtuple("ElfDynamic", ["soname", "needed", "rpath", "runpath"])
+
+
+def read_dynamic(path: str) -> ElfDynamic:
+    """
+    Returns the soname, needed libraries, rpath and runpath of the ELF file at
+    `path`, or `None` if it is not an ELF file or has no dynamic section.  Missing
+    string entries are returned as `None`, and `needed` as a list.
+    """
+    if os.path.getsize(path) < 64:
+        return None
+
+    with open(path, "rb") as elf_file:
+        with mmap.mmap(elf_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:4] != ELF_MAGIC:
+                return None
+
+            return _read_dynamic(data)
+
+
+def read_load_segments(path: str) -> list:
+    """
+    Returns the address, file offset, size and alignment of each loadable segment
+    of the ELF file at `path`, or `None` if it is not an ELF file.
+    """
+    if os.path.getsize(path) < 64:
+        return None
+
+    with open(path, "rb") as elf_file:
+        with mmap.mmap(elf_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:4] != ELF_MAGIC:
+                return None
+
+            return [
+                segment[1:]
+                for segment in _program_headers(data)
+                if segment[0] == PT_LOAD
+            ]
+
+
+def _program_headers(data):
+    """
+    Yields the type, address, file offset, size in the file and alignment of each
+    program header.
+    """
+    is_64_bit = data[4] == 2
+    endian = "<" if data[5] == 1 else ">"
+
+    if is_64_bit:
+        program_offset = struct.unpack_from(f"{endian}Q", data, 0x20)[0]
+        entry_size, entry_count = struct.unpack_from(f"{endian}HH", data, 0x36)
+        segment_format = f"{endian}IIQQQQQQ"
+    else:
+        program_offset = struct.unpack_from(f"{endian}I", data, 0x1C)[0]
+        entry_size, entry_count = struct.unpack_from(f"{endian}HH", data, 0x2A)
+        segment_format = f"{endian}IIIIIIII"
+
+    for i in range(entry_count):
+        segment = struct.unpack_from(
+            segment_format, data, program_offset + i * entry_size
+        )
+
+        if is_64_bit:
+            yield segment[0], segment[3], segment[2], segment[5], segment[7]
+        else:
+            yield segment[0], segment[2], segment[1], segment[4], segment[7]
+
+
+def _read_dynamic(data):
+    is_64_bit = data[4] == 2
+    endian = "<" if data[5] == 1 else ">"
+    dynamic_format = f"{endian}qQ" if is_64_bit else f"{endian}iI"
+    loads = []
+    dynamic = None
+
+    for segment_type, address, offset, size, _ in _program_headers(data):
+        if segment_type == PT_LOAD:
+            loads.append((address, offset, size))
+        elif segment_type == PT_DYNAMIC:
+            dynamic = (offset, size)
+
+    if dynamic is None:
+        return None
+
+    entries = []
+    entry_length = struct.calcsize(dynamic_format)
+
+    for position in range(dynamic[0], dynamic[0] + dynamic[1], entry_length):
+        tag, value = struct.unpack_from(dynamic_format, data, position)
+
+        if tag == DT_NULL:
+            break
+
+        entries.append((tag, value))
+
+    string_address = next((value for tag, value in entries if tag == DT_STRTAB), None)
+    string_offset = _address_to_offset(loads, string_address)
+
+    if string_offset is None:
+        return None
+
+    def string(value):
+        start = string_offset + value
+        end = data.find(b"\0", start)
+        return data[start:end].decode("utf-8", "replace")
+
+    def first(tag):
+        return next((string(value) for entry, value in entries if entry == tag), None)
+
+    return ElfDynamic(
+        soname=first(DT_SONAME),
+        needed=[string(value) for tag, value in entries if tag == DT_NEEDED],
+        rpath=first(DT_RPATH),
+        runpath=first(DT_RUNPATH),
+    )
+
+
+def _address_to_offset(loads, address):
+    if address is None:
+        return None
+
+    for segment_address, offset, size in loads:
+        if segment_address <= address < segment_address + size:
+            return address - segment_address + offset
+
+    return None
@@ -0,0 +1,96 @@
+"""
+Counts the filesystem calls which the import system makes, by swapping the `os`
+and `io` modules seen by `importlib` for proxies which record each call.  The
+proxies can also delay calls on paths under a given directory, to simulate the
+latency of a network filesystem.
+"""
+
+import threading
+import time
+from collections import Counter
+from importlib import _bootstrap_external
+from typing import Dict
+
+# Functions used by importlib, grouped into the operations which are reported
+OPERATIONS = {
+    "stat": "stat",
+    "lstat": "stat",
+    "listdir": "listdir",
+    "scandir": "listdir",
+    "open": "open",
+    "open_code": "open",
+    "FileIO": "open",
+}
+
+
+class _CountingModule:
+    def __init__(self, module, counter):
+        self._module = module
+        self._counter = counter
+
+    def __getattr__(self, name):
+        value = getattr(self._module, name)
+        operation = OPERATIONS.get(name)
+
+        if operation is None:
+            return value
+
+        counter = self._counter
+
+        def counted(*args, **kwargs):
+            counter.record(operation, args[0] if args else None)
+            return value(*args, **kwargs)
+
+        return counted
+
+
+class ImportIOCounter:
+    """
+    Context manager which counts the stat, listdir and open calls made by imports
+    inside the `with` block.  The totals are available from `counts` afterwards,
+    and the calls on paths under `directory`, if given, from `directory_counts`.
+
+    `latency` maps operations to a number of seconds to sleep before each call of
+    that kind under `directory`, or anywhere if there is none.  Only the calls
+    themselves are delayed, not reading from files which are already open.
+    """
+
+    def __init__(self, latency: Dict[str, float] = None, directory: str = None):
+        self.counts = Counter()
+        self.directory_counts = Counter()
+        self.latency = latency or {}
+        self.directory = directory
+        self._saved = None
+        self._lock = threading.Lock()
+
+    def record(self, operation: str, path):
+        # Calls may also be recorded from threads other than the importing one
+        with self._lock:
+            self.counts[operation] += 1
+
+            if self.directory is not None:
+                if not self._in_directory(path):
+                    return
+
+                self.directory_counts[operation] += 1
+
+        delay = self.latency.get(operation)
+
+        if delay:
+            time.sleep(delay)
+
+    def _in_directory(self, path):
+        if not isinstance(path, str):
+            return False
+
+        return path == self.directory or path.startswith(self.directory + "/")
+
+    def __enter__(self):
+        self._saved = (_bootstrap_external._os, _bootstrap_external._io)
+        _bootstrap_external._os = _CountingModule(self._saved[0], self)
+        _bootstrap_external._io = _CountingModule(self._saved[1], self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _bootstrap_external._os, _bootstrap_external._io = self._saved
+        return False
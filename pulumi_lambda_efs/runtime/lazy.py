@@ -0,0 +1,147 @@
+"""
+Lazy imports of declared heavy packages.
+
+Handlers usually import everything they might need at module level, so an
+invocation which never touches pandas still pays for reading it from EFS during
+the init phase.  For each declared package, importing it only creates an empty
+module, using `importlib.util.LazyLoader`; the package is found as usual, through
+any of the other helpers' finders, but its code runs, and the rest of its files
+are read, on the first access to one of its attributes.  The module then becomes
+the real package, so references taken before that keep working.
+
+`from package import name` accesses an attribute straight away, and so loads the
+package when it runs.  Packages whose top level module is an extension module are
+loaded as usual, since creating the module is what loads the native code.
+
+The packages loaded so far, with the time each took, are available from
+`triggered_imports()`, and a handler wrapped with `report_lazy_imports` logs those
+loaded during each invocation.
+"""
+
+import functools
+import json
+import sys
+import time
+from importlib.abc import Loader, MetaPathFinder
+from importlib.machinery import ExtensionFileLoader
+from importlib.util import LazyLoader
+
+_finder = None
+
+
+def _milliseconds(seconds):
+    return round(seconds * 1000, 3)
+
+
+class TriggerRecordingLoader(Loader):  # pylint: disable=abstract-method
+    """
+    Runs a lazily imported module with its real loader, recording when that
+    happens, and then hands the module back to the real loader.
+    """
+
+    def __init__(self, finder: "LazyImportFinder", loader: Loader):
+        self.finder = finder
+        self.loader = loader
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        module.__spec__.loader = self.loader
+        module.__loader__ = self.loader
+        start = time.perf_counter()
+
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.finder.record_trigger(module.__name__, time.perf_counter() - start)
+
+
+class LazyImportFinder(MetaPathFinder):
+    """
+    Finds the declared packages with the finders after it on `sys.meta_path`, and
+    makes their loaders lazy.
+    """
+
+    def __init__(self, names):
+        self.names = frozenset(names)
+        self.triggered = []
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname not in self.names:
+            return None
+
+        for finder in sys.meta_path:
+            if isinstance(finder, LazyImportFinder) or not hasattr(finder, "find_spec"):
+                continue
+
+            spec = finder.find_spec(fullname, path, target)
+
+            if spec is not None:
+                break
+        else:
+            return None
+
+        loader = spec.loader
+
+        if not hasattr(loader, "exec_module") or isinstance(
+            loader, ExtensionFileLoader
+        ):
+            return spec
+
+        spec.loader = LazyLoader(TriggerRecordingLoader(self, loader))
+        return spec
+
+    def record_trigger(self, name: str, elapsed: float):
+        self.triggered.append((name, elapsed))
+
+
+def install_lazy_imports(names) -> LazyImportFinder:
+    """
+    Makes the modules in `names` load lazily by putting a finder for them at the
+    start of `sys.meta_path`, ahead of those which would otherwise find them.
+    Modules which have already been imported are not affected.
+    """
+    global _finder  # pylint: disable=global-statement
+
+    _finder = LazyImportFinder(names)
+    sys.meta_path.insert(0, _finder)
+    return _finder
+
+
+def triggered_imports() -> dict:
+    """
+    Returns the lazily imported modules which have been loaded, in the order they
+    were loaded, with the milliseconds each took.
+    """
+    if _finder is None:
+        return {}
+
+    return {name: _milliseconds(elapsed) for name, elapsed in _finder.triggered}
+
+
+def report_lazy_imports(handler):
+    """
+    Wraps a Lambda handler so that each invocation logs a JSON line listing the
+    lazily imported modules it loaded and the milliseconds each took.
+    """
+
+    @functools.wraps(handler)
+    def reporting_handler(event, context):
+        loaded_before = len(_finder.triggered) if _finder else 0
+
+        try:
+            return handler(event, context)
+        finally:
+            triggered = _finder.triggered[loaded_before:] if _finder else []
+            report = {
+                "LazyImportsTriggered": {
+                    name: _milliseconds(elapsed) for name, elapsed in triggered
+                }
+            }
+            print(json.dumps(report, separators=(",", ":")), flush=True)
+
+    return reporting_handler
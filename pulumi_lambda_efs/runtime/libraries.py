@@ -0,0 +1,158 @@
+"""
+A replacement for `ctypes.util.find_library` which answers from an index of the
+Linuxbrew `lib` directory written at install time.
+
+On Linux the standard version runs `ldconfig`, `gcc`, `ld` and `objdump` in
+subprocesses to find a library, which takes seconds on Lambda.  The index maps each
+library name (`proj` for `libproj.so.25`) and each file name to a path, so a lookup
+is a dictionary access.  Names which are not in the index are passed on to the
+standard version.
+"""
+
+import ctypes.util
+import json
+import os
+import re
+
+from .elf import read_dynamic
+from .tmp_cache import BREW_LIBRARY_CACHE_DIRECTORY
+
+# Read by `find_library` itself, so defined here rather than in the package, which
+# imports this module
+LIBRARY_INDEX_ENV = "LAMBDA_EFS_LIBRARY_INDEX"
+LIBRARY_INDEX_FILENAME = ".lambda_efs_library_index.json"
+LIBRARY_INDEX_VERSION = 1
+
+_standard_find_library = ctypes.util.find_library
+_library_index = None
+
+
+def _version_key(file_name):
+    return [
+        int(part) if part.isdigit() else part for part in re.split(r"(\d+)", file_name)
+    ]
+
+
+def build_library_index(directory: str) -> dict:
+    """
+    Indexes the shared libraries in the `lib` directory of the Linuxbrew prefix at
+    `directory`.  Each library name maps to the file named by the soname of its
+    highest version, which is what the dynamic linker would load.
+    """
+    library_directory = os.path.join(directory, "lib")
+    libraries = {}
+
+    for file_name in sorted(os.listdir(library_directory), key=_version_key):
+        path = os.path.join(library_directory, file_name)
+        is_library = file_name.startswith("lib") and ".so" in file_name
+
+        if not is_library or not os.path.isfile(path):
+            continue
+
+        libraries[file_name] = f"lib/{file_name}"
+        dynamic = read_dynamic(path)
+
+        if dynamic is None:
+            continue
+
+        soname = dynamic.soname or file_name
+        # Without the "lib" prefix
+        name = file_name[3:].split(".so")[0]
+
+        if os.path.exists(os.path.join(library_directory, soname)):
+            libraries[name] = f"lib/{soname}"
+        else:
+            libraries[name] = f"lib/{file_name}"
+
+    return {"version": LIBRARY_INDEX_VERSION, "libraries": libraries}
+
+
+def write_library_index(directory: str) -> str:
+    """
+    Builds the library index for `directory` and writes it to
+    `LIBRARY_INDEX_FILENAME` inside it.  Returns the index path.
+    """
+    index_path = os.path.join(directory, LIBRARY_INDEX_FILENAME)
+    temporary_path = f"{index_path}.tmp"
+
+    with open(temporary_path, "w") as index_file:
+        json.dump(build_library_index(directory), index_file)
+
+    os.replace(temporary_path, index_path)
+    return index_path
+
+
+class LibraryIndex:
+    """
+    A library index loaded from `index_path`, mapping library and file names to
+    absolute paths.
+    """
+
+    def __init__(self, index_path: str):
+        with open(index_path) as index_file:
+            index = json.load(index_file)
+
+        if index.get("version") != LIBRARY_INDEX_VERSION:
+            raise ValueError(f"unsupported library index version in {index_path}")
+
+        directory = os.path.dirname(os.path.abspath(index_path))
+        self.libraries = {
+            name: os.path.join(directory, relative_path)
+            for name, relative_path in index["libraries"].items()
+        }
+
+    def find(self, name: str):
+        """
+        Returns the absolute path of the library `name`, preferring a copy in the
+        `/tmp` cache, or `None` if it is not in the index.
+        """
+        path = self.libraries.get(name)
+
+        if path is None:
+            return None
+
+        cached_path = os.path.join(BREW_LIBRARY_CACHE_DIRECTORY, os.path.basename(path))
+
+        if os.path.exists(cached_path):
+            return cached_path
+
+        return path
+
+
+def find_library(name: str):
+    """
+    Drop in replacement for `ctypes.util.find_library`, which returns the absolute
+    path of Linuxbrew libraries using the index at the path in the
+    `LAMBDA_EFS_LIBRARY_INDEX` environment variable.  The index is read on first
+    use, and if it cannot be, every lookup is passed to the standard version.
+    """
+    global _library_index  # pylint: disable=global-statement
+
+    if _library_index is None:
+        index_path = os.environ.get(LIBRARY_INDEX_ENV)
+
+        try:
+            _library_index = LibraryIndex(index_path) if index_path else False
+        except (OSError, ValueError):
+            _library_index = False
+
+    path = _library_index.find(name) if _library_index else None
+    return path or _standard_find_library(name)
+
+
+def reset_find_library():
+    """
+    Makes the next `find_library` call read the index again, such as after
+    `LAMBDA_EFS_LIBRARY_INDEX` has changed.
+    """
+    global _library_index  # pylint: disable=global-statement
+
+    _library_index = None
+
+
+def patch_find_library():
+    """
+    Replaces `ctypes.util.find_library` with `find_library`, so that libraries which
+    call it get the fast lookup too.
+    """
+    ctypes.util.find_library = find_library
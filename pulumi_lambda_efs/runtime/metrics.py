@@ -0,0 +1,219 @@
+"""
+Cold start instrumentation, reported as one CloudWatch embedded metric format
+line per cold start.
+
+It records how long each top level package took to import, excluding the other
+top level packages it imported, how many filesystem calls the import system made
+on EFS, and how long loading native libraries took: extension modules, whose
+Linuxbrew dependencies are loaded with them, and Linuxbrew libraries loaded with
+`ctypes`.  The line is printed once the handler module named by `_HANDLER` has
+been imported, which is the end of the function's init phase, or when the
+process exits if that never happens.
+
+Nothing here is imported unless the metrics are switched on.  When they are, the
+only work done outside of importing a module for the first time is timing
+`ctypes` library loads.
+"""
+
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from importlib import _bootstrap
+from importlib.machinery import ExtensionFileLoader
+
+from .iostats import ImportIOCounter
+from .tmp_cache import BREW_LIBRARY_CACHE_DIRECTORY
+
+DEFAULT_MOUNT_LOCATION = "/mnt/efs"
+
+
+def _milliseconds(seconds):
+    return round(seconds * 1000, 3)
+
+
+class ColdStartMetrics:  # pylint: disable=too-many-instance-attributes
+    """
+    Collects the metrics of one cold start.
+    """
+
+    def __init__(self, namespace: str, mount_location: str, brew_directory: str):
+        self.namespace = namespace
+        self.brew_directory = brew_directory
+        self.import_seconds = defaultdict(float)
+        self.dlopen_seconds = defaultdict(float)
+        self.total_import_seconds = 0.0
+        self.io_counter = ImportIOCounter(directory=mount_location)
+        self.emitted = False
+
+        # The modules being imported by each thread, with their start time and the
+        # time spent importing other modules from them
+        self.import_stacks = {}
+
+    def record_import(self, name: str, elapsed: float, own: float, outermost: bool):
+        self.import_seconds[name.partition(".")[0]] += own
+
+        if outermost:
+            self.total_import_seconds += elapsed
+
+    def record_dlopen(self, name: str, elapsed: float):
+        self.dlopen_seconds[name] += elapsed
+
+    def is_brew_library(self, name) -> bool:
+        if not isinstance(name, str):
+            return False
+
+        # Bare names are found on `LD_LIBRARY_PATH`, which has the Linuxbrew prefix
+        if "/" not in name:
+            return True
+
+        directories = [BREW_LIBRARY_CACHE_DIRECTORY]
+
+        if self.brew_directory:
+            directories.append(self.brew_directory)
+
+        return any(name.startswith(directory + "/") for directory in directories)
+
+    def to_record(self) -> dict:
+        efs_operations = Counter(self.io_counter.directory_counts)
+
+        return {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": self.namespace,
+                        "Dimensions": [["FunctionName"]],
+                        "Metrics": [
+                            {"Name": "ImportTime", "Unit": "Milliseconds"},
+                            {"Name": "EfsOperations", "Unit": "Count"},
+                            {"Name": "DlopenTime", "Unit": "Milliseconds"},
+                        ],
+                    }
+                ],
+            },
+            "FunctionName": os.environ.get("AWS_LAMBDA_FUNCTION_NAME", ""),
+            "ImportTime": _milliseconds(self.total_import_seconds),
+            "EfsOperations": sum(efs_operations.values()),
+            "DlopenTime": _milliseconds(sum(self.dlopen_seconds.values())),
+            "ImportTimes": {
+                name: _milliseconds(seconds)
+                for name, seconds in sorted(
+                    self.import_seconds.items(), key=lambda item: -item[1]
+                )
+            },
+            "EfsOperationCounts": dict(efs_operations),
+            "DlopenTimes": {
+                name: _milliseconds(seconds)
+                for name, seconds in self.dlopen_seconds.items()
+            },
+        }
+
+    def emit(self):
+        if self.emitted:
+            return
+
+        self.emitted = True
+        print(json.dumps(self.to_record(), separators=(",", ":")), flush=True)
+
+
+# The import system has no public hook around loading a module, so the private one
+# is wrapped
+# pylint: disable=protected-access
+
+
+def _wrap_find_and_load(metrics, handler_module):
+    find_and_load = _bootstrap._find_and_load
+
+    def timed_find_and_load(name, *args, **kwargs):
+        stack = metrics.import_stacks.setdefault(threading.get_ident(), [])
+        frame = [time.perf_counter(), 0.0]
+        stack.append(frame)
+
+        try:
+            return find_and_load(name, *args, **kwargs)
+        finally:
+            stack.pop()
+            elapsed = time.perf_counter() - frame[0]
+
+            if stack:
+                stack[-1][1] += elapsed
+
+            metrics.record_import(name, elapsed, elapsed - frame[1], not stack)
+
+            if name == "ctypes" and "ctypes" in sys.modules:
+                _wrap_ctypes(metrics, sys.modules["ctypes"])
+
+            if name == handler_module and not stack:
+                metrics.emit()
+
+    _bootstrap._find_and_load = timed_find_and_load
+
+
+def _wrap_extension_loader(metrics):
+    create_module = ExtensionFileLoader.create_module
+
+    # Extension modules of the standard library do not use Linuxbrew libraries
+    standard_library = os.path.join(sys.base_prefix, "")
+
+    def timed_create_module(self, spec):
+        if (spec.origin or "").startswith(standard_library):
+            return create_module(self, spec)
+
+        start = time.perf_counter()
+
+        try:
+            return create_module(self, spec)
+        finally:
+            metrics.record_dlopen(spec.name, time.perf_counter() - start)
+
+    ExtensionFileLoader.create_module = timed_create_module
+
+
+def _wrap_ctypes(metrics, ctypes):
+    initialise = ctypes.CDLL.__init__
+
+    if getattr(initialise, "_lambda_efs_metrics", False):
+        return
+
+    def timed_init(self, name, *args, **kwargs):
+        if not metrics.is_brew_library(name):
+            return initialise(self, name, *args, **kwargs)
+
+        start = time.perf_counter()
+
+        try:
+            return initialise(self, name, *args, **kwargs)
+        finally:
+            metrics.record_dlopen(os.path.basename(name), time.perf_counter() - start)
+
+    timed_init._lambda_efs_metrics = True
+    ctypes.CDLL.__init__ = timed_init
+
+
+def install_metrics(namespace: str, brew_directory: str = None) -> ColdStartMetrics:
+    """
+    Starts recording cold start metrics, which are emitted under `namespace` once
+    the handler module has been imported.  Libraries loaded from the Linuxbrew
+    prefix at `brew_directory` are told apart from the others.
+    """
+    metrics = ColdStartMetrics(
+        namespace,
+        os.environ.get("LAMBDA_PACKAGES_PATH", DEFAULT_MOUNT_LOCATION),
+        brew_directory,
+    )
+    handler = os.environ.get("_HANDLER", "")
+    handler_module = handler.rpartition(".")[0].replace("/", ".")
+
+    metrics.io_counter.__enter__()
+    _wrap_find_and_load(metrics, handler_module)
+    _wrap_extension_loader(metrics)
+
+    if "ctypes" in sys.modules:
+        _wrap_ctypes(metrics, sys.modules["ctypes"])
+
+    atexit.register(metrics.emit)
+    return metrics
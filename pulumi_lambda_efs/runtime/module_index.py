@@ -0,0 +1,232 @@
+"""
+A precomputed index of the modules in the EFS pip prefix, and a `sys.meta_path`
+finder which resolves imports from it.
+
+The default path finder lists and stats directories on every import, and each of
+those calls is a round trip to NFS when the directory lives on EFS.  The index is
+written once at install time, so at runtime it costs a single read, after which
+modules in the prefix are located without touching the filesystem.
+"""
+
+import json
+import os
+import sys
+from importlib.abc import MetaPathFinder
+from importlib.machinery import EXTENSION_SUFFIXES, PathFinder
+from importlib.util import spec_from_file_location
+
+INDEX_FILENAME = ".lambda_efs_module_index.json"
+INDEX_VERSION = 1
+
+SOURCE_SUFFIX = ".py"
+EXTENSION_SUFFIX = ".so"
+
+
+def build_module_index(directory: str) -> dict:
+    """
+    Walks the pip prefix at `directory` and returns an index mapping each fully
+    qualified module name to its candidate files, relative to `directory`.  The
+    candidates are listed in the order the default path finder would try them:
+    package before module, extension before source.
+
+    Extension modules are indexed under every ABI tag present, since the index may
+    be built by a different interpreter from the one which reads it; the finder
+    picks the first candidate which the running interpreter can load.
+    """
+    modules = {}
+    _index_directory(directory, "", "", modules)
+    return {"version": INDEX_VERSION, "modules": modules}
+
+
+def write_module_index(directory: str) -> str:
+    """
+    Builds the module index for `directory` and writes it to `INDEX_FILENAME`
+    inside it, replacing any previous index atomically.  Returns the index path.
+    """
+    index_path = os.path.join(directory, INDEX_FILENAME)
+    temporary_path = f"{index_path}.tmp"
+
+    with open(temporary_path, "w") as index_file:
+        json.dump(build_module_index(directory), index_file, separators=(",", ":"))
+
+    os.replace(temporary_path, index_path)
+    return index_path
+
+
+def _index_directory(root, relative_directory, package, modules):
+    prefix = f"{package}." if package else ""
+
+    with os.scandir(os.path.join(root, relative_directory)) as entries:
+        entries = sorted(entries, key=lambda entry: entry.name)
+
+    for entry in entries:
+        relative_path = os.path.join(relative_directory, entry.name)
+
+        if entry.is_dir():
+            if not entry.name.isidentifier() or entry.name == "__pycache__":
+                continue
+
+            module_name = prefix + entry.name
+            init_files = _module_files(os.listdir(entry.path), "__init__")
+
+            if init_files:
+                modules[module_name] = [
+                    os.path.join(relative_path, init_file) for init_file in init_files
+                ]
+
+            # Namespace packages are left to the path finder, but their contents
+            # are still indexed
+            _index_directory(root, relative_path, module_name, modules)
+
+    file_names = [entry.name for entry in entries if not entry.is_dir()]
+    module_names = {name.split(".")[0] for name in file_names}
+
+    for name in sorted(module_names):
+        if name == "__init__" or not name.isidentifier():
+            continue
+
+        module_files = _module_files(file_names, name)
+
+        if module_files:
+            candidates = modules.setdefault(prefix + name, [])
+            candidates.extend(
+                os.path.join(relative_directory, module_file)
+                for module_file in module_files
+            )
+
+
+def _module_files(file_names, name):
+    extensions = sorted(
+        file_name
+        for file_name in file_names
+        if file_name.startswith(f"{name}.") and file_name.endswith(EXTENSION_SUFFIX)
+    )
+    sources = [
+        file_name for file_name in file_names if file_name == name + SOURCE_SUFFIX
+    ]
+    return extensions + sources
+
+
+class IndexFinder(MetaPathFinder):
+    """
+    Finds modules in `directory` using an index produced by `build_module_index`,
+    and defers to the rest of `sys.meta_path` for anything the index does not
+    cover.  Top level names in `shadowed` are also deferred, so that directories
+    which precede the prefix on the path keep their precedence.
+    """
+
+    def __init__(self, directory: str, modules: dict, shadowed=frozenset()):
+        self.directory = directory
+        self.modules = modules
+        self.shadowed = shadowed
+
+    def find_spec(self, fullname, path=None, target=None):
+        # pylint: disable=unused-argument
+        if fullname.partition(".")[0] in self.shadowed:
+            return None
+
+        if path is not None and not any(self._contains(entry) for entry in path):
+            return None
+
+        for relative_path in self.modules.get(fullname, ()):
+            if not _is_loadable(relative_path):
+                continue
+
+            search_locations = None
+
+            if os.path.basename(relative_path).startswith("__init__."):
+                search_locations = [
+                    os.path.join(self.directory, os.path.dirname(relative_path))
+                ]
+
+            return self.create_spec(fullname, relative_path, search_locations)
+
+        return None
+
+    def create_spec(self, fullname, relative_path, search_locations):
+        filename = os.path.join(self.directory, relative_path)
+        return spec_from_file_location(
+            fullname, filename, submodule_search_locations=search_locations
+        )
+
+    def invalidate_caches(self):
+        pass
+
+    def _contains(self, entry):
+        entry = str(entry)
+        return entry == self.directory or entry.startswith(self.directory + os.sep)
+
+
+def _is_loadable(relative_path):
+    return relative_path.endswith(SOURCE_SUFFIX) or any(
+        relative_path.endswith(suffix) for suffix in EXTENSION_SUFFIXES
+    )
+
+
+def load_index_finder(index_path: str) -> IndexFinder:
+    """
+    Reads the index at `index_path` and returns a finder for the directory which
+    contains it.  Raises `ValueError` if the index was written by an incompatible
+    version of this package.
+    """
+    with open(index_path) as index_file:
+        index = json.load(index_file)
+
+    if index.get("version") != INDEX_VERSION:
+        raise ValueError(f"unsupported module index version in {index_path}")
+
+    directory = os.path.dirname(os.path.abspath(index_path))
+    return IndexFinder(directory, index["modules"], shadowed_names(directory))
+
+
+def install_index_finder(index_path: str) -> IndexFinder:
+    """
+    Loads the index at `index_path` and inserts its finder into `sys.meta_path`,
+    immediately ahead of the default path finder.
+    """
+    return insert_finder(load_index_finder(index_path))
+
+
+def insert_finder(finder: MetaPathFinder) -> MetaPathFinder:
+    """
+    Inserts `finder` into `sys.meta_path` immediately ahead of the default path
+    finder, so that built in and frozen modules are still found first.
+    """
+    position = len(sys.meta_path)
+
+    for i, existing in enumerate(sys.meta_path):
+        if existing is PathFinder:
+            position = i
+            break
+
+    sys.meta_path.insert(position, finder)
+    return finder
+
+
+def shadowed_names(directory):
+    """
+    Returns the top level names provided by the directories which the path finder
+    would search before `directory`: the entries ahead of it on `sys.path`, and the
+    Lambda task root, which the runtime prepends after startup.
+    """
+    earlier_entries = []
+
+    for entry in sys.path:
+        if os.path.abspath(entry or os.curdir) == directory:
+            break
+        earlier_entries.append(entry or os.curdir)
+
+    task_root = os.environ.get("LAMBDA_TASK_ROOT")
+
+    if task_root:
+        earlier_entries.append(task_root)
+
+    names = set()
+
+    for entry in earlier_entries:
+        try:
+            names.update(name.split(".")[0] for name in os.listdir(entry))
+        except OSError:
+            continue
+
+    return frozenset(names)
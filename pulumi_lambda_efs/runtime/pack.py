@@ -0,0 +1,367 @@
+"""
+A single file image of the EFS pip prefix, and an importer which serves modules and
+package data from it through a memory map.
+
+Importing from the prefix directly costs an NFS round trip for every file touched.
+The pack stores the same files back to back with an index at the end, so a cold
+start reads one file in large sequential chunks instead.  Extension modules cannot
+be loaded from memory, so they are extracted to local temporary storage the first
+time they are imported, along with the vendored shared libraries that wheels keep
+in `<package>.libs` directories next to them.
+
+Layout:
+
+    MAGIC
+    file contents, back to back
+    index (JSON)
+    index offset and length (two little endian unsigned 64 bit integers), MAGIC
+"""
+
+import functools
+import hashlib
+import io
+import json
+import marshal
+import mmap
+import os
+import struct
+import tempfile
+from importlib.abc import Loader
+from importlib.machinery import ExtensionFileLoader
+from importlib.util import MAGIC_NUMBER, cache_from_source, spec_from_file_location
+
+from .module_index import (
+    INDEX_FILENAME,
+    SOURCE_SUFFIX,
+    IndexFinder,
+    build_module_index,
+    insert_finder,
+    shadowed_names,
+)
+
+PACK_VERSION = 2
+PACK_FILENAME = ".lambda_efs_pack"
+
+MAGIC = b"LEFSPACK"
+TRAILER = struct.Struct("<QQ8s")
+
+_COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def default_pack_path(directory: str) -> str:
+    return os.path.join(directory, PACK_FILENAME)
+
+
+def write_pack(directory: str, pack_path: str = None) -> str:
+    """
+    Packs every file in the pip prefix at `directory` into a single archive at
+    `pack_path`, which defaults to `PACK_FILENAME` inside the prefix, so that the
+    pack moves with it.  The archive is written alongside and then moved into
+    place, so functions which already have the previous pack open are unaffected.
+    Returns the pack path.
+    """
+    pack_path = pack_path or default_pack_path(directory)
+    temporary_path = f"{pack_path}.tmp"
+    excluded = {os.path.abspath(pack_path), os.path.abspath(temporary_path)}
+    digest = hashlib.sha256()
+    files = {}
+
+    with open(temporary_path, "wb") as pack_file:
+        pack_file.write(MAGIC)
+
+        for relative_path in _walk_files(directory, excluded):
+            offset = pack_file.tell()
+            digest.update(relative_path.encode())
+
+            with open(os.path.join(directory, relative_path), "rb") as source:
+                read_chunk = functools.partial(source.read, _COPY_CHUNK_SIZE)
+
+                for chunk in iter(read_chunk, b""):
+                    digest.update(chunk)
+                    pack_file.write(chunk)
+
+            files[relative_path] = [offset, pack_file.tell() - offset]
+
+        index = {
+            "version": PACK_VERSION,
+            # Relative to the pack, so that it can be read through any path to
+            # the prefix, such as the current generation link or a pinned one
+            "directory": os.path.relpath(
+                os.path.abspath(directory), os.path.dirname(os.path.abspath(pack_path))
+            ),
+            "digest": digest.hexdigest(),
+            "modules": build_module_index(directory)["modules"],
+            "files": files,
+        }
+        index_data = json.dumps(index, separators=(",", ":")).encode()
+        index_offset = pack_file.tell()
+        pack_file.write(index_data)
+        pack_file.write(TRAILER.pack(index_offset, len(index_data), MAGIC))
+
+    os.replace(temporary_path, pack_path)
+    return pack_path
+
+
+def _walk_files(directory, excluded):
+    for root, directories, file_names in os.walk(directory):
+        directories.sort()
+
+        for file_name in sorted(file_names):
+            path = os.path.join(root, file_name)
+            relative_path = os.path.relpath(path, directory)
+
+            if relative_path == INDEX_FILENAME or os.path.abspath(path) in excluded:
+                continue
+
+            yield relative_path
+
+
+class PackArchive:
+    """
+    A read only view of a pack file.  The file is memory mapped, so only the parts
+    which are actually read are fetched from EFS.
+    """
+
+    def __init__(self, pack_path: str):
+        with open(pack_path, "rb") as pack_file:
+            self._map = mmap.mmap(pack_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if hasattr(self._map, "madvise"):
+            self._map.madvise(mmap.MADV_SEQUENTIAL)
+
+        trailer_offset = len(self._map) - TRAILER.size
+        index_offset, index_length, magic = TRAILER.unpack(self._map[trailer_offset:])
+
+        if self._map[: len(MAGIC)] != MAGIC or magic != MAGIC:
+            raise ValueError(f"{pack_path} is not a pack file")
+
+        index_end = index_offset + index_length
+        index = json.loads(self._map[index_offset:index_end])
+
+        if index.get("version") != PACK_VERSION:
+            raise ValueError(f"unsupported pack version in {pack_path}")
+
+        self.path = pack_path
+        self.directory = os.path.normpath(
+            os.path.join(
+                os.path.dirname(os.path.abspath(pack_path)), index["directory"]
+            )
+        )
+        self.modules = index["modules"]
+        self.files = index["files"]
+        self.extract_directory = os.path.join(
+            tempfile.gettempdir(), "lambda_efs_pack", index["digest"][:16]
+        )
+        self._extracted_library_directories = set()
+
+    def __contains__(self, relative_path):
+        return relative_path in self.files
+
+    def read(self, relative_path: str) -> bytes:
+        offset, size = self.files[relative_path]
+        end = offset + size
+        return self._map[offset:end]
+
+    def contents(self, relative_directory: str):
+        """
+        Returns the names of the files and directories immediately inside
+        `relative_directory`.
+        """
+        prefix = f"{relative_directory}/" if relative_directory else ""
+        start = len(prefix)
+        return sorted(
+            {
+                relative_path[start:].split("/")[0]
+                for relative_path in self.files
+                if relative_path.startswith(prefix)
+            }
+        )
+
+    def extract(self, relative_path: str) -> str:
+        """
+        Writes a file from the pack to the extract directory, if it is not already
+        there, and returns its path.
+        """
+        target = os.path.join(self.extract_directory, relative_path)
+
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            offset, size = self.files[relative_path]
+            end = offset + size
+            temporary_path = f"{target}.{os.getpid()}.tmp"
+
+            with open(temporary_path, "wb") as target_file:
+                target_file.write(memoryview(self._map)[offset:end])
+
+            os.replace(temporary_path, target)
+
+        return target
+
+    def extract_extension(self, relative_path: str) -> str:
+        """
+        Extracts an extension module along with the vendored libraries of its top
+        level package, which it may load through an `$ORIGIN` relative rpath.
+        """
+        top_level = relative_path.split("/")[0]
+
+        if top_level not in self._extracted_library_directories:
+            library_prefixes = (f"{top_level}.libs/", f"{top_level}/.libs/")
+
+            for library_path in self.files:
+                if library_path.startswith(library_prefixes):
+                    self.extract(library_path)
+
+            self._extracted_library_directories.add(top_level)
+
+        return self.extract(relative_path)
+
+
+class PackFinder(IndexFinder):
+    """
+    Finds modules in a `PackArchive`.  Modules keep the paths they had in the
+    original prefix as `__file__` and `__path__`, so code which reads files relative
+    to them still works, falling back to EFS.
+    """
+
+    def __init__(self, archive: PackArchive, shadowed=frozenset()):
+        super().__init__(archive.directory, archive.modules, shadowed)
+        self.archive = archive
+
+    def create_spec(self, fullname, relative_path, search_locations):
+        if relative_path.endswith(SOURCE_SUFFIX):
+            loader = PackLoader(self.archive, fullname, relative_path)
+            filename = os.path.join(self.directory, relative_path)
+        else:
+            filename = os.path.join(self.archive.extract_directory, relative_path)
+            loader = PackExtensionLoader(
+                self.archive, fullname, filename, relative_path
+            )
+
+        return spec_from_file_location(
+            fullname,
+            filename,
+            loader=loader,
+            submodule_search_locations=search_locations,
+        )
+
+
+class PackLoader(Loader):  # pylint: disable=abstract-method
+    """
+    Loads a pure Python module from a `PackArchive`, using the packed bytecode for
+    the running interpreter if there is any, and compiling the packed source
+    otherwise.
+    """
+
+    # The loader protocol passes names which a loader for one module ignores
+    # pylint: disable=unused-argument
+
+    def __init__(self, archive: PackArchive, fullname: str, relative_path: str):
+        self.archive = archive
+        self.name = fullname
+        self.relative_path = relative_path
+        self.path = os.path.join(archive.directory, relative_path)
+
+    def create_module(self, spec):
+        return None
+
+    def exec_module(self, module):
+        exec(  # pylint: disable=exec-used
+            self.get_code(module.__name__), module.__dict__
+        )
+
+    def get_code(self, fullname):
+        bytecode_path = cache_from_source(self.relative_path)
+
+        # The pack is an immutable snapshot, so any bytecode for this interpreter
+        # was compiled from exactly the source beside it
+        if bytecode_path in self.archive:
+            data = self.archive.read(bytecode_path)
+
+            if data[:4] == MAGIC_NUMBER:
+                return marshal.loads(memoryview(data)[16:])
+
+        return compile(
+            self.archive.read(self.relative_path), self.path, "exec", dont_inherit=True
+        )
+
+    def get_source(self, fullname):
+        return self.archive.read(self.relative_path).decode()
+
+    def get_filename(self, fullname):
+        return self.path
+
+    def is_package(self, fullname):
+        return os.path.basename(self.relative_path).startswith("__init__.")
+
+    def get_data(self, path):
+        relative_path = os.path.relpath(path, self.archive.directory)
+
+        if relative_path in self.archive:
+            return self.archive.read(relative_path)
+
+        with open(path, "rb") as data_file:
+            return data_file.read()
+
+    def get_resource_reader(self, fullname):
+        if self.is_package(fullname):
+            return PackResourceReader(self.archive, os.path.dirname(self.relative_path))
+
+        return None
+
+
+class PackExtensionLoader(ExtensionFileLoader):
+    """
+    Loads an extension module from a `PackArchive`, extracting it to local storage
+    only when the module is actually created.
+    """
+
+    def __init__(
+        self, archive: PackArchive, fullname: str, path: str, relative_path: str
+    ):
+        super().__init__(fullname, path)
+        self.archive = archive
+        self.relative_path = relative_path
+
+    def create_module(self, spec):
+        self.archive.extract_extension(self.relative_path)
+        return super().create_module(spec)
+
+
+class PackResourceReader:
+    """
+    Serves `importlib.resources` requests for a package from a `PackArchive`.
+    """
+
+    def __init__(self, archive: PackArchive, relative_directory: str):
+        self.archive = archive
+        self.relative_directory = relative_directory
+
+    def _relative_path(self, resource):
+        return "/".join(filter(None, (self.relative_directory, resource)))
+
+    def open_resource(self, resource):
+        return io.BytesIO(self.archive.read(self._relative_path(resource)))
+
+    def resource_path(self, resource):
+        path = os.path.join(self.archive.directory, self._relative_path(resource))
+
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+
+        return path
+
+    def is_resource(self, name):
+        return self._relative_path(name) in self.archive
+
+    def contents(self):
+        return iter(self.archive.contents(self.relative_directory))
+
+
+def install_pack_finder(pack_path: str) -> PackFinder:
+    """
+    Opens the pack at `pack_path` and inserts a finder for it into `sys.meta_path`,
+    immediately ahead of the default path finder.
+    """
+    archive = PackArchive(pack_path)
+    finder = PackFinder(archive, shadowed_names(archive.directory))
+    return insert_finder(finder)
@@ -0,0 +1,11 @@
+"""
+Copied to the root of the EFS pip prefix, which is on the Lambda `PYTHONPATH`, so
+that the interpreter runs the `lambda_efs_runtime` bootstrap at startup.
+"""
+
+try:
+    import lambda_efs_runtime
+except ImportError:
+    pass
+else:
+    lambda_efs_runtime.bootstrap()
@@ -0,0 +1,340 @@
+"""
+A size bounded cache of EFS packages on the function's local `/tmp` storage.
+
+Top level pip packages which are already in the cache are imported from there.
+Those which are not are imported from EFS as usual, and copied to the cache on a
+background thread afterwards, so that a process which starts in the same
+execution environment later, such as after an error or a timeout, imports them
+from local storage.  The copies run off the import path, so a new instance, whose
+`/tmp` is always empty, reads no more from EFS before its handler runs than it
+would without the cache.  Linuxbrew libraries matching a configured list of
+patterns are copied the same way, starting when the interpreter starts, since
+native code loads them without going through Python.  The cache directories come
+before the EFS ones on `sys.path` and `LD_LIBRARY_PATH`, so anything not cached
+is still found on EFS.
+
+The cache records the install ID of each EFS prefix it was filled from, and
+discards that prefix's entries when the ID changes.  A prefix pinned to an install
+generation is identified by the generation itself.  When the byte budget is
+exceeded, the least recently used entries not imported by the current process are
+evicted.
+"""
+
+import fnmatch
+import json
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+from importlib.abc import MetaPathFinder
+from importlib.machinery import PathFinder
+
+from .module_index import insert_finder, shadowed_names
+
+TMP_CACHE_DIRECTORY = "/tmp/lambda_efs_cache"
+INSTALL_ID_FILENAME = ".lambda_efs_install_id"
+
+# Install generations live in `<packages>/generations/<prefix name>/<generation>`
+GENERATIONS_DIRECTORY = "generations"
+
+MANIFEST_FILENAME = "manifest.json"
+PIP_CACHE_NAME = "pip"
+BREW_CACHE_NAME = "linuxbrew"
+
+# Linuxbrew libraries are cached directly in this directory, which
+# `get_environment_function_args` puts on `LD_LIBRARY_PATH`
+BREW_LIBRARY_CACHE_DIRECTORY = f"{TMP_CACHE_DIRECTORY}/{BREW_CACHE_NAME}"
+
+
+def read_install_id(directory: str) -> str:
+    """
+    Returns the install ID written to `directory` by the install commands, or an
+    empty string if there is none.  Generation directories are never modified once
+    they are complete, so their name is used without reading anything from EFS.
+    """
+    if os.path.basename(os.path.dirname(os.path.dirname(directory))) == (
+        GENERATIONS_DIRECTORY
+    ):
+        return os.path.basename(directory)
+
+    try:
+        with open(os.path.join(directory, INSTALL_ID_FILENAME)) as id_file:
+            return id_file.read().strip()
+    except OSError:
+        return ""
+
+
+def _size(path):
+    if not os.path.isdir(path) or os.path.islink(path):
+        return os.lstat(path).st_size
+
+    total = 0
+
+    for root, _, file_names in os.walk(path):
+        for file_name in file_names:
+            total += os.lstat(os.path.join(root, file_name)).st_size
+
+    return total
+
+
+class TmpCache:
+    """
+    The cache directory and its manifest.  Entries are keyed by the cache they
+    belong to and their path relative to the prefix they were copied from.
+
+    Entries are copied by `schedule` on a background thread, one at a time, while
+    imports only look them up, so the manifest is guarded by a lock which is never
+    held during a copy.
+    """
+
+    def __init__(self, budget: int, root: str = TMP_CACHE_DIRECTORY):
+        self.budget = budget
+        self.root = root
+        self.in_use = set()
+        self._lock = threading.RLock()
+        self._pending = set()
+        self._queue = queue.Queue()
+        threading.Thread(
+            target=self._copy_scheduled, name="lambda_efs_tmp_cache", daemon=True
+        ).start()
+
+        try:
+            with open(os.path.join(root, MANIFEST_FILENAME)) as manifest_file:
+                self.manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            self.manifest = {"install_ids": {}, "entries": {}}
+
+    def directory(self, cache_name: str) -> str:
+        return os.path.join(self.root, cache_name)
+
+    def validate(self, cache_name: str, install_id: str):
+        """
+        Discards the entries for `cache_name` if they were copied from a different
+        install from the one identified by `install_id`.
+        """
+        with self._lock:
+            if self.manifest["install_ids"].get(cache_name) == install_id:
+                return
+
+            shutil.rmtree(self.directory(cache_name), ignore_errors=True)
+            self.manifest["entries"] = {
+                key: entry
+                for key, entry in self.manifest["entries"].items()
+                if not key.startswith(f"{cache_name}/")
+            }
+            self.manifest["install_ids"][cache_name] = install_id
+            self._save()
+
+    def use(self, cache_name: str, name: str) -> bool:
+        """
+        Returns whether the entry starting with `name` is cached, in which case it
+        is kept until the process exits.
+        """
+        key = f"{cache_name}/{name}"
+
+        with self._lock:
+            entry = self.manifest["entries"].get(key)
+
+            if entry is None:
+                return False
+
+            entry["last_used"] = time.time()
+            self.in_use.add(key)
+            self._save()
+            return True
+
+    def schedule(self, cache_name: str, source_directory: str, names):
+        """
+        Copies the files or directories `names` from `source_directory` into the
+        cache as a single entry on the background thread, unless they are already
+        there or on their way.  Entries larger than the budget are not cached.
+        """
+        key = f"{cache_name}/{names[0]}"
+
+        with self._lock:
+            if key in self.manifest["entries"] or key in self._pending:
+                return
+
+            self._pending.add(key)
+
+        self._queue.put((key, cache_name, source_directory, list(names)))
+
+    def join(self):
+        """
+        Waits until every scheduled entry has been copied.
+        """
+        self._queue.join()
+
+    def _copy_scheduled(self):
+        while True:
+            key, cache_name, source_directory, names = self._queue.get()
+
+            try:
+                self._add(key, cache_name, source_directory, names)
+            except OSError as error:
+                print(
+                    f"lambda_efs_runtime: /tmp cache could not copy {key}: {error}",
+                    file=sys.stderr,
+                )
+            finally:
+                with self._lock:
+                    self._pending.discard(key)
+
+                self._queue.task_done()
+
+    def _add(self, key, cache_name, source_directory, names):
+        sources = [os.path.join(source_directory, name) for name in names]
+        size = sum(_size(source) for source in sources)
+
+        with self._lock:
+            if size > self.budget or not self._make_room(size):
+                return
+
+        target_directory = self.directory(cache_name)
+
+        for name, source in zip(names, sources):
+            self._copy(source, os.path.join(target_directory, name))
+
+        with self._lock:
+            self.manifest["entries"][key] = {
+                "names": names,
+                "size": size,
+                "last_used": time.time(),
+            }
+            self._save()
+
+    def _make_room(self, size):
+        entries = self.manifest["entries"]
+        used = sum(entry["size"] for entry in entries.values())
+        candidates = sorted(
+            (key for key in entries if key not in self.in_use),
+            key=lambda key: entries[key].get("last_used", 0),
+        )
+
+        while used + size > self.budget and candidates:
+            key = candidates.pop(0)
+            cache_name = key.split("/")[0]
+
+            for name in entries[key]["names"]:
+                path = os.path.join(self.directory(cache_name), name)
+
+                if os.path.isdir(path) and not os.path.islink(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                elif os.path.lexists(path):
+                    os.remove(path)
+
+            used -= entries.pop(key)["size"]
+
+        return used + size <= self.budget
+
+    @staticmethod
+    def _copy(source, target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temporary_path = f"{target}.{os.getpid()}.tmp"
+
+        if os.path.isdir(source) and not os.path.islink(source):
+            shutil.copytree(source, temporary_path, symlinks=True)
+        else:
+            shutil.copy2(source, temporary_path, follow_symlinks=False)
+
+        os.replace(temporary_path, target)
+
+    def _save(self):
+        os.makedirs(self.root, exist_ok=True)
+        manifest_path = os.path.join(self.root, MANIFEST_FILENAME)
+        temporary_path = f"{manifest_path}.{os.getpid()}.tmp"
+
+        with open(temporary_path, "w") as manifest_file:
+            json.dump(self.manifest, manifest_file)
+
+        os.replace(temporary_path, manifest_path)
+
+
+class CachingFinder(MetaPathFinder):
+    """
+    Finds top level packages of the EFS pip prefix in the cache, if they were
+    copied there by an earlier process, and otherwise leaves them to be imported
+    from EFS and schedules their copy.  Submodules are then found through the
+    package's `__path__`, which points into the cache.  Names provided by
+    directories ahead of the prefix on the path are left alone.
+    """
+
+    def __init__(self, cache: TmpCache, directory: str):
+        self.cache = cache
+        self.directory = directory
+        self.cache_directory = cache.directory(PIP_CACHE_NAME)
+        self.entries = {}
+        shadowed = shadowed_names(directory)
+
+        # One listing of the prefix, which the path finder would make anyway
+        for name in os.listdir(directory):
+            module_name = name.split(".")[0]
+
+            if module_name.isidentifier() and module_name not in shadowed:
+                self.entries.setdefault(module_name, []).append(name)
+
+    def find_spec(self, fullname, path=None, target=None):
+        if path is not None or fullname not in self.entries:
+            return None
+
+        # Vendored libraries are kept next to the package, as wheels expect
+        names = sorted(self.entries[fullname], key=lambda name: "." in name)
+
+        if not self.cache.use(PIP_CACHE_NAME, names[0]):
+            self.cache.schedule(PIP_CACHE_NAME, self.directory, names)
+            return None
+
+        return PathFinder.find_spec(fullname, [self.cache_directory], target)
+
+    def invalidate_caches(self):
+        pass
+
+
+def cache_brew_libraries(cache: TmpCache, brew_directory: str, patterns):
+    """
+    Schedules the copy of the files in the Linuxbrew `lib` directory matching any of
+    `patterns` into the cache.  Symbolic links are copied as links, so patterns
+    should match both the versioned library and the names which link to it.
+    """
+    library_directory = os.path.join(brew_directory, "lib")
+    names = [
+        name
+        for name in sorted(os.listdir(library_directory))
+        if any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+    ]
+
+    for name in names:
+        if not cache.use(BREW_CACHE_NAME, name):
+            cache.schedule(BREW_CACHE_NAME, library_directory, [name])
+
+
+def install_tmp_cache(
+    budget: int, pip_directory: str, brew_directory: str = None, brew_patterns=()
+) -> TmpCache:
+    """
+    Validates the cache against the current EFS installs, schedules the copy of the
+    configured Linuxbrew libraries and puts the pip cache in front of the EFS prefix
+    on `sys.path`.  `LD_LIBRARY_PATH` is read when the process starts, so
+    `get_environment_function_args` puts the Linuxbrew cache on it instead.
+    """
+    cache = TmpCache(budget)
+    cache.validate(PIP_CACHE_NAME, read_install_id(pip_directory))
+
+    if brew_directory and brew_patterns:
+        cache.validate(BREW_CACHE_NAME, read_install_id(brew_directory))
+        cache_brew_libraries(cache, brew_directory, brew_patterns)
+
+    # Created before the cache goes on the path, which would otherwise hide the
+    # cached packages from the finder as shadowed names
+    finder = CachingFinder(cache, pip_directory)
+    os.makedirs(finder.cache_directory, exist_ok=True)
+
+    if pip_directory in sys.path:
+        sys.path.insert(sys.path.index(pip_directory), finder.cache_directory)
+    else:
+        sys.path.append(finder.cache_directory)
+
+    insert_finder(finder)
+    return cache
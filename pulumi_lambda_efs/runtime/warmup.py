@@ -0,0 +1,108 @@
+"""
+Warmup during the function's init phase.
+
+Lambda runs the init phase with more CPU than a small function gets while handling
+requests, and with provisioned concurrency it runs before any traffic arrives, so
+work moved into it is both cheaper and hidden from callers.  When the interpreter
+starts, the warmup imports the declared Python modules, loads the Linuxbrew
+libraries whose file names match the declared patterns, and then calls the
+declared hook, such as one which runs `django.setup()`.
+
+The hook is given as `module:function`, or as a module alone, which is just
+imported.  The function's own code is only put on `sys.path` by the runtime after
+the interpreter starts, so the task root is added at the front of `sys.path`, where
+the runtime puts it, before anything is imported.
+
+Failures are reported on stderr and the rest of the warmup carries on, since the
+handler may not need what failed.  One JSON line reports the milliseconds spent on
+each part of the warmup.
+"""
+
+import ctypes
+import fnmatch
+import json
+import os
+import sys
+import time
+import traceback
+from importlib import import_module
+
+
+def _milliseconds(seconds):
+    return round(seconds * 1000, 3)
+
+
+def _timed(timings, name, action, *args):
+    start = time.perf_counter()
+
+    try:
+        action(*args)
+    # A failed warmup only costs the time it saves, so it must not fail the init
+    except Exception:  # pylint: disable=broad-except
+        print(f"lambda_efs_runtime: warmup of {name} failed:", file=sys.stderr)
+        traceback.print_exc()
+    finally:
+        timings[name] = _milliseconds(time.perf_counter() - start)
+
+
+def _call_hook(hook):
+    module_name, _, function_name = hook.partition(":")
+    module = import_module(module_name)
+
+    if function_name:
+        getattr(module, function_name)()
+
+
+def _library_names(brew_directory, patterns):
+    library_directory = os.path.join(brew_directory, "lib")
+
+    try:
+        file_names = sorted(os.listdir(library_directory))
+    except OSError:
+        return []
+
+    # Each library is loaded once, under the first of its names which matches
+    names = {}
+
+    for file_name in file_names:
+        if any(fnmatch.fnmatchcase(file_name, pattern) for pattern in patterns):
+            path = os.path.realpath(os.path.join(library_directory, file_name))
+            names.setdefault(path, file_name)
+
+    return list(names.values())
+
+
+def warmup(
+    modules=(), library_patterns=(), hook: str = None, brew_directory: str = None
+) -> dict:
+    """
+    Imports `modules`, loads the libraries in the Linuxbrew prefix at
+    `brew_directory` matching `library_patterns`, and calls `hook`.  Returns the
+    milliseconds spent on each, which are also logged.
+    """
+    task_root = os.environ.get("LAMBDA_TASK_ROOT")
+
+    if task_root and task_root not in sys.path:
+        sys.path.insert(0, task_root)
+
+    timings = {"modules": {}, "libraries": {}, "hook": {}}
+    start = time.perf_counter()
+
+    for module in modules:
+        _timed(timings["modules"], module, import_module, module)
+
+    # Libraries are loaded by file name, so that the dynamic linker resolves them
+    # through `LD_LIBRARY_PATH`, which puts the /tmp cache ahead of EFS
+    if brew_directory:
+        for file_name in _library_names(brew_directory, library_patterns):
+            _timed(timings["libraries"], file_name, ctypes.CDLL, file_name)
+
+    if hook:
+        _timed(timings["hook"], hook, _call_hook, hook)
+
+    record = {
+        "WarmupTime": _milliseconds(time.perf_counter() - start),
+        "WarmupTimes": timings,
+    }
+    print(json.dumps(record, separators=(",", ":")), flush=True)
+    return record
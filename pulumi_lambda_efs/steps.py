@@ -0,0 +1,191 @@
+"""
+Timed steps of the install pipelines, and the build report they add up to.
+
+Each pipeline is a sequence of named steps, such as `pip_install` or `prune`, run
+through a `CommandRunner`.  Every step is timed, and a step which needs the network,
+such as installing packages or pulling an image, is retried after a failure, with
+the wait doubling each time.  When a step names the directory it writes to, the
+directory is scanned before and after it, and the files and bytes which it wrote
+or removed there are counted.  Files are compared by inode, size and modification
+time, so hard links made when a generation is seeded from the current one count
+as neither.  The scan after one step serves as the scan before the next, so each
+directory is normally walked once per step.
+
+The runners of one build share a `BuildReport`, which is written as JSON:
+
+    {
+        "started": "2020-06-01T12:00:00Z",
+        "seconds": 312.4,
+        "pipelines": {"pip": {"status": "succeeded", "generation": "...", ...}},
+        "steps": [
+            {
+                "pipeline": "pip",
+                "name": "pip_install",
+                "status": "succeeded",
+                "attempts": 1,
+                "seconds": 201.7,
+                "directory": "/mnt/efs/lambda_packages/generations/pip/...",
+                "files_written": 10482,
+                "bytes_written": 301823011,
+                "files_removed": 0,
+                "bytes_removed": 0
+            },
+            ...
+        ]
+    }
+
+A failed step records the error which stopped it.
+"""
+
+import json
+import os
+import stat
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Tuple
+
+BUILD_REPORT_FILENAME = "build_report.json"
+
+_MIB = 2 ** 20
+
+# Maps each file's inode to its size and modification time
+Snapshot = Dict[Tuple[int, int], Tuple[int, int]]
+
+
+def snapshot_directory(directory: str) -> Snapshot:
+    """
+    Returns the inode, size and modification time of every regular file under
+    `directory`, which is empty if it does not exist.
+    """
+    snapshot = {}
+
+    for root, _, file_names in os.walk(directory):
+        for file_name in file_names:
+            try:
+                file_stat = os.lstat(os.path.join(root, file_name))
+            except OSError:
+                continue
+
+            if stat.S_ISREG(file_stat.st_mode):
+                snapshot[(file_stat.st_dev, file_stat.st_ino)] = (
+                    file_stat.st_size,
+                    file_stat.st_mtime_ns,
+                )
+
+    return snapshot
+
+
+def compare_snapshots(before: Snapshot, after: Snapshot) -> Dict[str, int]:
+    """
+    Returns the files and bytes written and removed between two snapshots of a
+    directory.  A file which was rewritten in place counts as written in full.
+    """
+    written = [
+        size
+        for inode, (size, mtime) in after.items()
+        if before.get(inode, (None, None)) != (size, mtime)
+    ]
+    removed = [size for inode, (size, _) in before.items() if inode not in after]
+
+    return {
+        "files_written": len(written),
+        "bytes_written": sum(written),
+        "files_removed": len(removed),
+        "bytes_removed": sum(removed),
+    }
+
+
+def _timestamp(seconds):
+    return (
+        datetime.fromtimestamp(seconds, timezone.utc)
+        .isoformat(timespec="seconds")
+        .replace("+00:00", "Z")
+    )
+
+
+class BuildReport:
+    """
+    The steps and pipeline results of one build, shared by the runners of its
+    pipelines.  With `measure` off, directories are not scanned, and steps only
+    report their time.
+    """
+
+    def __init__(self, measure: bool = True):
+        self.measure = measure
+        self.started = time.time()
+        self.steps = []
+        self.pipelines = {}
+        self._lock = threading.Lock()
+
+    def add_step(self, step: Dict):
+        with self._lock:
+            self.steps.append(step)
+
+    def finish_pipeline(self, name: str, status: str, **details):
+        """
+        Records that the pipeline `name` has finished with `status`, "succeeded",
+        "failed" or "cancelled", and any other `details`, such as its generation.
+        """
+        with self._lock:
+            steps = [step for step in self.steps if step["pipeline"] == name]
+            self.pipelines[name] = {
+                "status": status,
+                "seconds": round(sum(step["seconds"] for step in steps), 3),
+                **details,
+            }
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                "started": _timestamp(self.started),
+                "seconds": round(time.time() - self.started, 3),
+                "pipelines": dict(self.pipelines),
+                "steps": list(self.steps),
+            }
+
+    def write(self, path: str = BUILD_REPORT_FILENAME):
+        with open(path, "w") as report_file:
+            json.dump(self.to_dict(), report_file, indent=2)
+            report_file.write("\n")
+
+
+def describe_step(step: Dict) -> str:
+    """
+    Returns a one line summary of a step from a build report.
+    """
+    description = f"Step {step['name']} {step['status']} in {step['seconds']:.1f} s"
+
+    if step["attempts"] > 1:
+        description += f" after {step['attempts']} attempts"
+
+    if "files_written" in step:
+        description += (
+            f", wrote {step['files_written']} files "
+            f"({step['bytes_written'] / _MIB:.1f} MiB)"
+        )
+
+        if step["files_removed"]:
+            description += (
+                f", removed {step['files_removed']} files "
+                f"({step['bytes_removed'] / _MIB:.1f} MiB)"
+            )
+
+    return description + "."
+
+
+def print_build_report(report: BuildReport):
+    data = report.to_dict()
+
+    for name, pipeline in sorted(data["pipelines"].items()):
+        steps = [step for step in data["steps"] if step["pipeline"] == name]
+        written = sum(step.get("bytes_written", 0) for step in steps)
+        print(
+            f"  {name:<6} {pipeline['status']:<10} {pipeline['seconds']:>8.1f} s "
+            f"{written / _MIB:>9.1f} MiB written"
+        )
+
+        for step in steps:
+            print(
+                f"    {step['name']:<22} {step['status']:<10} {step['seconds']:>8.1f} s"
+            )
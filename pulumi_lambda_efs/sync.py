@@ -0,0 +1,347 @@
+"""
+One-way sync of a directory tree, which publishes installs built on local disk to
+EFS.
+
+Installing straight onto the NFS mount makes every create, rename and chmod of the
+installer a synchronous round trip to the server.  Built on local disk instead,
+the tree is written to EFS in one pass, with files copied on many threads at once,
+since each copy is latency bound.  Only the files which changed are copied: a file
+is unchanged if the destination has a regular file of the same size, permissions,
+modification time and, when running as root, owner.  Modification times are
+preserved, so this holds for every file copied by an earlier sync.  With
+`checksum`, the SHA-256 hashes of the files are compared instead of their
+modification times, which reads every file on both sides.
+
+Copies are written alongside their destination and renamed over it, so files are
+never modified in place, as install generations require.  Hard linked files in the
+source are hard linked in the destination, and symbolic links are copied as they
+are.  Modes, modification times and, when running as root, owners are preserved.
+Anything in the destination which is not in the source is removed, unless `delete`
+is off.
+"""
+
+import hashlib
+import os
+import shutil
+import stat
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+DEFAULT_SYNC_WORKERS = 16
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+_COPY_BUFFER_SIZE = 1024 * 1024
+_TEMPORARY_SUFFIX = ".lambda_efs_sync"
+
+
+def _scan(directory):
+    entries = {}
+
+    for root, directory_names, file_names in os.walk(directory):
+        for name in directory_names + file_names:
+            path = os.path.join(root, name)
+            entries[os.path.relpath(path, directory)] = os.lstat(path)
+
+    return entries
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def _kind(file_stat):
+    if stat.S_ISDIR(file_stat.st_mode):
+        return "directory"
+
+    if stat.S_ISLNK(file_stat.st_mode):
+        return "symlink"
+
+    if stat.S_ISREG(file_stat.st_mode):
+        return "file"
+
+    return None
+
+
+def _same_owner(source_stat, destination_stat):
+    # Only root can give files away, so otherwise owners are not compared
+    if os.geteuid() != 0:
+        return True
+
+    return (source_stat.st_uid, source_stat.st_gid) == (
+        destination_stat.st_uid,
+        destination_stat.st_gid,
+    )
+
+
+def _copy_owner(source_stat, path):
+    if os.geteuid() == 0:
+        os.lchown(path, source_stat.st_uid, source_stat.st_gid)
+
+
+def _remove(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
+
+
+def _is_unchanged(
+    source_path, source_stat, destination_path, destination_stat, checksum
+):
+    if destination_stat is None or not stat.S_ISREG(destination_stat.st_mode):
+        return False
+
+    if source_stat.st_size != destination_stat.st_size:
+        return False
+
+    if stat.S_IMODE(source_stat.st_mode) != stat.S_IMODE(destination_stat.st_mode):
+        return False
+
+    if not _same_owner(source_stat, destination_stat):
+        return False
+
+    if not checksum:
+        return source_stat.st_mtime_ns == destination_stat.st_mtime_ns
+
+    return _hash_file(source_path) == _hash_file(destination_path)
+
+
+def _copy_file(source_path, source_stat, destination_path):
+    temporary_path = destination_path + _TEMPORARY_SUFFIX
+
+    with open(source_path, "rb") as source, open(temporary_path, "wb") as destination:
+        shutil.copyfileobj(source, destination, _COPY_BUFFER_SIZE)
+
+    shutil.copystat(source_path, temporary_path, follow_symlinks=False)
+    _copy_owner(source_stat, temporary_path)
+    os.replace(temporary_path, destination_path)
+
+
+def _link_file(target_path, destination_path):
+    temporary_path = destination_path + _TEMPORARY_SUFFIX
+    os.link(target_path, temporary_path)
+    os.replace(temporary_path, destination_path)
+
+
+def _copy_symlink(source_path, source_stat, destination_path):
+    temporary_path = destination_path + _TEMPORARY_SUFFIX
+    os.symlink(os.readlink(source_path), temporary_path)
+    _copy_owner(source_stat, temporary_path)
+    os.replace(temporary_path, destination_path)
+
+
+def _remove_changed_types(destination, source_entries, destination_entries, result):
+    # Entries whose type changes are removed now, and the others which are not in
+    # the source are returned, deepest first, to be removed at the end
+    extra = []
+
+    for relative_path in sorted(destination_entries, reverse=True):
+        source_stat = source_entries.get(relative_path)
+        destination_stat = destination_entries[relative_path]
+
+        if source_stat is None:
+            extra.append(relative_path)
+        elif _kind(source_stat) != _kind(destination_stat):
+            if os.path.lexists(os.path.join(destination, relative_path)):
+                _remove(os.path.join(destination, relative_path))
+                result["removed"] += 1
+
+            del destination_entries[relative_path]
+
+    return extra
+
+
+def _make_directories(destination, source_entries, destination_entries, result):
+    # Returns the paths of the regular files, grouped by inode
+    groups = {}
+
+    for relative_path, source_stat in sorted(source_entries.items()):
+        destination_path = os.path.join(destination, relative_path)
+        kind = _kind(source_stat)
+
+        if kind == "directory":
+            if relative_path not in destination_entries:
+                os.mkdir(destination_path)
+                destination_entries[relative_path] = os.lstat(destination_path)
+        elif kind == "file":
+            inode = (source_stat.st_dev, source_stat.st_ino)
+            groups.setdefault(inode, []).append(relative_path)
+        elif kind is None:
+            result["skipped"] += 1
+
+    return groups
+
+
+def _publish_files(
+    source,
+    destination,
+    source_entries,
+    destination_entries,
+    groups,
+    workers,
+    checksum,
+    result,
+):
+    # The first path of each set of hard links is copied, and the others are then
+    # linked to it
+    def publish(relative_path):
+        source_path = os.path.join(source, relative_path)
+        destination_path = os.path.join(destination, relative_path)
+        source_stat = source_entries[relative_path]
+
+        if _is_unchanged(
+            source_path,
+            source_stat,
+            destination_path,
+            destination_entries.get(relative_path),
+            checksum,
+        ):
+            return False
+
+        _copy_file(source_path, source_stat, destination_path)
+        return True
+
+    primaries = [paths[0] for paths in groups.values()]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for relative_path, copied in zip(primaries, executor.map(publish, primaries)):
+            if copied:
+                result["copied"] += 1
+                result["bytes_copied"] += source_entries[relative_path].st_size
+            else:
+                result["unchanged"] += 1
+
+    result["files"] = sum(len(paths) for paths in groups.values())
+
+    for paths in groups.values():
+        primary_path = os.path.join(destination, paths[0])
+
+        for relative_path in paths[1:]:
+            destination_path = os.path.join(destination, relative_path)
+
+            if os.path.lexists(destination_path) and os.path.samefile(
+                primary_path, destination_path
+            ):
+                continue
+
+            _link_file(primary_path, destination_path)
+            result["linked"] += 1
+
+
+def _copy_symlinks(source, destination, source_entries, destination_entries, result):
+    for relative_path, source_stat in sorted(source_entries.items()):
+        if _kind(source_stat) != "symlink":
+            continue
+
+        source_path = os.path.join(source, relative_path)
+        destination_path = os.path.join(destination, relative_path)
+
+        if relative_path in destination_entries and os.readlink(
+            destination_path
+        ) == os.readlink(source_path):
+            continue
+
+        _copy_symlink(source_path, source_stat, destination_path)
+        result["symlinks"] += 1
+
+
+def _copy_directory_permissions(destination, source_entries, destination_entries):
+    # Set once their contents are written, deepest first, so that read-only
+    # directories can still be filled
+    for relative_path, source_stat in sorted(source_entries.items(), reverse=True):
+        if _kind(source_stat) != "directory":
+            continue
+
+        destination_path = os.path.join(destination, relative_path)
+        destination_stat = destination_entries[relative_path]
+        mode = stat.S_IMODE(source_stat.st_mode)
+
+        if mode != stat.S_IMODE(destination_stat.st_mode):
+            os.chmod(destination_path, mode)
+
+        if not _same_owner(source_stat, destination_stat):
+            _copy_owner(source_stat, destination_path)
+
+
+def sync_directories(
+    source: str,
+    destination: str,
+    workers: int = DEFAULT_SYNC_WORKERS,
+    checksum: bool = False,
+    delete: bool = True,
+) -> Dict:
+    """
+    Makes `destination` a copy of the directory `source`, as described above,
+    comparing and copying files on `workers` threads.  Returns the counts of files
+    copied, left unchanged and hard linked, symbolic links copied and entries
+    removed, the bytes copied and the wall time in seconds.
+    """
+    start = time.perf_counter()
+
+    if not os.path.isdir(source):
+        raise FileNotFoundError(f"Cannot find directory {source}")
+
+    os.makedirs(destination, exist_ok=True)
+    source_entries = _scan(source)
+    destination_entries = _scan(destination)
+    result = {
+        "files": 0,
+        "copied": 0,
+        "unchanged": 0,
+        "linked": 0,
+        "symlinks": 0,
+        "removed": 0,
+        "skipped": 0,
+        "bytes_copied": 0,
+    }
+
+    extra = _remove_changed_types(
+        destination, source_entries, destination_entries, result
+    )
+    groups = _make_directories(destination, source_entries, destination_entries, result)
+    _publish_files(
+        source,
+        destination,
+        source_entries,
+        destination_entries,
+        groups,
+        workers,
+        checksum,
+        result,
+    )
+    _copy_symlinks(source, destination, source_entries, destination_entries, result)
+
+    if delete:
+        for relative_path in extra:
+            path = os.path.join(destination, relative_path)
+
+            # Already gone if it was inside a removed directory
+            if os.path.lexists(path):
+                _remove(path)
+                result["removed"] += 1
+
+    _copy_directory_permissions(destination, source_entries, destination_entries)
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def print_sync_result(result: Dict):
+    print(
+        f"Synced {result['files']} files in {result['seconds']:.1f} s: "
+        f"{result['copied']} copied ({result['bytes_copied'] / 2 ** 20:.1f} MiB), "
+        f"{result['unchanged']} unchanged, {result['linked']} hard linked."
+    )
+    print(
+        f"Copied {result['symlinks']} symbolic links and removed "
+        f"{result['removed']} entries."
+    )
+
+    if result["skipped"]:
+        print(f"Skipped {result['skipped']} special files.")
@@ -0,0 +1,101 @@
+"""
+Sizing of EFS provisioned throughput for cold starts.
+
+In bursting mode, a filesystem's throughput is paid for with burst credits which
+are earned in proportion to the data stored.  A filesystem holding only Lambda
+dependencies stores a few GiB at most, so it earns very few, and a burst of cold
+starts after a deploy can drain them, after which every read runs at the baseline
+rate.  Provisioned throughput does not depend on credits.
+
+Each cold start reads its dependencies from EFS itself, since nothing is cached
+between Lambda instances, so the throughput needed is the size of the installed
+packages times the number of instances starting at once, over the time they may
+take to read them.
+"""
+
+import math
+import os
+from typing import Iterable
+
+from .dedup import regular_files, used_bytes
+
+# Baseline and burst throughput of a filesystem in bursting mode, per TiB stored,
+# and the burst throughput available to every filesystem whatever its size
+BURSTING_BASELINE_MIBPS_PER_TIB = 50
+BURSTING_BURST_MIBPS_PER_TIB = 100
+MIN_BURST_MIBPS = 100
+
+# Allows for reads of metadata and from other clients, such as CodeBuild
+DEFAULT_HEADROOM = 1.25
+
+_MIB = 2 ** 20
+_TIB = 2 ** 40
+
+
+def measure_package_bytes(directories: Iterable[str]) -> int:
+    """
+    Returns the size of the distinct files in `directories`, such as the current
+    pip and Linuxbrew prefixes.  Hard linked files are counted once.
+    """
+    return used_bytes(regular_files(directories))
+
+
+def recommend_provisioned_throughput(
+    package_bytes: int,
+    concurrent_cold_starts: int,
+    target_init_seconds: float,
+    headroom: float = DEFAULT_HEADROOM,
+) -> int:
+    """
+    Returns the provisioned throughput in MiB/s which lets `concurrent_cold_starts`
+    instances each read `package_bytes` of dependencies within
+    `target_init_seconds`, with `headroom` to spare.
+    """
+    if package_bytes < 0 or concurrent_cold_starts < 1 or target_init_seconds <= 0:
+        raise ValueError(
+            "Package size must not be negative, and cold starts and init time "
+            "must be positive"
+        )
+
+    mibps = package_bytes * concurrent_cold_starts * headroom / _MIB
+    return max(1, math.ceil(mibps / target_init_seconds))
+
+
+def bursting_throughput(stored_bytes: int) -> dict:
+    """
+    Returns the baseline and burst throughput in MiB/s which a filesystem storing
+    `stored_bytes` gets in bursting mode, for comparison.
+    """
+    return {
+        "baseline": stored_bytes * BURSTING_BASELINE_MIBPS_PER_TIB / _TIB,
+        "burst": max(
+            MIN_BURST_MIBPS, stored_bytes * BURSTING_BURST_MIBPS_PER_TIB / _TIB
+        ),
+    }
+
+
+def print_throughput_recommendation(
+    package_bytes: int, concurrent_cold_starts: int, target_init_seconds: float
+):
+    recommended = recommend_provisioned_throughput(
+        package_bytes, concurrent_cold_starts, target_init_seconds
+    )
+    bursting = bursting_throughput(package_bytes)
+
+    print(f"Installed packages: {package_bytes / _MIB:.1f} MiB")
+    print(
+        f"Bursting mode: {bursting['baseline']:.3f} MiB/s baseline, "
+        f"{bursting['burst']:.0f} MiB/s while credits last"
+    )
+    print(
+        f"Recommended provisioned throughput for {concurrent_cold_starts} concurrent "
+        f"cold starts in {target_init_seconds:g}s: {recommended} MiB/s"
+    )
+
+
+def default_package_directories(prefixes: Iterable[str]) -> list:
+    """
+    Returns those of `prefixes` which exist, resolving them to their current
+    generation.
+    """
+    return [os.path.realpath(prefix) for prefix in prefixes if os.path.isdir(prefix)]
@@ -4,63 +4,126 @@ import pulumi
 from pulumi.output import Output
 from pulumi.resource import ResourceOptions
 from pulumi_aws import ec2
+from pulumi_aws.get_availability_zones import get_availability_zones
+from pulumi_aws.get_region import get_region
+
+# The VPC is split into /20 subnets, the public ones first, then the private ones
+_VPC_CIDR_PREFIX = "172.32"
+_SUBNET_BLOCK_SIZE = 16
+MAX_AVAILABILITY_ZONES = 8
+
+# The services used when building dependencies: parameters, build logs and images
+DEFAULT_INTERFACE_ENDPOINTS = ["ssm", "logs", "ecr.api", "ecr.dkr"]
+
+
+def _subnet_cidr(index: int) -> str:
+    return f"{_VPC_CIDR_PREFIX}.{index * _SUBNET_BLOCK_SIZE}.0/20"
+
+
+def _endpoint_resource_name(service: str) -> str:
+    return "".join(part.capitalize() for part in service.split("."))
 
 
 class VPC(pulumi.ComponentResource):
     """
-    The `nuage:aws:DevelopmentEnvironment:VPC` component creates a VPC with
-    three public subnets and one private subnet.  One of the public subnets
-    contains a NAT gateway, allowing the private subnet to access the internet.
+    The `nuage:aws:DevelopmentEnvironment:VPC` component creates a VPC with a
+    public and a private subnet in each of the first `availability_zone_count`
+    available zones of the AWS provider's region.  `region` names the endpoint
+    services and the build's IAM resources, so a `ValueError` is raised if it is
+    not the provider's region.  The first public subnet contains a NAT gateway,
+    allowing the private subnets to access the internet.  With
+    `nat_gateway_per_az`, every public subnet has one, used by the private subnet
+    in the same zone.
+
+    Traffic to AWS services can bypass the NAT gateways through VPC endpoints: an
+    S3 gateway endpoint if `s3_endpoint` is set, and an interface endpoint in the
+    private subnets for each service named in `interface_endpoints`, such as those
+    in `DEFAULT_INTERFACE_ENDPOINTS`.  Downloads from PyPI, Docker Hub and
+    Linuxbrew still go through NAT.
     """
 
     vpc: Output[ec2.Vpc]
     security_group: Output[ec2.SecurityGroup]
     public_subnets: Output[List[ec2.Subnet]]
+    private_subnets: Output[List[ec2.Subnet]]
     private_subnet: Output[ec2.Subnet]
     nat_gateway: Output[ec2.NatGateway]
+    nat_gateways: Output[List[ec2.NatGateway]]
+    region: str
+    availability_zones: List[str]
 
     def __init__(
-        self, name, opts=None,
+        self,
+        name,
+        region: str = "eu-west-1",
+        availability_zone_count: int = 3,
+        nat_gateway_per_az: bool = False,
+        s3_endpoint: bool = False,
+        interface_endpoints: List[str] = None,
+        opts=None,
     ):
         super().__init__(
             "nuage:aws:DevelopmentEnvironment:VPC", f"{name}VpcEnvironment", None, opts
         )
 
+        if not 1 <= availability_zone_count <= MAX_AVAILABILITY_ZONES:
+            raise ValueError(
+                "availability_zone_count must be between 1 and "
+                f"{MAX_AVAILABILITY_ZONES}"
+            )
+
+        provider_region = get_region().name
+
+        if provider_region != region:
+            raise ValueError(
+                f"The region is {region}, but the AWS provider's region is "
+                f"{provider_region}"
+            )
+
+        # Not every region has zones ending a, b, c and so on, and not all of them
+        # are available to every account
+        available_zones = get_availability_zones(state="available").names or []
+
+        if len(available_zones) < availability_zone_count:
+            raise ValueError(
+                f"availability_zone_count is {availability_zone_count}, but only "
+                f"{len(available_zones)} availability zones are available"
+            )
+
+        # Resources are named by the position of their zone
+        zone_letters = "abcdefgh"[:availability_zone_count]
+        availability_zones = available_zones[:availability_zone_count]
+
         vpc = ec2.Vpc(
             f"{name}Vpc",
-            cidr_block="172.32.0.0/16",
+            cidr_block=f"{_VPC_CIDR_PREFIX}.0.0/16",
             enable_dns_hostnames=True,
             enable_dns_support=True,
         )
-        subnet_1 = ec2.Subnet(
-            f"{name}VpcSubnetA",
-            availability_zone="eu-west-1a",
-            vpc_id=vpc.id,
-            cidr_block="172.32.0.0/20",
-            opts=ResourceOptions(depends_on=[vpc]),
-        )
-        subnet_2 = ec2.Subnet(
-            f"{name}VpcSubnetB",
-            availability_zone="eu-west-1b",
-            vpc_id=vpc.id,
-            cidr_block="172.32.16.0/20",
-            opts=ResourceOptions(depends_on=[vpc]),
-        )
-        subnet_3 = ec2.Subnet(
-            f"{name}VpcSubnetC",
-            availability_zone="eu-west-1c",
-            vpc_id=vpc.id,
-            cidr_block="172.32.32.0/20",
-            opts=ResourceOptions(depends_on=[vpc]),
-        )
-
-        private_subnet_1 = ec2.Subnet(
-            f"{name}VpcPrivateSubnetA",
-            availability_zone="eu-west-1a",
-            vpc_id=vpc.id,
-            cidr_block="172.32.48.0/20",
-            opts=ResourceOptions(depends_on=[vpc]),
-        )
+        subnets = [
+            ec2.Subnet(
+                f"{name}VpcSubnet{letter.upper()}",
+                availability_zone=availability_zone,
+                vpc_id=vpc.id,
+                cidr_block=_subnet_cidr(i),
+                opts=ResourceOptions(depends_on=[vpc]),
+            )
+            for i, (letter, availability_zone) in enumerate(
+                zip(zone_letters, availability_zones)
+            )
+        ]
+        private_subnets = [
+            ec2.Subnet(
+                f"{name}VpcPrivateSubnet{letter.upper()}",
+                availability_zone=availability_zone,
+                vpc_id=vpc.id,
+                cidr_block=_subnet_cidr(availability_zone_count + i),
+                opts=ResourceOptions(depends_on=[vpc]),
+            )
+            for i, (letter, availability_zone) in enumerate(
+                zip(zone_letters, availability_zones)
+            )
+        ]
 
         security_group = ec2.SecurityGroup(
             f"{name}SecurityGroup",
@@ -97,8 +160,6 @@ class VPC(pulumi.ComponentResource):
             cidr_blocks=["0.0.0.0/0"],
         )
 
-        subnets = [subnet_1, subnet_2, subnet_3]
-
         gateway = ec2.InternetGateway(
             f"{name}InternetGateway",
             vpc_id=vpc.id,
@@ -112,37 +173,78 @@ class VPC(pulumi.ComponentResource):
             route_table_id=vpc.default_route_table_id,
         )
 
-        elastic_ip = ec2.Eip(
-            f"{name}Eip", vpc=True, opts=ResourceOptions(depends_on=[gateway])
-        )
+        # The first zone's NAT gateway and route table keep their original names
+        nat_zone_count = len(subnets) if nat_gateway_per_az else 1
+        nat_gateways = []
+        private_route_tables = []
 
-        nat_gateway = ec2.NatGateway(
-            f"{name}NatGateway",
-            subnet_id=subnet_1.id,
-            allocation_id=elastic_ip.id,
-            opts=ResourceOptions(depends_on=[subnet_1, elastic_ip]),
-        )
+        for i in range(nat_zone_count):
+            suffix = str(i) if i else ""
+            elastic_ip = ec2.Eip(
+                f"{name}Eip{suffix}",
+                vpc=True,
+                opts=ResourceOptions(depends_on=[gateway]),
+            )
+            nat_gateway = ec2.NatGateway(
+                f"{name}NatGateway{suffix}",
+                subnet_id=subnets[i].id,
+                allocation_id=elastic_ip.id,
+                opts=ResourceOptions(depends_on=[subnets[i], elastic_ip]),
+            )
+            nat_gateways.append(nat_gateway)
+            private_route_tables.append(
+                ec2.RouteTable(
+                    f"{name}PrivateRouteTable{suffix}",
+                    routes=[
+                        {"cidr_block": "0.0.0.0/0", "nat_gateway_id": nat_gateway.id}
+                    ],
+                    vpc_id=vpc.id,
+                    opts=ResourceOptions(depends_on=private_subnets),
+                )
+            )
 
-        private_route_table = ec2.RouteTable(
-            f"{name}PrivateRouteTable",
-            routes=[{"cidr_block": "0.0.0.0/0", "nat_gateway_id": nat_gateway.id,},],
-            vpc_id=vpc.id,
-            opts=ResourceOptions(depends_on=[private_subnet_1]),
-        )
+        for i, private_subnet in enumerate(private_subnets):
+            # The first association keeps its original name
+            suffix = str(i) if i else ""
+            ec2.RouteTableAssociation(
+                f"{name}PrivateRouteTableAssoc{suffix}",
+                route_table_id=private_route_tables[i % nat_zone_count].id,
+                subnet_id=private_subnet.id,
+            )
 
-        private_route_table_assoc = ec2.RouteTableAssociation(
-            f"{name}PrivateRouteTableAssoc",
-            route_table_id=private_route_table.id,
-            subnet_id=private_subnet_1.id,
-        )
+        if s3_endpoint:
+            ec2.VpcEndpoint(
+                f"{name}S3Endpoint",
+                vpc_id=vpc.id,
+                service_name=f"com.amazonaws.{region}.s3",
+                vpc_endpoint_type="Gateway",
+                route_table_ids=[table.id for table in private_route_tables],
+            )
+
+        # The security group allows all traffic from itself, so the functions and
+        # CodeBuild, which share it, can reach the endpoints over HTTPS
+        for service in interface_endpoints or []:
+            ec2.VpcEndpoint(
+                f"{name}{_endpoint_resource_name(service)}Endpoint",
+                vpc_id=vpc.id,
+                service_name=f"com.amazonaws.{region}.{service}",
+                vpc_endpoint_type="Interface",
+                subnet_ids=[subnet.id for subnet in private_subnets],
+                security_group_ids=[security_group.id],
+                private_dns_enabled=True,
+            )
 
         outputs = {
             "vpc": vpc,
             "security_group": security_group,
-            "public_subnets": [subnet_1, subnet_2, subnet_3],
-            "private_subnet": private_subnet_1,
-            "nat_gateway": nat_gateway,
+            "public_subnets": subnets,
+            "private_subnets": private_subnets,
+            "private_subnet": private_subnets[0],
+            "nat_gateway": nat_gateways[0],
+            "nat_gateways": nat_gateways,
         }
+        self.region = region
+        self.availability_zones = availability_zones
 
         self.set_outputs(outputs)
 
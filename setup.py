@@ -11,7 +11,7 @@ setup(
     url="none",
     packages=find_packages(exclude=("example")),
     python_requires=">=3.6",
-    install_requires=["pulumi>=1.8.1", "pulumi-aws>=1.0.0", "importlib-resources"],
-    test_requires=["pulumi>=1.8.1", "pulumi-aws>=1.0.0", "importlib-resources"],
+    install_requires=["pulumi>=3.0.0", "pulumi-aws>=5.4.0", "importlib-resources"],
+    test_requires=["pulumi>=3.0.0", "pulumi-aws>=5.4.0", "importlib-resources"],
     test_suite="test",
 )
@@ -0,0 +1,308 @@
+"""
+A cold start benchmark which runs without AWS:
+
+    python -m test.cold_start_benchmark pip-directory [module ...]
+        [--latency-ms N] [--brew-source DIR]
+
+It builds a copy of the EFS layout in a temporary directory, with a pip prefix
+made from a locally installed one and an optional Linuxbrew prefix, prepared the
+same way as the install commands prepare the real ones.  Each module is then
+imported in a fresh interpreter with the environment variables which
+`get_environment_function_args` gives a function, pointed at the copy, while the
+filesystem calls made under it are delayed to simulate NFS.  Every run starts
+with an empty `/tmp` cache and pack extraction directory, as on a new instance.
+
+The calls made by the import system are delayed and counted as they are made.
+The `/tmp` cache copies with `shutil`, so each copy is charged the calls it makes
+on the files it copies before it runs, and the time until the copies finish is
+reported as well.  Reads from files which are already open, such as page faults
+on a pack, run at local disk speed, so compare configurations on wall time and
+calls together.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from types import SimpleNamespace
+from typing import Dict, List
+
+from importlib_resources import files
+
+from pulumi_lambda_efs.get_environment_function_args import (
+    get_environment_function_args,
+    mount_location,
+)
+from pulumi_lambda_efs.install import local_brew_prefix, local_pip_prefix
+from pulumi_lambda_efs.postinstall import postinstall_pip, write_install_id
+from pulumi_lambda_efs.python_runtimes import DEFAULT_PYTHON_RUNTIME
+from pulumi_lambda_efs.runtime import TMP_CACHE_ENV
+from pulumi_lambda_efs.runtime.libraries import write_library_index
+from pulumi_lambda_efs.runtime.pack import write_pack
+from pulumi_lambda_efs.runtime.tmp_cache import TMP_CACHE_DIRECTORY
+
+# The keyword arguments of `get_environment_function_args` compared by default
+DEFAULT_CONFIGURATIONS = {
+    "plain": {},
+    "module index": {"use_module_index": True},
+    "pack": {"use_pack": True},
+    "tmp cache": {"tmp_cache_size": 512},
+}
+
+# The heavy dependencies of the example project, measured by default
+DEFAULT_MODULES = ["numpy", "pandas", "scipy", "sklearn"]
+
+# Per call latency, in seconds, of each operation on EFS
+DEFAULT_LATENCY = {"stat": 0.001, "listdir": 0.002, "open": 0.002}
+
+compile_pip_py = str(files("pulumi_lambda_efs.bin").joinpath("compile_pip.py"))
+
+# Run with `-S`, so that the runtime helpers are bootstrapped inside the
+# measurement, as they are when a function starts.  `PYTHONPATH` is still applied.
+_COLD_START_SCRIPT = """
+import importlib, json, os, sys, time
+config = json.loads(sys.argv[1])
+from lambda_efs_runtime.iostats import ImportIOCounter
+
+def charge_copies(tmp_cache, counter):
+    copy = tmp_cache.TmpCache._copy
+
+    def charged_copy(source, target):
+        for root, directory_names, file_names in os.walk(source):
+            counter.record("listdir", root)
+            for name in directory_names + file_names:
+                counter.record("stat", os.path.join(root, name))
+            for name in file_names:
+                counter.record("open", os.path.join(root, name))
+        if not os.path.isdir(source):
+            counter.record("stat", source)
+            counter.record("open", source)
+        copy(source, target)
+
+    tmp_cache.TmpCache._copy = staticmethod(charged_copy)
+
+with ImportIOCounter(config["latency"], config["mount_directory"]) as counter:
+    start = time.perf_counter()
+    if config["tmp_cache"]:
+        from lambda_efs_runtime import tmp_cache
+        charge_copies(tmp_cache, counter)
+    import sitecustomize
+    importlib.import_module(config["module"])
+    seconds = time.perf_counter() - start
+    for finder in sys.meta_path:
+        if hasattr(finder, "cache"):
+            finder.cache.join()
+    cached_seconds = time.perf_counter() - start
+print(json.dumps(
+    dict(counter.directory_counts, seconds=seconds, cached_seconds=cached_seconds)
+))
+"""
+
+# Variables of the calling environment which would change what is imported
+_CLEARED_VARIABLE_PREFIXES = ("PYTHON", "LAMBDA_")
+
+
+def _local_path(mount_directory, efs_path):
+    return os.path.join(mount_directory, os.path.relpath(efs_path, mount_location))
+
+
+def build_benchmark_mount(
+    directory: str, pip_source: str, brew_source: str = None
+) -> str:
+    """
+    Builds a copy of the EFS mount under `directory`, with the pip prefix copied
+    from `pip_source` and the Linuxbrew `lib` directory from `brew_source`, and
+    returns the path standing in for the mount location.  The pip prefix gets the
+    runtime helpers, module index, bytecode and pack which the install commands
+    write, so every configuration can be measured against it.
+    """
+    mount_directory = os.path.join(directory, "efs")
+    pip_directory = _local_path(mount_directory, local_pip_prefix)
+    brew_directory = _local_path(mount_directory, local_brew_prefix)
+
+    shutil.copytree(pip_source, pip_directory, symlinks=True)
+    postinstall_pip(pip_directory)
+    subprocess.run(
+        [sys.executable, compile_pip_py, pip_directory],
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    write_pack(pip_directory)
+    write_install_id(pip_directory)
+
+    library_directory = os.path.join(brew_directory, "lib")
+
+    if brew_source:
+        shutil.copytree(
+            os.path.join(brew_source, "lib"), library_directory, symlinks=True
+        )
+    else:
+        os.makedirs(library_directory)
+
+    write_library_index(brew_directory)
+    write_install_id(brew_directory)
+    return mount_directory
+
+
+def benchmark_environment(mount_directory: str, **function_args) -> Dict[str, str]:
+    """
+    Returns the environment for an interpreter which imports from the copy of the
+    mount at `mount_directory` as a function would, given the keyword arguments of
+    `get_environment_function_args`.
+    """
+    development_environment = SimpleNamespace(
+        security_group_id=None,
+        function_subnet_ids=None,
+        efs_access_point_arn=None,
+        python_runtime=DEFAULT_PYTHON_RUNTIME,
+    )
+    args = get_environment_function_args(
+        development_environment, DEFAULT_PYTHON_RUNTIME, **function_args
+    )
+    variables = {
+        name: value.replace(mount_location, mount_directory)
+        for name, value in args["environment"]["variables"].items()
+    }
+    environment = {
+        name: value
+        for name, value in os.environ.items()
+        if not name.startswith(_CLEARED_VARIABLE_PREFIXES)
+    }
+    environment.update(variables)
+
+    # The Lambda defaults for these do not exist here
+    environment["PATH"] = os.environ.get("PATH", "")
+    environment["LD_LIBRARY_PATH"] = ":".join(
+        entry
+        for entry in variables["LD_LIBRARY_PATH"].split(":")
+        if os.path.isdir(entry)
+    )
+    return environment
+
+
+def measure_cold_start(
+    mount_directory: str,
+    module: str,
+    environment: Dict[str, str],
+    latency: Dict[str, float],
+) -> Dict:
+    """
+    Imports `module` in a fresh interpreter with `environment`, delaying the
+    filesystem calls under `mount_directory` by `latency`, and returns the calls
+    made under it, the time taken, including bootstrapping the runtime helpers,
+    and the time until the `/tmp` cache finished copying.  The `/tmp` cache and
+    the directory which packs extract to start empty, as on a new Lambda instance.
+    """
+    shutil.rmtree(TMP_CACHE_DIRECTORY, ignore_errors=True)
+    config = {
+        "module": module,
+        "mount_directory": mount_directory,
+        "latency": latency,
+        "tmp_cache": TMP_CACHE_ENV in environment,
+    }
+
+    try:
+        # Packs extract their libraries under the temporary directory
+        with tempfile.TemporaryDirectory() as temporary_directory:
+            result = subprocess.run(
+                [sys.executable, "-S", "-c", _COLD_START_SCRIPT, json.dumps(config)],
+                env=dict(environment, TMPDIR=temporary_directory),
+                check=True,
+                stdout=subprocess.PIPE,
+                universal_newlines=True,
+            )
+    finally:
+        shutil.rmtree(TMP_CACHE_DIRECTORY, ignore_errors=True)
+
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def run_cold_start_benchmark(
+    pip_source: str,
+    modules: List[str],
+    latency: Dict[str, float] = None,
+    brew_source: str = None,
+    configurations: Dict[str, Dict] = None,
+) -> List[Dict]:
+    """
+    Builds a temporary copy of the EFS layout from `pip_source` and `brew_source`,
+    and measures a cold import of each of `modules` under each of
+    `configurations`, which map a name to keyword arguments for
+    `get_environment_function_args`.
+    """
+    latency = DEFAULT_LATENCY if latency is None else latency
+    configurations = configurations or DEFAULT_CONFIGURATIONS
+    results = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        mount_directory = build_benchmark_mount(directory, pip_source, brew_source)
+
+        for name, function_args in configurations.items():
+            environment = benchmark_environment(mount_directory, **function_args)
+
+            for module in modules:
+                measurement = measure_cold_start(
+                    mount_directory, module, environment, latency
+                )
+                results.append(dict(measurement, configuration=name, module=module))
+
+    return results
+
+
+def print_cold_start_results(results: List[Dict]):
+    print(
+        f"{'module':<20} {'configuration':<14} {'seconds':>9} {'cached':>9} "
+        f"{'open':>7} {'stat':>7} {'listdir':>8}"
+    )
+
+    for result in results:
+        print(
+            f"{result['module']:<20} {result['configuration']:<14} "
+            f"{result['seconds']:>9.3f} {result['cached_seconds']:>9.3f} "
+            f"{result.get('open', 0):>7} {result.get('stat', 0):>7} "
+            f"{result.get('listdir', 0):>8}"
+        )
+
+
+def _option_value(name, default, convert):
+    if name not in sys.argv:
+        return default
+
+    return convert(sys.argv[sys.argv.index(name) + 1])
+
+
+def main():
+    latency_ms = _option_value("--latency-ms", None, float)
+    brew_source = _option_value("--brew-source", None, str)
+    arguments = []
+    index = 1
+
+    while index < len(sys.argv):
+        if sys.argv[index] in ("--latency-ms", "--brew-source"):
+            index += 2
+            continue
+
+        arguments.append(sys.argv[index])
+        index += 1
+
+    if not arguments:
+        print(__doc__)
+        sys.exit(1)
+
+    latency = None
+
+    if latency_ms is not None:
+        latency = {
+            operation: latency_ms / 1000 for operation in ("stat", "listdir", "open")
+        }
+
+    results = run_cold_start_benchmark(
+        arguments[0], arguments[1:] or DEFAULT_MODULES, latency, brew_source
+    )
+    print_cold_start_results(results)
+
+
+if __name__ == "__main__":
+    main()
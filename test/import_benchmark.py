@@ -0,0 +1,133 @@
+"""
+A benchmark of the filesystem calls made by imports from a pip prefix:
+
+    python -m test.import_benchmark pip-directory module [module ...]
+
+Each module is imported from the prefix as a plain directory, with the module
+index and from the pack if they have been written, and the filesystem calls and
+time taken by each import are reported.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+from pulumi_lambda_efs.postinstall import install_runtime
+from pulumi_lambda_efs.runtime import MODULE_INDEX_ENV, PACK_ENV
+from pulumi_lambda_efs.runtime.module_index import INDEX_FILENAME
+from pulumi_lambda_efs.runtime.pack import default_pack_path
+
+# Run in a fresh interpreter for each module, so that every measurement includes the
+# module's full dependency tree and nothing is already in `sys.modules`.  The pack
+# is read through a memory map, so its page faults are not counted as calls; compare
+# the wall time as well.
+_MEASURE_SCRIPT = """
+import importlib, json, sys, time
+config = json.loads(sys.argv[1])
+sys.path.append(config["runtime_parent"])
+from lambda_efs_runtime.iostats import ImportIOCounter
+start = time.perf_counter()
+if config["layout"] == "index":
+    from lambda_efs_runtime.module_index import install_index_finder
+    install_index_finder(config["index_path"])
+elif config["layout"] == "pack":
+    from lambda_efs_runtime.pack import install_pack_finder
+    install_pack_finder(config["pack_path"])
+with ImportIOCounter() as counter:
+    importlib.import_module(config["module"])
+seconds = time.perf_counter() - start
+print(json.dumps(dict(counter.counts, seconds=seconds)))
+"""
+
+
+def measure_import(
+    directory: str, module: str, layout: str, runtime_parent: str
+) -> Dict:
+    """
+    Imports `module` from the pip prefix at `directory` in a subprocess, using the
+    given layout, and returns the filesystem calls made by the import system and
+    the time taken, including loading the index or pack.
+    """
+    config = {
+        "module": module,
+        "layout": layout,
+        "runtime_parent": runtime_parent,
+        "index_path": os.path.join(directory, INDEX_FILENAME),
+        "pack_path": default_pack_path(directory),
+    }
+    environment = dict(os.environ, PYTHONPATH=directory)
+    environment.pop(MODULE_INDEX_ENV, None)
+    environment.pop(PACK_ENV, None)
+
+    result = subprocess.run(
+        [sys.executable, "-c", _MEASURE_SCRIPT, json.dumps(config)],
+        env=environment,
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def available_layouts(directory: str) -> List[str]:
+    """
+    Returns the layouts which have been written for the pip prefix at `directory`:
+    the plain directory, the module index and the single file pack.
+    """
+    layouts = ["directory"]
+
+    if os.path.exists(os.path.join(directory, INDEX_FILENAME)):
+        layouts.append("index")
+
+    if os.path.exists(default_pack_path(directory)):
+        layouts.append("pack")
+
+    return layouts
+
+
+def measure_imports(directory: str, modules: List[str]) -> List[Dict]:
+    """
+    Measures each of `modules` with every layout available for `directory`.
+    """
+    results = []
+
+    with tempfile.TemporaryDirectory() as runtime_parent:
+        install_runtime(runtime_parent)
+
+        for module in modules:
+            for layout in available_layouts(directory):
+                measurement = measure_import(directory, module, layout, runtime_parent)
+                measurement["module"] = module
+                measurement["layout"] = layout
+                results.append(measurement)
+
+    return results
+
+
+def print_measurements(results: List[Dict]):
+    print(f"{'module':<24}{'layout':>10}{'stat':>8}{'listdir':>9}{'open':>8}{'ms':>10}")
+
+    for result in results:
+        print(
+            f"{result['module']:<24}"
+            f"{result['layout']:>10}"
+            f"{result.get('stat', 0):>8}"
+            f"{result.get('listdir', 0):>9}"
+            f"{result.get('open', 0):>8}"
+            f"{result['seconds'] * 1000:>10.1f}"
+        )
+
+
+def main():
+    if len(sys.argv) <= 2:
+        print(__doc__)
+        sys.exit(1)
+
+    print_measurements(measure_imports(sys.argv[1], sys.argv[2:]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+A benchmark of looking up Linuxbrew libraries:
+
+    python -m test.library_benchmark brew-directory name [name ...]
+
+Times `ctypes.util.find_library` against `lambda_efs_runtime`'s `find_library`,
+with the library index of the given Linuxbrew prefix, for each library name.
+Names missing from the index fall back to the standard version in both.
+"""
+
+import ctypes.util
+import os
+import sys
+import time
+from typing import Dict, List
+
+from pulumi_lambda_efs.runtime.libraries import (
+    LIBRARY_INDEX_ENV,
+    LIBRARY_INDEX_FILENAME,
+    find_library,
+    reset_find_library,
+)
+
+# Lookups in the index take microseconds, so they are repeated for at least this
+# long to time them
+_MIN_INDEX_SECONDS = 0.1
+
+
+def _time_lookups(lookup, name, repeat, min_seconds=0.0):
+    count = 0
+    start = time.perf_counter()
+
+    while count < repeat or time.perf_counter() - start < min_seconds:
+        result = lookup(name)
+        count += 1
+
+    return (time.perf_counter() - start) / count, result
+
+
+def measure_find_library(
+    directory: str, names: List[str], repeat: int = 3
+) -> List[Dict]:
+    """
+    Times `ctypes.util.find_library` against the drop in `find_library`, using the
+    library index of the Linuxbrew prefix at `directory`, for each of `names`.
+    Names which are not in the index are passed on to the standard version, as
+    they are on Lambda, so they cost as much with both.  Both are run with the
+    prefix's `lib` directory on `LD_LIBRARY_PATH`, as it is on Lambda.
+    """
+    variables = {
+        "LD_LIBRARY_PATH": os.path.join(directory, "lib"),
+        LIBRARY_INDEX_ENV: os.path.join(directory, LIBRARY_INDEX_FILENAME),
+    }
+    original_variables = {name: os.environ.get(name) for name in variables}
+    os.environ.update(variables)
+    reset_find_library()
+    results = []
+
+    try:
+        for name in names:
+            standard_seconds, standard_result = _time_lookups(
+                ctypes.util.find_library, name, repeat
+            )
+            index_seconds, index_result = _time_lookups(
+                find_library, name, repeat, _MIN_INDEX_SECONDS
+            )
+            results.append(
+                {
+                    "name": name,
+                    "standard_seconds": standard_seconds,
+                    "standard_result": standard_result,
+                    "index_seconds": index_seconds,
+                    "index_result": index_result,
+                }
+            )
+    finally:
+        for name, value in original_variables.items():
+            if value is None:
+                del os.environ[name]
+            else:
+                os.environ[name] = value
+
+        reset_find_library()
+
+    return results
+
+
+def print_find_library_measurements(results: List[Dict]):
+    for result in results:
+        print(f"{result['name']}:")
+        print(
+            f"  ctypes.util.find_library  {result['standard_seconds'] * 1e6:>12.1f} us"
+            f"  {result['standard_result']}"
+        )
+        print(
+            f"  indexed find_library      {result['index_seconds'] * 1e6:>12.3f} us"
+            f"  {result['index_result']}"
+        )
+
+
+def main():
+    if len(sys.argv) <= 2:
+        print(__doc__)
+        sys.exit(1)
+
+    print_find_library_measurements(measure_find_library(sys.argv[1], sys.argv[2:]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+
+from pulumi_lambda_efs.runtime.libraries import write_library_index
+
+from .cold_start_benchmark import DEFAULT_CONFIGURATIONS, run_cold_start_benchmark
+from .import_benchmark import measure_imports
+from .library_benchmark import measure_find_library
+
+
+class TestBenchmarks(unittest.TestCase):
+    """
+    Runs each benchmark once on a pip prefix holding one small package, without
+    latency, to check that it still runs against the current layout.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.pip_directory = os.path.join(self.directory, "pip")
+        package_directory = os.path.join(self.pip_directory, "benchmark_sample")
+        os.makedirs(package_directory)
+
+        with open(os.path.join(package_directory, "__init__.py"), "w") as init_file:
+            init_file.write("import json\nVALUE = 1\n")
+
+    def test_cold_start_benchmark(self):
+        latency = {"stat": 0, "listdir": 0, "open": 0}
+        results = run_cold_start_benchmark(
+            self.pip_directory, ["benchmark_sample"], latency
+        )
+
+        self.assertEqual(
+            [result["configuration"] for result in results],
+            list(DEFAULT_CONFIGURATIONS),
+        )
+
+        for result in results:
+            self.assertEqual(result["module"], "benchmark_sample")
+            self.assertGreater(result["seconds"], 0)
+            self.assertGreaterEqual(result["cached_seconds"], result["seconds"])
+
+    def test_import_benchmark(self):
+        results = measure_imports(self.pip_directory, ["benchmark_sample"])
+
+        self.assertEqual([result["layout"] for result in results], ["directory"])
+        self.assertGreater(results[0]["seconds"], 0)
+
+    def test_library_benchmark(self):
+        brew_directory = os.path.join(self.directory, "linuxbrew")
+        os.makedirs(os.path.join(brew_directory, "lib"))
+        write_library_index(brew_directory)
+
+        results = measure_find_library(brew_directory, ["c"], repeat=1)
+
+        self.assertEqual(results[0]["name"], "c")
+        self.assertEqual(results[0]["index_result"], results[0]["standard_result"])
@@ -0,0 +1,204 @@
+import os
+import tempfile
+import unittest
+
+import pulumi
+from pulumi_aws import ec2
+
+from pulumi_lambda_efs.codebuild import CodeBuild
+from pulumi_lambda_efs.efs import EFS
+from pulumi_lambda_efs.throughput import (
+    bursting_throughput,
+    measure_package_bytes,
+    recommend_provisioned_throughput,
+)
+from pulumi_lambda_efs.vpc import VPC
+
+
+class Mocks(pulumi.runtime.Mocks):
+    """
+    Records the inputs of every resource created, by name, and gives them back as
+    their state.  The AWS provider is in eu-west-1, with three zones available.
+    """
+
+    def __init__(self):
+        self.resources = {}
+
+    def new_resource(self, args):
+        self.resources[args.name] = args.inputs
+        return f"{args.name}_id", args.inputs
+
+    def call(self, args):
+        if args.token == "aws:index/getRegion:getRegion":
+            return {"name": "eu-west-1"}
+
+        if args.token == "aws:index/getAvailabilityZones:getAvailabilityZones":
+            return {"names": ["eu-west-1a", "eu-west-1b", "eu-west-1c"]}
+
+        return {}
+
+
+mocks = Mocks()
+pulumi.runtime.set_mocks(mocks)
+
+
+def _vpc_environment(name):
+    security_group = ec2.SecurityGroup(f"{name}SecurityGroup")
+    subnets = [
+        ec2.Subnet(f"{name}Subnet{i}", vpc_id="vpc", cidr_block=f"10.0.{i}.0/24")
+        for i in range(2)
+    ]
+    return type(
+        "VPCEnvironment",
+        (),
+        {"security_group": security_group, "private_subnets": subnets},
+    )
+
+
+class TestEFS(unittest.TestCase):
+    """
+    The EFS component, created against the mocks.
+    """
+
+    def test_provisioned_throughput_requires_mibps(self):
+        with self.assertRaises(ValueError):
+            EFS("missing", _vpc_environment("missing"), throughput_mode="provisioned")
+
+    def test_bursting_rejects_mibps(self):
+        with self.assertRaises(ValueError):
+            EFS(
+                "bursting",
+                _vpc_environment("bursting"),
+                provisioned_throughput_in_mibps=10,
+            )
+
+    @pulumi.runtime.test
+    def test_provisioned_throughput(self):
+        efs = EFS(
+            "provisioned",
+            _vpc_environment("provisioned"),
+            performance_mode="maxIO",
+            throughput_mode="provisioned",
+            provisioned_throughput_in_mibps=64,
+        )
+
+        def check(_):
+            inputs = mocks.resources["provisionedFileSystem"]
+            self.assertEqual(inputs["performanceMode"], "maxIO")
+            self.assertEqual(inputs["throughputMode"], "provisioned")
+            self.assertEqual(inputs["provisionedThroughputInMibps"], 64)
+
+        return efs.file_system_id.apply(check)
+
+    @pulumi.runtime.test
+    def test_mount_target_per_private_subnet(self):
+        efs = EFS("targets", _vpc_environment("targets"))
+
+        def check(_):
+            self.assertEqual(
+                mocks.resources["targetsMountTarget0"]["subnetId"], "targetsSubnet0_id"
+            )
+            self.assertEqual(
+                mocks.resources["targetsMountTarget1"]["subnetId"], "targetsSubnet1_id"
+            )
+            self.assertNotIn("targetsMountTarget2", mocks.resources)
+
+        return efs.access_point.id.apply(check)
+
+
+class TestVPC(unittest.TestCase):
+    """
+    The VPC component, created against the mocks.
+    """
+
+    def test_rejects_other_region(self):
+        with self.assertRaises(ValueError):
+            VPC("otherRegion", region="us-east-1")
+
+    def test_rejects_unavailable_zones(self):
+        with self.assertRaises(ValueError):
+            VPC("fourZones", availability_zone_count=4)
+
+    @pulumi.runtime.test
+    def test_subnet_per_available_zone(self):
+        vpc = VPC("zones", availability_zone_count=2)
+
+        def check(_):
+            self.assertEqual(
+                mocks.resources["zonesVpcPrivateSubnetB"]["availabilityZone"],
+                "eu-west-1b",
+            )
+            self.assertNotIn("zonesVpcPrivateSubnetC", mocks.resources)
+
+        return vpc.security_group.id.apply(check)
+
+
+class TestCodeBuild(unittest.TestCase):
+    """
+    The sizing and caches of the CodeBuild component, created against the mocks.
+    """
+
+    @pulumi.runtime.test
+    def test_small_unless_sized(self):
+        vpc = VPC("unsized")
+        codebuild = CodeBuild("unsized", vpc, EFS("unsized", vpc), "repo")
+
+        self.assertEqual(codebuild.compute_type, "BUILD_GENERAL1_SMALL")
+
+    @pulumi.runtime.test
+    def test_sized(self):
+        vpc = VPC("sized")
+        codebuild = CodeBuild(
+            "sized", vpc, EFS("sized", vpc), "repo", build_cpu_minutes=60
+        )
+
+        self.assertEqual(codebuild.compute_type, "BUILD_GENERAL1_MEDIUM")
+
+    def test_local_install_caches_need_custom_cache(self):
+        with self.assertRaises(ValueError):
+            CodeBuild(
+                "uncached",
+                None,
+                None,
+                "repo",
+                cache_modes=[],
+                local_install_caches=True,
+            )
+
+
+class TestThroughput(unittest.TestCase):
+    """
+    The sizing of provisioned throughput.
+    """
+
+    def test_recommend_provisioned_throughput(self):
+        # 100 MiB for 10 instances in 10 s, with 25% headroom
+        self.assertEqual(recommend_provisioned_throughput(100 * 2 ** 20, 10, 10), 125)
+        self.assertEqual(
+            recommend_provisioned_throughput(100 * 2 ** 20, 10, 10, headroom=1), 100
+        )
+
+    def test_recommend_provisioned_throughput_rounds_up(self):
+        self.assertEqual(recommend_provisioned_throughput(0, 1, 1), 1)
+        self.assertEqual(recommend_provisioned_throughput(2 ** 20, 3, 2), 2)
+
+    def test_recommend_provisioned_throughput_rejects_invalid(self):
+        for arguments in [(-1, 1, 1), (1, 0, 1), (1, 1, 0)]:
+            with self.assertRaises(ValueError):
+                recommend_provisioned_throughput(*arguments)
+
+    def test_bursting_throughput(self):
+        self.assertEqual(bursting_throughput(2 ** 40), {"baseline": 50.0, "burst": 100})
+        self.assertEqual(bursting_throughput(4 * 2 ** 40)["burst"], 400)
+
+    def test_measure_package_bytes_counts_hard_links_once(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "library.so")
+
+            with open(path, "wb") as library_file:
+                library_file.write(b"x" * 1000)
+
+            os.link(path, os.path.join(directory, "library.so.1"))
+            os.symlink(path, os.path.join(directory, "library.so.2"))
+
+            self.assertEqual(measure_package_bytes([directory]), 1000)
@@ -0,0 +1,189 @@
+import os
+import tempfile
+import unittest
+
+from pulumi_lambda_efs.sync import sync_directories
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(path, "w") as output_file:
+        output_file.write(data)
+
+
+def _read(path):
+    with open(path) as input_file:
+        return input_file.read()
+
+
+class TestSync(unittest.TestCase):
+    """
+    Syncs between two temporary directories.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.source = os.path.join(directory.name, "source")
+        self.destination = os.path.join(directory.name, "destination")
+        os.mkdir(self.source)
+
+    def _source(self, *parts):
+        return os.path.join(self.source, *parts)
+
+    def _destination(self, *parts):
+        return os.path.join(self.destination, *parts)
+
+    def _sync(self, **kwargs):
+        return sync_directories(self.source, self.destination, workers=4, **kwargs)
+
+    def test_copies_tree(self):
+        _write(self._source("package", "__init__.py"), "import os\n")
+        _write(self._source("package", "data", "table.csv"), "a,b\n")
+        os.chmod(self._source("package", "data", "table.csv"), 0o600)
+
+        result = self._sync()
+
+        self.assertEqual(result["copied"], 2)
+        self.assertEqual(
+            _read(self._destination("package", "__init__.py")), "import os\n"
+        )
+        self.assertEqual(
+            os.stat(self._destination("package", "data", "table.csv")).st_mode & 0o777,
+            0o600,
+        )
+        self.assertEqual(
+            os.stat(self._destination("package", "__init__.py")).st_mtime_ns,
+            os.stat(self._source("package", "__init__.py")).st_mtime_ns,
+        )
+
+    def test_second_run_copies_nothing(self):
+        _write(self._source("module.py"), "x = 1\n")
+        _write(self._source("lib", "libz.so.1.2"), "elf")
+        os.link(self._source("lib", "libz.so.1.2"), self._source("lib", "libz.so.1"))
+        os.symlink("libz.so.1", self._source("lib", "libz.so"))
+        self._sync()
+
+        for kwargs in [{}, {"checksum": True}]:
+            result = self._sync(**kwargs)
+            self.assertEqual(result["copied"], 0)
+            self.assertEqual(result["unchanged"], 2)
+            self.assertEqual(result["linked"], 0)
+            self.assertEqual(result["symlinks"], 0)
+            self.assertEqual(result["removed"], 0)
+
+    def test_copies_changed_files(self):
+        _write(self._source("module.py"), "x = 1\n")
+        self._sync()
+
+        _write(self._source("module.py"), "x = 22\n")
+        result = self._sync()
+
+        self.assertEqual(result["copied"], 1)
+        self.assertEqual(_read(self._destination("module.py")), "x = 22\n")
+
+    def test_checksum_compares_contents(self):
+        _write(self._source("module.py"), "x = 1\n")
+        self._sync()
+
+        # Same size and modification time, different contents
+        source_stat = os.stat(self._source("module.py"))
+        _write(self._source("module.py"), "x = 2\n")
+        os.utime(
+            self._source("module.py"),
+            ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns),
+        )
+
+        self.assertEqual(self._sync()["copied"], 0)
+        self.assertEqual(self._sync(checksum=True)["copied"], 1)
+        self.assertEqual(_read(self._destination("module.py")), "x = 2\n")
+
+    def test_hard_links(self):
+        _write(self._source("lib", "libz.so.1.2"), "elf")
+        os.link(self._source("lib", "libz.so.1.2"), self._source("lib", "libz.so.1"))
+
+        result = self._sync()
+
+        self.assertEqual(result["copied"], 1)
+        self.assertEqual(result["linked"], 1)
+        self.assertTrue(
+            os.path.samefile(
+                self._destination("lib", "libz.so.1.2"),
+                self._destination("lib", "libz.so.1"),
+            )
+        )
+
+    def test_symlinks(self):
+        _write(self._source("lib", "libz.so.1"), "elf")
+        os.symlink("libz.so.1", self._source("lib", "libz.so"))
+        os.symlink("missing", self._source("lib", "dangling"))
+        self._sync()
+
+        self.assertEqual(os.readlink(self._destination("lib", "libz.so")), "libz.so.1")
+        self.assertEqual(os.readlink(self._destination("lib", "dangling")), "missing")
+
+        os.remove(self._source("lib", "libz.so"))
+        os.symlink("libz.so.1.2", self._source("lib", "libz.so"))
+        result = self._sync()
+
+        self.assertEqual(result["symlinks"], 1)
+        self.assertEqual(
+            os.readlink(self._destination("lib", "libz.so")), "libz.so.1.2"
+        )
+
+    def test_file_replaced_by_directory(self):
+        _write(self._source("entry"), "file")
+        self._sync()
+
+        os.remove(self._source("entry"))
+        _write(self._source("entry", "inner.py"), "inner")
+        self._sync()
+
+        self.assertTrue(os.path.isdir(self._destination("entry")))
+        self.assertEqual(_read(self._destination("entry", "inner.py")), "inner")
+
+    def test_directory_replaced_by_file(self):
+        _write(self._source("entry", "inner.py"), "inner")
+        self._sync()
+
+        os.remove(self._source("entry", "inner.py"))
+        os.rmdir(self._source("entry"))
+        _write(self._source("entry"), "file")
+        self._sync()
+
+        self.assertEqual(_read(self._destination("entry")), "file")
+
+    def test_file_replaced_by_symlink(self):
+        _write(self._source("libz.so.1"), "elf")
+        _write(self._source("libz.so"), "elf")
+        self._sync()
+
+        os.remove(self._source("libz.so"))
+        os.symlink("libz.so.1", self._source("libz.so"))
+        self._sync()
+
+        self.assertEqual(os.readlink(self._destination("libz.so")), "libz.so.1")
+
+    def test_deletes_extra_entries(self):
+        _write(self._source("keep.py"), "keep")
+        _write(self._source("old", "module.py"), "old")
+        _write(self._source("old.py"), "old")
+        self._sync()
+
+        os.remove(self._source("old", "module.py"))
+        os.rmdir(self._source("old"))
+        os.remove(self._source("old.py"))
+        result = self._sync()
+
+        self.assertEqual(result["removed"], 3)
+        self.assertEqual(sorted(os.listdir(self.destination)), ["keep.py"])
+
+    def test_keeps_extra_entries(self):
+        _write(self._source("keep.py"), "keep")
+        _write(self._destination("extra.py"), "extra")
+
+        result = self._sync(delete=False)
+
+        self.assertEqual(result["removed"], 0)
+        self.assertEqual(sorted(os.listdir(self.destination)), ["extra.py", "keep.py"])